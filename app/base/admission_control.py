@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from ipaddress import IPv4Network, IPv6Network, ip_address, ip_network
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from app.base.auth import TokenVerifier
+from app.constants.route_paths import RoutePaths
+from app.databases.monitored_pool import PoolWaitMonitor
+from app.enums.env_keys import EnvKeys
+from app.models.response_model import ResponseModel
+
+
+@dataclass(frozen=True)
+class AdmissionRule:
+    """Limits for one route; `None` means unlimited."""
+    rate_per_second: float
+    burst: int
+    max_concurrent: Optional[int] = None
+    max_concurrent_per_tenant: Optional[int] = None
+
+
+# Expensive endpoints: order creation and full, unpaginated listings
+ROUTE_RULES: Dict[Tuple[str, str], AdmissionRule] = {
+    ("POST", RoutePaths.API_PREFIX + RoutePaths.ORDER): AdmissionRule(5, 10, max_concurrent=8, max_concurrent_per_tenant=2),
+    ("GET", RoutePaths.API_PREFIX + RoutePaths.ORDER): AdmissionRule(2, 5, max_concurrent=4, max_concurrent_per_tenant=1),
+    ("GET", RoutePaths.API_PREFIX + RoutePaths.PRODUCT): AdmissionRule(5, 10, max_concurrent=8, max_concurrent_per_tenant=2),
+    ("GET", RoutePaths.API_PREFIX + RoutePaths.CUSTOMER): AdmissionRule(5, 10, max_concurrent=8, max_concurrent_per_tenant=2),
+}
+IPNetwork = Union[IPv4Network, IPv6Network]
+# Never limited (health checks must keep answering while shedding)
+EXEMPT_PATHS = (RoutePaths.PING, RoutePaths.DOCS, RoutePaths.STATIC, "/openapi.json")
+
+
+class InMemoryRateLimitBackend:
+    """Token buckets in this process. Exact, lock-protected, no I/O."""
+
+    def __init__(self, max_buckets: int = 100000):
+        self.max_buckets = max_buckets
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self.lock = Lock()
+
+    async def acquire(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated_at = self.buckets.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if key not in self.buckets and len(self.buckets) >= self.max_buckets:
+                # Full buckets carry no state worth keeping
+                self.buckets = {k: v for k, v in self.buckets.items() if v[0] < burst}
+            self.buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+class PostgresRateLimitBackend:
+    """
+    Token buckets shared by every worker, kept in the UNLOGGED `rate_limit_buckets` table.
+    One atomic upsert per request, run off the event loop.
+    """
+
+    ACQUIRE_QUERY = """
+    INSERT INTO rate_limit_buckets (bucket_key, tokens, allowed, updated_at)
+    VALUES (:bucket_key, :burst - 1, TRUE, clock_timestamp())
+    ON CONFLICT (bucket_key) DO UPDATE SET
+        tokens = LEAST(:burst, rate_limit_buckets.tokens
+                 + EXTRACT(EPOCH FROM clock_timestamp() - rate_limit_buckets.updated_at) * :rate)
+                 - CASE WHEN LEAST(:burst, rate_limit_buckets.tokens
+                        + EXTRACT(EPOCH FROM clock_timestamp() - rate_limit_buckets.updated_at) * :rate) >= 1
+                   THEN 1 ELSE 0 END,
+        allowed = LEAST(:burst, rate_limit_buckets.tokens
+                  + EXTRACT(EPOCH FROM clock_timestamp() - rate_limit_buckets.updated_at) * :rate) >= 1,
+        updated_at = clock_timestamp()
+    RETURNING tokens, allowed;
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def _acquire(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                text(self.ACQUIRE_QUERY), {"bucket_key": key, "rate": rate, "burst": burst}
+            ).fetchone()
+        tokens, allowed = float(row.tokens), bool(row.allowed)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    async def acquire(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        try:
+            return await asyncio.to_thread(self._acquire, key, rate, burst)
+        except Exception as e:
+            # Fail open: a limiter outage must not take the API down with it
+            logging.error("Rate limit backend unavailable: %s", e)
+            return True, 0.0
+
+
+class ConcurrencyLimiter:
+    """Per-process in-flight counters for capped routes (protects this worker's connection pool)."""
+
+    def __init__(self):
+        self.in_flight: Dict[str, int] = {}
+
+    def try_enter(self, keys: Iterable[Tuple[str, Optional[int]]]) -> Optional[str]:
+        """Enter every (key, cap) or none; returns the first key at its cap."""
+        keys = [(key, cap) for key, cap in keys if cap is not None]
+        for key, cap in keys:
+            if self.in_flight.get(key, 0) >= cap:
+                return key
+        for key, _ in keys:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        return None
+
+    def leave(self, keys: Iterable[Tuple[str, Optional[int]]]) -> None:
+        for key, cap in keys:
+            if cap is None:
+                continue
+            remaining = self.in_flight.get(key, 1) - 1
+            if remaining:
+                self.in_flight[key] = remaining
+            else:
+                self.in_flight.pop(key, None)
+
+
+class AdmissionControlMiddleware:
+    """
+    Admits a request only if the pool is not overloaded (503), the tenant has a token for the
+    route (429) and the route's concurrency caps allow it (503 globally, 429 per tenant).
+    """
+
+    def __init__(
+        self,
+        app,
+        routes: List,
+        backend,
+        default_rule: AdmissionRule,
+        pool_wait_threshold_seconds: float,
+        trusted_proxies: Sequence[IPNetwork] = ()
+    ):
+        self.app = app
+        self.routes = routes
+        self.backend = backend
+        self.default_rule = default_rule
+        self.pool_wait_threshold_seconds = pool_wait_threshold_seconds
+        self.trusted_proxies = tuple(trusted_proxies)
+        self.concurrency = ConcurrencyLimiter()
+        self.route_template = lru_cache(maxsize=4096)(self._route_template)
+
+    def _route_template(self, method: str, path: str) -> str:
+        """Route path template (e.g. /api/v1/order/{order_id}), so IDs don't create new buckets."""
+        scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", path)
+        return path
+
+    def _tenant(self, scope) -> str:
+        """
+        The verified token's `sub`, else the client IP. Never the user_id query parameter:
+        anyone can send one, and rotating it would give every request a fresh bucket.
+        """
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if authorization.lower().startswith("bearer "):
+            try:
+                return TokenVerifier().verify(authorization[7:])["sub"]
+            except Exception:
+                pass  # the route's own dependency reports the invalid token
+        client = self._client_ip(scope["client"][0], headers) if scope.get("client") else None
+        return f"ip:{client}" if client else "anonymous"
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def _client_ip(self, peer: str, headers: Dict[bytes, bytes]) -> str:
+        """
+        The peer address, or behind a trusted proxy the X-Forwarded-For entry it received the request
+        from: the right-most one that isn't itself a trusted proxy (those left of it are client-supplied).
+        """
+        if not self._trusted(peer):
+            return peer
+        forwarded = [
+            address.strip() for address in headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",")
+            if address.strip()
+        ]
+        for address in reversed(forwarded):
+            if not self._trusted(address):
+                return address
+        return forwarded[0] if forwarded else peer
+
+    @staticmethod
+    async def _reject(scope, receive, send, status_code: int, message: str, retry_after: float) -> None:
+        response_model = ResponseModel(
+            message=message,
+            error=message,
+            status=ResponseModel.FAILED,
+            status_code=status_code
+        )
+        response = JSONResponse(
+            content=response_model.model_dump(),
+            status_code=status_code,
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS):
+            return await self.app(scope, receive, send)
+
+        if PoolWaitMonitor().recent_wait_seconds() > self.pool_wait_threshold_seconds:
+            return await self._reject(scope, receive, send, 503, "Server is overloaded, retry shortly", 1)
+
+        method = scope["method"]
+        template = self.route_template(method, scope["path"])
+        rule = ROUTE_RULES.get((method, template), self.default_rule)
+        tenant = self._tenant(scope)
+
+        allowed, retry_after = await self.backend.acquire(
+            f"{tenant}:{method}:{template}", rule.rate_per_second, rule.burst
+        )
+        if not allowed:
+            return await self._reject(scope, receive, send, 429, "Rate limit exceeded", retry_after)
+
+        caps = [
+            (f"{method}:{template}", rule.max_concurrent),
+            (f"{tenant}:{method}:{template}", rule.max_concurrent_per_tenant)
+        ]
+        blocked = self.concurrency.try_enter(caps)
+        if blocked:
+            status_code = 503 if blocked == caps[0][0] else 429
+            return await self._reject(scope, receive, send, status_code, "Too many concurrent requests", 1)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.concurrency.leave(caps)
+
+
+class InitAdmissionControl:
+    def __init__(self, app: FastAPI, engine: Engine):
+        # Off by default until tokens are required: the legacy user_id callers would otherwise share
+        # their proxy's IP bucket
+        enabled = os.getenv(EnvKeys.ADMISSION_CONTROL_ENABLED.value) or os.getenv(EnvKeys.AUTH_REQUIRED.value, "False")
+        if enabled.lower() not in ("true", "1", "yes"):
+            return
+        backend_name = os.getenv(EnvKeys.RATE_LIMIT_BACKEND.value, "memory").lower()
+        backend = PostgresRateLimitBackend(engine) if backend_name == "postgres" else InMemoryRateLimitBackend()
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            routes=app.routes,
+            backend=backend,
+            default_rule=AdmissionRule(
+                rate_per_second=float(os.getenv(EnvKeys.RATE_LIMIT_DEFAULT_RATE.value, "20")),
+                burst=int(os.getenv(EnvKeys.RATE_LIMIT_DEFAULT_BURST.value, "40"))
+            ),
+            pool_wait_threshold_seconds=int(os.getenv(EnvKeys.ADMISSION_POOL_WAIT_THRESHOLD_MS.value, "500")) / 1000,
+            trusted_proxies=[
+                ip_network(proxy.strip(), strict=False)
+                for proxy in os.getenv(EnvKeys.TRUSTED_PROXIES.value, "").split(",") if proxy.strip()
+            ]
+        )
+        logging.info("Admission control enabled with the %s rate limit backend.", backend_name)
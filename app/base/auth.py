@@ -0,0 +1,274 @@
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Annotated, Dict, List, Optional, Tuple
+import jwt
+from fastapi import Depends, HTTPException, Path, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.enums.env_keys import EnvKeys
+from app.databases.shard_router import set_request_tenant
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def token_hash(token: str) -> str:
+    """Cache/revocation key; raw tokens are never kept in memory structures."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class ClaimsCache:
+    """Bounded LRU of verified claims, each entry valid until the token's own `exp`."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, key: str, claims: Dict, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RevocationList:
+    """In-memory revocations: single tokens until they expire, or every token a user was issued before a time."""
+
+    def __init__(self):
+        self._revoked_tokens: Dict[str, float] = {}
+        self._revoked_users: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def revoke_token(self, key: str, expires_at: float) -> None:
+        with self._lock:
+            self._revoked_tokens[key] = expires_at
+            self._purge_expired()
+
+    def revoke_user(self, user_id: str, issued_before: Optional[float] = None) -> None:
+        with self._lock:
+            self._revoked_users[user_id] = issued_before or time.time()
+
+    def is_revoked(self, key: str, claims: Dict) -> bool:
+        if key in self._revoked_tokens:
+            return True
+        issued_before = self._revoked_users.get(claims.get("sub"))
+        return issued_before is not None and claims.get("iat", 0) <= issued_before
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        for key in [key for key, expires_at in self._revoked_tokens.items() if expires_at <= now]:
+            del self._revoked_tokens[key]
+
+
+class TokenVerifier:
+    """Verifies access tokens once, then serves their claims from memory for the rest of their lifetime."""
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(TokenVerifier, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "cache"):  # Prevent reinitialization
+            self.secret_key = os.getenv(EnvKeys.SECRET_KEY.value)
+            self.algorithm = os.getenv(EnvKeys.ALGORITHM.value, "HS256")
+            self.auth_required = os.getenv(EnvKeys.AUTH_REQUIRED.value, "False").lower() in ("true", "1", "yes")
+            self.cache = ClaimsCache(max_size=int(os.getenv(EnvKeys.AUTH_CLAIMS_CACHE_SIZE.value, "10000")))
+            self.revocations = RevocationList()
+
+    def verify(self, token: str) -> Dict:
+        """Return the token's claims or raise 401."""
+        key = token_hash(token)
+        claims = self.cache.get(key)
+        if claims is None:
+            try:
+                claims = jwt.decode(token, self.secret_key, algorithms=[self.algorithm], options={"require": ["exp", "sub"]})
+            except jwt.PyJWTError as e:
+                logging.info("Rejected access token: %s", e)
+                raise HTTPException(status_code=401, detail="Invalid or expired token")
+            self.cache.put(key, claims, float(claims["exp"]))
+        if self.revocations.is_revoked(key, claims):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return claims
+
+    def revoke(self, token: str) -> None:
+        """Revoke one token (e.g. on logout)."""
+        claims = self.verify(token)
+        key = token_hash(token)
+        self.revocations.revoke_token(key, float(claims["exp"]))
+        self.cache.discard(key)
+
+    def revoke_user(self, user_id: str) -> None:
+        """Revoke every token issued to a user so far (e.g. on password change)."""
+        self.revocations.revoke_user(user_id)
+
+
+class FailedLoginLimiter:
+    """
+    Counts failed logins per email and per client IP in memory, so locked-out attempts are
+    refused before touching the database or bcrypt.
+    """
+    _instance = None
+    _lock = Lock()
+    # Per-IP allowance is a multiple of the per-email one (shared NATs, many accounts)
+    IP_FAILURE_MULTIPLIER = 4
+    MAX_TRACKED_KEYS = 100000
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(FailedLoginLimiter, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "failures"):  # Prevent reinitialization
+            self.max_failures = int(os.getenv(EnvKeys.LOGIN_MAX_FAILURES.value, "5"))
+            self.window_seconds = int(os.getenv(EnvKeys.LOGIN_FAILURE_WINDOW_SECONDS.value, "300"))
+            self.failures: "OrderedDict[str, List[float]]" = OrderedDict()
+            self.failures_lock = Lock()
+
+    def _keys(self, email: str, client_ip: str) -> List[Tuple[str, int]]:
+        return [
+            (f"email:{email.strip().lower()}", self.max_failures),
+            (f"ip:{client_ip}", self.max_failures * self.IP_FAILURE_MULTIPLIER)
+        ]
+
+    def _recent(self, key: str, now: float) -> List[float]:
+        attempts = [at for at in self.failures.get(key, []) if at > now - self.window_seconds]
+        if attempts:
+            self.failures[key] = attempts
+        else:
+            self.failures.pop(key, None)
+        return attempts
+
+    def check(self, email: str, client_ip: str) -> float:
+        """
+        Raise 429 if either the email or the client IP is locked out, else reserve one attempt
+        against both and return its timestamp. The reservation counts as a failure until
+        release() is called, so a concurrent burst can't get more than the limit past this check.
+        """
+        now = time.time()
+        keys = self._keys(email, client_ip)
+        with self.failures_lock:
+            for key, limit in keys:
+                attempts = self._recent(key, now)
+                if len(attempts) >= limit:
+                    retry_after = int(attempts[0] + self.window_seconds - now) + 1
+                    raise HTTPException(
+                        status_code=429,
+                        detail="Too many failed login attempts",
+                        headers={"Retry-After": str(retry_after)}
+                    )
+            for key, _ in keys:
+                self.failures.setdefault(key, []).append(now)
+                self.failures.move_to_end(key)
+            while len(self.failures) > self.MAX_TRACKED_KEYS:
+                self.failures.popitem(last=False)
+        return now
+
+    def release(self, email: str, client_ip: str, reserved_at: float) -> None:
+        """Give back an attempt reserved by check() that didn't fail on the credentials."""
+        with self.failures_lock:
+            for key, _ in self._keys(email, client_ip):
+                attempts = self.failures.get(key)
+                if attempts and reserved_at in attempts:
+                    attempts.remove(reserved_at)
+                    if not attempts:
+                        self.failures.pop(key, None)
+
+    def reset(self, email: str) -> None:
+        """Clear an email's failures after a successful login (the IP counter keeps its history)."""
+        with self.failures_lock:
+            self.failures.pop(self._keys(email, "")[0][0], None)
+
+
+async def get_current_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Dict:
+    """Dependency for routes that always require a bearer token."""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return TokenVerifier().verify(credentials.credentials)
+
+
+def _authorize_tenant(user_id: Optional[str], credentials: Optional[HTTPAuthorizationCredentials]) -> str:
+    verifier = TokenVerifier()
+    if credentials is not None:
+        token_user_id = verifier.verify(credentials.credentials)["sub"]
+        if user_id and user_id != token_user_id:
+            raise HTTPException(status_code=403, detail="user_id does not match the authenticated user")
+        user_id = token_user_id
+    elif verifier.auth_required:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    elif not user_id:
+        raise HTTPException(status_code=422, detail="user_id is required")
+    # Queries of this request that don't name a tenant go to this tenant's shard
+    set_request_tenant(user_id)
+    return user_id
+
+
+async def resolve_user_id(
+    user_id: Optional[str] = Query(None, description="Tenant ID; taken from the bearer token when one is sent"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> str:
+    """
+    Resolve the tenant for a request.
+
+    With a bearer token the user ID comes from its `sub` claim (a different `user_id`
+    query parameter is rejected). Without one, the legacy `user_id` query parameter is
+    accepted unless AUTH_REQUIRED is enabled.
+    """
+    return _authorize_tenant(user_id, credentials)
+
+
+async def resolve_token_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> str:
+    """Resolve the tenant from the bearer token alone, for routes that never accept the legacy `user_id` parameter."""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return _authorize_tenant(None, credentials)
+
+
+async def resolve_path_user_id(
+    user_id: str = Path(..., description="ID of the user; must be the bearer token's `sub` when one is sent"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> str:
+    """Resolve the tenant for a `/user/{user_id}` route: the same rules as resolve_user_id, for the path parameter."""
+    return _authorize_tenant(user_id, credentials)
+
+
+def check_body_user_id(body_user_id: Optional[str], user_id: str) -> None:
+    """Reject a request body naming a different tenant than the one the request resolved to."""
+    if body_user_id and body_user_id != user_id:
+        raise HTTPException(status_code=403, detail="user_id does not match the authenticated user")
+
+
+AuthorizedUserId = Annotated[str, Depends(resolve_user_id)]
+AuthorizedPathUserId = Annotated[str, Depends(resolve_path_user_id)]
+TokenUserId = Annotated[str, Depends(resolve_token_user_id)]
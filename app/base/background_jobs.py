@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from threading import Lock
+from typing import Callable, Dict, List
+
+
+class BackgroundJobs:
+    """Runs registered maintenance callables at a fixed interval on the event loop."""
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(BackgroundJobs, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "jobs"):  # Prevent reinitialization
+            self.jobs: List[Dict] = []
+            self.tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, func: Callable[[], None], interval_seconds: int) -> None:
+        """Register a blocking callable to be run every `interval_seconds` in a worker thread."""
+        if interval_seconds <= 0:
+            logging.info(f"Background job '{name}' disabled (interval <= 0).")
+            return
+        self.jobs.append({"name": name, "func": func, "interval_seconds": interval_seconds})
+
+    async def _run_periodically(self, name: str, func: Callable[[], None], interval_seconds: int) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                # Jobs talk to the database synchronously; keep them off the event loop
+                await asyncio.to_thread(func)
+            except Exception as e:
+                logging.error(f"Background job '{name}' failed: {e}")
+
+    async def start(self) -> None:
+        """Start all registered jobs. Used as a FastAPI startup handler."""
+        for job in self.jobs:
+            task = asyncio.create_task(
+                self._run_periodically(job["name"], job["func"], job["interval_seconds"])
+            )
+            self.tasks.append(task)
+            logging.info(f"Background job '{job['name']}' scheduled every {job['interval_seconds']}s.")
+
+    async def stop(self) -> None:
+        """Cancel all running jobs. Used as a FastAPI shutdown handler."""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
@@ -0,0 +1,142 @@
+import gzip
+import logging
+import os
+import re
+from typing import List, Optional, Tuple
+from fastapi import FastAPI
+from app.enums.env_keys import EnvKeys
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+# Content types worth compressing; images, archives and event streams are left alone
+COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/javascript", b"application/xml")
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4  # Fast enough for per-request compression of dynamic JSON
+# Appended to a strong ETag per encoding, since the compressed bytes are a different representation
+ETAG_SUFFIXES = {"br": "-br", "gzip": "-gzip"}
+
+_ETAG_SUFFIX_PATTERN = re.compile(r'-(?:br|gzip)"')
+
+
+def choose_encoding(accept_encoding: str, available: Tuple[str, ...]) -> Optional[str]:
+    """Best encoding the client accepts (q > 0), preferring the order of `available`."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding] = quality
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compresses complete response bodies of at least `minimum_size` bytes with brotli (when
+    installed) or gzip. Streaming responses pass through untouched, so SSE and large
+    downloads keep flushing as they are produced.
+    """
+
+    def __init__(self, app, minimum_size: int = 1000):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.available = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    @staticmethod
+    def _compress(body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    @staticmethod
+    def _strip_etag_suffixes(scope) -> Optional[str]:
+        """Let handlers compare If-None-Match against the identity ETag; returns the suffix removed."""
+        removed = None
+        headers = []
+        for key, value in scope["headers"]:
+            if key == b"if-none-match":
+                decoded = value.decode("latin-1")
+                match = _ETAG_SUFFIX_PATTERN.search(decoded)
+                if match:
+                    removed = match.group(0)[:-1]
+                    value = _ETAG_SUFFIX_PATTERN.sub('"', decoded).encode("latin-1")
+            headers.append((key, value))
+        scope["headers"] = headers
+        return removed
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_headers = dict(scope["headers"])
+        encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"), self.available)
+        if_none_match_suffix = self._strip_etag_suffixes(scope) if b"if-none-match" in request_headers else None
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held back until the first body message shows whether this is a complete body
+                start_message = message
+                if message["status"] == 304 and if_none_match_suffix:
+                    self._suffix_etag(message["headers"], if_none_match_suffix)
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                return await send(message)
+
+            start, start_message = start_message, None
+            headers: List[Tuple[bytes, bytes]] = list(start.get("headers", []))
+            body = message.get("body", b"")
+            if self._should_compress(headers, body, message.get("more_body", False), encoding):
+                body = self._compress(body, encoding)
+                headers = [(k, v) for k, v in headers if k not in (b"content-length", b"content-encoding")]
+                headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode())
+                ]
+                self._suffix_etag(headers, ETAG_SUFFIXES[encoding])
+                message = {**message, "body": body}
+            if self._is_compressible_type(headers):
+                headers.append((b"vary", b"Accept-Encoding"))
+            await send({**start, "headers": headers})
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, headers, body: bytes, more_body: bool, encoding: Optional[str]) -> bool:
+        if encoding is None or more_body or len(body) < self.minimum_size:
+            return False
+        if any(key == b"content-encoding" for key, _ in headers):
+            return False
+        return self._is_compressible_type(headers)
+
+    @staticmethod
+    def _is_compressible_type(headers) -> bool:
+        content_type = next((value for key, value in headers if key == b"content-type"), b"")
+        return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(b"text/event-stream")
+
+    @staticmethod
+    def _suffix_etag(headers: List[Tuple[bytes, bytes]], suffix: str) -> None:
+        for index, (key, value) in enumerate(headers):
+            if key == b"etag" and value.endswith(b'"') and not value.startswith(b"W/"):
+                headers[index] = (key, value[:-1] + suffix.encode() + b'"')
+
+
+class InitCompression:
+    def __init__(self, app: FastAPI):
+        minimum_size = int(os.getenv(EnvKeys.COMPRESSION_MINIMUM_SIZE.value, "1000"))
+        if minimum_size <= 0:
+            return
+        app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+        logging.info("Response compression enabled (%s).", "brotli, gzip" if brotli is not None else "gzip")
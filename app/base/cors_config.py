@@ -18,4 +18,5 @@ class InitCORS:
             allow_credentials=True,
             allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
             allow_headers=["*"],
+            expose_headers=["ETag"],
         )
\ No newline at end of file
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException
+from app.constants.app_constants import AppConstants
+from app.databases.database_backend import get_database_manager
+from app.databases.sqlite_database_manager import SQLiteManager
+from app.enums.env_keys import EnvKeys
+
+# Reconnect delay after the listener connection drops
+RECONNECT_DELAY_SECONDS = 2.0
+# SSE `retry:` hint for browsers' EventSource reconnects
+CLIENT_RETRY_MILLISECONDS = 5000
+
+
+def event_key(event: Dict) -> str:
+    """Events with the same key describe the same object, so only the latest needs delivering."""
+    return f"{event.get('event')}:{event.get('product_id') or event.get('invoice_id')}"
+
+
+def format_sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class LiveEventSubscriber:
+    """
+    Pending events for one client. Events are coalesced by object, so a slow client gets the
+    latest state of each product/invoice instead of a growing backlog; past `max_pending`
+    distinct objects it is told to resync (refetch) instead.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, Dict]" = OrderedDict()
+        self.wakeup = asyncio.Event()
+        self.resync = False
+
+    def publish(self, event: Dict) -> None:
+        key = event_key(event)
+        self.pending.pop(key, None)
+        self.pending[key] = event
+        if len(self.pending) > self.max_pending:
+            self.request_resync()
+        self.wakeup.set()
+
+    def request_resync(self) -> None:
+        self.pending.clear()
+        self.resync = True
+        self.wakeup.set()
+
+    async def next_batch(self, timeout: float) -> Tuple[List[Dict], bool]:
+        """Wait up to `timeout` for events; returns (events, resync needed)."""
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return [], False
+        self.wakeup.clear()
+        events = list(self.pending.values())
+        self.pending.clear()
+        resync, self.resync = self.resync, False
+        return events, resync
+
+
+class LiveEventBroker:
+    """
+    Per-worker fan-out of the database's NOTIFY events: one LISTEN connection per shard (a
+    tenant's events are sent on its own shard), read on the event loop, dispatched to every
+    subscriber of the event's tenant.
+    """
+    _instance = None
+    _lock = Lock()
+    MAX_SUBSCRIBERS_PER_TENANT = 20
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(LiveEventBroker, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "subscribers"):  # Prevent reinitialization
+            self.subscribers: Dict[str, Set[LiveEventSubscriber]] = {}
+            self.max_pending = int(os.getenv(EnvKeys.EVENT_STREAM_MAX_PENDING.value, "1000"))
+            self.heartbeat_seconds = float(os.getenv(EnvKeys.EVENT_STREAM_HEARTBEAT_SECONDS.value, "15"))
+            self.connections: List = []
+            self.listening_in_process = False
+            self.connect_lock: Optional[asyncio.Lock] = None
+
+    async def _ensure_listening(self) -> None:
+        if self.connections or self.listening_in_process:
+            return
+        db = get_database_manager()
+        if isinstance(db, SQLiteManager):
+            # No LISTEN: the backend hands committed notifications over within this process
+            loop = asyncio.get_running_loop()
+            db.listen(AppConstants.LIVE_EVENTS_CHANNEL, lambda payload: loop.call_soon_threadsafe(self.dispatch, payload))
+            self.listening_in_process = True
+            return
+        if self.connect_lock is None:
+            self.connect_lock = asyncio.Lock()
+        async with self.connect_lock:
+            if self.connections:
+                return
+            connections = await asyncio.to_thread(self._connect)
+            for connection in connections:
+                asyncio.get_running_loop().add_reader(
+                    connection.dbapi_connection.fileno(), self._on_readable, connection
+                )
+            self.connections = connections
+            logging.info("Listening for live events on '%s'.", AppConstants.LIVE_EVENTS_CHANNEL)
+
+    @staticmethod
+    def _connect() -> List:
+        connections = []
+        try:
+            for engine in get_database_manager().all_engines():
+                connection = engine.raw_connection()
+                connection.detach()  # Dedicated to LISTEN, never handed back to the pool
+                connections.append(connection)
+                connection.dbapi_connection.autocommit = True
+                with connection.dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {AppConstants.LIVE_EVENTS_CHANNEL}")
+        except Exception:
+            for connection in connections:
+                connection.close()
+            raise
+        return connections
+
+    def _on_readable(self, connection) -> None:
+        dbapi_connection = connection.dbapi_connection
+        try:
+            dbapi_connection.poll()
+        except Exception as e:
+            logging.error("Live event listener connection lost: %s", e)
+            self._close()
+            # Anything sent while disconnected is lost; clients refetch once it's back
+            for subscribers in self.subscribers.values():
+                for subscriber in subscribers:
+                    subscriber.request_resync()
+            asyncio.get_running_loop().call_later(RECONNECT_DELAY_SECONDS, self._schedule_reconnect)
+            return
+        while dbapi_connection.notifies:
+            self.dispatch(dbapi_connection.notifies.pop(0).payload)
+
+    def _schedule_reconnect(self) -> None:
+        if self.subscribers and not self.connections:
+            task = asyncio.ensure_future(self._ensure_listening())
+            task.add_done_callback(self._on_reconnect_done)
+
+    def _on_reconnect_done(self, task: asyncio.Task) -> None:
+        if task.exception() is not None:
+            logging.error("Live event listener reconnect failed: %s", task.exception())
+            asyncio.get_running_loop().call_later(RECONNECT_DELAY_SECONDS, self._schedule_reconnect)
+
+    def _close(self) -> None:
+        connections, self.connections = self.connections, []
+        for connection in connections:
+            try:
+                asyncio.get_running_loop().remove_reader(connection.dbapi_connection.fileno())
+            except Exception:
+                pass  # Socket already gone
+            try:
+                connection.close()
+            except Exception as e:
+                logging.debug("Closing live event listener failed: %s", e)
+
+    async def stop(self) -> None:
+        """Close the listener connections. Used as a FastAPI shutdown handler."""
+        self._close()
+
+    def dispatch(self, payload: str) -> None:
+        """Deliver one NOTIFY payload to the subscribers of its tenant."""
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logging.warning("Ignoring malformed live event payload: %s", payload[:200])
+            return
+        for subscriber in self.subscribers.get(event.pop("user_id", None), ()):
+            subscriber.publish(event)
+
+    async def subscribe(self, user_id: str) -> LiveEventSubscriber:
+        subscribers = self.subscribers.get(user_id, set())
+        if len(subscribers) >= self.MAX_SUBSCRIBERS_PER_TENANT:
+            raise HTTPException(status_code=429, detail="Too many open event streams")
+        await self._ensure_listening()
+        subscriber = LiveEventSubscriber(self.max_pending)
+        self.subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id: str, subscriber: LiveEventSubscriber) -> None:
+        subscribers = self.subscribers.get(user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self.subscribers[user_id]
+
+    async def stream(self, user_id: str, subscriber: LiveEventSubscriber) -> AsyncIterator[str]:
+        """SSE body for one subscriber; heartbeats keep idle proxies from closing it."""
+        try:
+            yield f"retry: {CLIENT_RETRY_MILLISECONDS}\n\n"
+            yield format_sse("ready", {})
+            while True:
+                events, resync = await subscriber.next_batch(self.heartbeat_seconds)
+                if resync:
+                    yield format_sse("resync", {})
+                for event in events:
+                    # The dict is shared with the tenant's other subscribers, so it isn't modified
+                    yield format_sse(event["event"], {key: value for key, value in event.items() if key != "event"})
+                if not events and not resync:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(user_id, subscriber)
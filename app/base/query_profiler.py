@@ -0,0 +1,175 @@
+import contextvars
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, List, Optional
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Response headers exposed outside production
+QUERY_COUNT_HEADER = "X-Query-Count"
+QUERY_TIME_HEADER = "X-Query-Time-Ms"
+QUERY_REPEAT_HEADER = "X-Query-Max-Repeat"
+# Same statement shape this many times in one request is reported as a likely N+1
+REPEAT_WARNING_THRESHOLD = 3
+
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+_current_stats: contextvars.ContextVar[Optional["QueryStats"]] = contextvars.ContextVar(
+    "query_stats", default=None
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    """Statement with literals and whitespace normalized, so the same query in a loop has one shape."""
+    return _WHITESPACE_PATTERN.sub(" ", _LITERAL_PATTERN.sub("?", statement)).strip()
+
+
+class QueryStats:
+    """Statements and DB time recorded for one request (or one `query_budget` block)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def max_repeat(self) -> int:
+        return max(self.shapes.values(), default=0)
+
+    def repeated_shapes(self, threshold: int = REPEAT_WARNING_THRESHOLD) -> dict:
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+class QueryProfiler:
+    """Counts statements and DB time through engine events, attributed to the current request context."""
+
+    _instrumented_engines = set()
+
+    @staticmethod
+    def install(engine: Engine) -> None:
+        if id(engine) in QueryProfiler._instrumented_engines:
+            return
+        event.listen(engine, "before_cursor_execute", QueryProfiler._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", QueryProfiler._after_cursor_execute)
+        event.listen(engine, "handle_error", QueryProfiler._handle_error)
+        QueryProfiler._instrumented_engines.add(id(engine))
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_stats.get() is not None:
+            conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        if stats is None or not conn.info.get("query_start_time"):
+            return
+        stats.record(statement, time.perf_counter() - conn.info["query_start_time"].pop())
+
+    @staticmethod
+    def _handle_error(context) -> None:
+        # A failed statement never reaches after_cursor_execute: take its start time off the stack here
+        conn = context.connection
+        if conn is None or not conn.info.get("query_start_time"):
+            return
+        started = conn.info["query_start_time"].pop()
+        stats = _current_stats.get()
+        if stats is not None and context.statement:
+            stats.record(context.statement, time.perf_counter() - started)
+
+    @staticmethod
+    @contextmanager
+    def collect() -> Iterator[QueryStats]:
+        """Record every statement executed in this context into a fresh QueryStats."""
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            _current_stats.reset(token)
+
+
+class QueryProfilerMiddleware:
+    """ASGI middleware adding per-request query headers and logging likely N+1 patterns."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with QueryProfiler.collect() as stats:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start":
+                    message.setdefault("headers", []).extend([
+                        (QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()),
+                        (QUERY_TIME_HEADER.lower().encode(), f"{stats.total_seconds * 1000:.2f}".encode()),
+                        (QUERY_REPEAT_HEADER.lower().encode(), str(stats.max_repeat()).encode())
+                    ])
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
+
+        for shape, count in stats.repeated_shapes().items():
+            logging.warning(
+                "Possible N+1: %s %s ran the same statement %s times: %s",
+                scope["method"], scope["path"], count, shape[:200]
+            )
+
+
+class InitQueryProfiler:
+    def __init__(self, app: FastAPI, engines: List[Engine], environment: Optional[str]):
+        # Production pays nothing: no listeners, no middleware
+        if (environment or "").upper() == "PROD":
+            return
+        # Every engine, not just the primary: reads routed to a replica or shard count too
+        for engine in engines:
+            QueryProfiler.install(engine)
+        app.add_middleware(QueryProfilerMiddleware)
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeat: Optional[int] = None) -> Iterator[QueryStats]:
+    """
+    Fail if the enclosed block issues more than `max_queries` statements (or repeats one shape
+    more than `max_repeat` times). For controller-level checks; use `assert_query_budget` for endpoints.
+    """
+    with QueryProfiler.collect() as stats:
+        yield stats
+    _check_budget(stats.count, stats.max_repeat(), max_queries, max_repeat, stats.repeated_shapes(2))
+
+
+def assert_query_budget(response, max_queries: int, max_repeat: Optional[int] = None) -> None:
+    """Check an endpoint response (TestClient/httpx) against a query budget using the profiler headers."""
+    if QUERY_COUNT_HEADER not in response.headers:
+        raise QueryBudgetExceeded("Response has no query headers; is the profiler installed (non-PROD)?")
+    _check_budget(
+        int(response.headers[QUERY_COUNT_HEADER]),
+        int(response.headers[QUERY_REPEAT_HEADER]),
+        max_queries,
+        max_repeat,
+        {}
+    )
+
+
+def _check_budget(count: int, repeat: int, max_queries: int, max_repeat: Optional[int], repeated: dict) -> None:
+    if count > max_queries:
+        raise QueryBudgetExceeded(f"{count} queries issued, budget is {max_queries}. Repeated: {repeated}")
+    if max_repeat is not None and repeat > max_repeat:
+        raise QueryBudgetExceeded(f"A statement ran {repeat} times, budget is {max_repeat}. Repeated: {repeated}")
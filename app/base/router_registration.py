@@ -8,6 +8,9 @@ from app.routers.user_route import UserRouter
 from app.routers.order_route import OrderRouter
 from app.routers.product_route import ProductRouter
 from app.routers.payment_route import PaymentRouter
+from app.routers.analytics_route import AnalyticsRouter
+from app.routers.sync_route import SyncRouter
+from app.routers.live_events_route import LiveEventsRouter
 
 class RouterRegistration:
     def __init__(self, app: FastAPI):
@@ -20,6 +23,9 @@ class RouterRegistration:
         order_router = OrderRouter()
         product_router = ProductRouter()
         payment_router = PaymentRouter()
+        analytics_router = AnalyticsRouter()
+        sync_router = SyncRouter()
+        live_events_router = LiveEventsRouter()
 
         app.include_router(docs_router.router)
         app.include_router(test_router.router)
@@ -31,4 +37,7 @@ class RouterRegistration:
         app.include_router(order_router.router)
         app.include_router(product_router.router)
         app.include_router(payment_router.router)
+        app.include_router(analytics_router.router)
+        app.include_router(sync_router.router)
+        app.include_router(live_events_router.router)
 
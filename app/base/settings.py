@@ -4,6 +4,7 @@ import os
 from dotenv import load_dotenv
 from app.utils.utility_manager import UtilityManager
 from app.enums.env_keys import EnvKeys
+from app.base.log_pipeline import JsonFormatter, LogPipeline
 
 class Settings(UtilityManager):
     
@@ -22,6 +23,13 @@ class Settings(UtilityManager):
             self.APP_HOST = self.get_env_variable(EnvKeys.APP_HOST.value)
             self.APP_PORT = int(self.get_env_variable(EnvKeys.APP_PORT.value))
             self.APP_ENVIRONMENT = self.get_env_variable(EnvKeys.APP_ENVIRONMENT.value)
+            self.STOCK_SNAPSHOT_INTERVAL_SECONDS = int(os.getenv(EnvKeys.STOCK_SNAPSHOT_INTERVAL_SECONDS.value, '300'))
+            self.STOCK_SNAPSHOT_FENCE_TIMEOUT_SECONDS = float(os.getenv(EnvKeys.STOCK_SNAPSHOT_FENCE_TIMEOUT_SECONDS.value, '2'))
+            self.DATABASE_BACKEND = os.getenv(EnvKeys.DATABASE_BACKEND.value, 'postgres').lower()
+            self.TABLE_PARTITIONING = os.getenv(EnvKeys.TABLE_PARTITIONING.value, 'False').lower() in ('true', '1', 'yes')
+            self.INVOICE_ARCHIVE_INTERVAL_SECONDS = int(os.getenv(EnvKeys.INVOICE_ARCHIVE_INTERVAL_SECONDS.value, '0'))
+            self.INVOICE_ARCHIVE_AFTER_DAYS = int(os.getenv(EnvKeys.INVOICE_ARCHIVE_AFTER_DAYS.value, '365'))
+            self.INVOICE_ARCHIVE_BATCH_SIZE = int(os.getenv(EnvKeys.INVOICE_ARCHIVE_BATCH_SIZE.value, '500'))
             fmt = self.get_env_variable(EnvKeys.APP_LOGGING_FORMATTER.value)
             level = self.get_env_variable(EnvKeys.APP_LOGGING_LEVEL.value)
             log_folder = self.get_env_variable(EnvKeys.APP_LOGGING_FOLDER.value)
@@ -35,26 +43,25 @@ class Settings(UtilityManager):
             self.create_folder(folder_path=log_folder_path)
             
             log_file_path = f'{log_folder}/{log_file}'
-            logging.getLogger().handlers.clear()
-            # Ensure logs directory exists
-            logging.basicConfig(
-                handlers=[logging.handlers.RotatingFileHandler(
-                     log_file_path,
-                    maxBytes=max_byte,
-                    backupCount=backup_count)  
-                ],
-                level=level,
-                format=fmt,
-                datefmt=date_format,
+            # Structured JSON records on disk
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file_path,
+                maxBytes=max_byte,
+                backupCount=backup_count
             )
+            file_handler.setFormatter(JsonFormatter())
             # set up logging to console
             console = logging.StreamHandler()
             console.setLevel(level=level)
             # set a format which is simpler for console use
-            formatter = logging.Formatter(fmt)
-            console.setFormatter(formatter)
-            # add the handler to the root logger
-            logging.getLogger('').addHandler(console)
+            console.setFormatter(logging.Formatter(fmt, datefmt=date_format))
+            # Both handlers run on the queue listener thread, never on the event loop
+            self.LOGGING_DEBUG_SAMPLE_RATE = float(os.getenv(EnvKeys.APP_LOGGING_DEBUG_SAMPLE_RATE.value, '1.0'))
+            LogPipeline().start(
+                handlers=[file_handler, console],
+                level=level,
+                debug_sample_rate=self.LOGGING_DEBUG_SAMPLE_RATE
+            )
             logging.info("Logging Configuration Set.")
             logging.getLogger('watchfiles').setLevel(logging.ERROR)
     
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import logging
+import os
+from fastapi import FastAPI
+from app.databases.unit_of_work import UnitOfWork, unit_of_work_scope
+from app.enums.env_keys import EnvKeys
+from app.models.response_model import ResponseModel
+
+
+class UnitOfWorkMiddleware:
+    """
+    Runs each request in a UnitOfWork. It is committed when the response starts if the
+    status is below 400 and rolled back otherwise, so a client never sees a success that
+    wasn't committed. Streaming responses commit before their first chunk; statements
+    issued while streaming run in their own transactions.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        unit_of_work = UnitOfWork()
+        failed = False
+
+        async def send_after_commit(message):
+            nonlocal failed
+            if failed:
+                return
+            if message["type"] == "http.response.start" and not unit_of_work.finished:
+                try:
+                    # Off the event loop: the commit waits on the database, and must not wait on the loop
+                    await asyncio.to_thread(unit_of_work.finish, message["status"] < 400)
+                except Exception as e:
+                    logging.exception("Committing the request's unit of work failed")
+                    failed = True
+                    await self._send_commit_error(send, e)
+                    return
+            await send(message)
+
+        with unit_of_work_scope(unit_of_work):
+            try:
+                await self.app(scope, receive, send_after_commit)
+            finally:
+                if not unit_of_work.finished:
+                    # No response was started (the app raised): nothing of this request is kept
+                    await asyncio.to_thread(unit_of_work.finish, False)
+
+    @staticmethod
+    async def _send_commit_error(send, error: Exception) -> None:
+        response_model = ResponseModel(
+            message="The request could not be committed",
+            error=str(error),
+            status=ResponseModel.FAILED,
+            status_code=500,
+            data=[]
+        )
+        body = json.dumps(response_model.model_dump()).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 500,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class InitUnitOfWork:
+    def __init__(self, app: FastAPI):
+        if os.getenv(EnvKeys.REQUEST_UNIT_OF_WORK.value, "True").lower() not in ("true", "1", "yes"):
+            return
+        app.add_middleware(UnitOfWorkMiddleware)
+        logging.info("Request-scoped unit of work enabled.")
@@ -1,5 +1,7 @@
 class AppConstants:
     STATIC = "static"
+    # NOTIFY channel carrying every tenant's live stock/invoice events (payloads include user_id)
+    LIVE_EVENTS_CHANNEL = "live_events"
     
     GET_TABLE_SCHEMA_QUERY = """
     SELECT * FROM {} ORDER BY RANDOM() LIMIT 5;
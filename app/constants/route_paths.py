@@ -5,6 +5,7 @@ class RoutePaths:
     
     TESTS = "/tests"
     LOGIN = "/login"
+    LOGOUT = "/logout"
     DOCS = "/docs"
     STATIC = "/static"
     PING = "/api/v1/health"
@@ -15,14 +16,25 @@ class RoutePaths:
     PRODUCT = "/product"
     PRODUCT_WITH_ID = "/product/{product_id}"
     PRODUCT_STOCK = "/product/stock"
+    PRODUCT_STOCK_LEVEL = "/product/{product_id}/stock"
+    PRODUCT_STOCK_MOVEMENTS = "/product/{product_id}/stock/movements"
     ORDER = "/order"
     ORDER_WITH_ID = "/order/{order_id}"
     ORDER_BY_CUSTOMER = "/order/by-customer/{customer_id}"
+    ORDER_SEARCH = "/order/search"
+    ORDER_EXPORT = "/order/export"
     INVOICE = "/invoice"
     INVOICE_WITH_ID = "/invoice/{invoice_id}"
     INVOICE_BY_NUMBER = "/invoice/{invoice_number}"
     INVOICE_BY_CUSTOMER = "/invoice/by-customer/{customer_id}"
+    INVOICE_SEARCH = "/invoice/search"
     INVOICE_ORDERS = "/invoice/by-order/"
     PAYMENT = "/payment"
     PAYMENT_WITH_ID = "/payment/{payment_id}"
     PAYMENT_BY_INVOICE = "/invoices/{invoice_id}/payments"
+    ANALYTICS_DAILY_SALES = "/analytics/sales/daily"
+    ANALYTICS_SALES_BY_PRODUCT = "/analytics/sales/by-product"
+    ANALYTICS_SALES_BY_CUSTOMER = "/analytics/sales/by-customer"
+    ANALYTICS_RECEIVABLES = "/analytics/receivables"
+    SYNC = "/sync"
+    LIVE_EVENTS = "/events"
@@ -10,4 +10,7 @@ class RouteTags:
     PRODUCT = "Product"
     ORDER = "Order"
     INVOICE = "Invoice"
-    PAYMENT = "Payment"
\ No newline at end of file
+    PAYMENT = "Payment"
+    ANALYTICS = "Analytics"
+    SYNC = "Sync"
+    LIVE_EVENTS = "Live Events"
\ No newline at end of file
@@ -1,18 +1,73 @@
 from fastapi import HTTPException
-from app.databases.postgres_database_manager import PostgreSQLManager
-from sqlalchemy import text
+from app.databases.database_backend import get_database_manager
+from app.databases.column_types import typed_text
+from sqlalchemy.exc import OperationalError
 from typing import Optional
-from datetime import datetime , date
+from datetime import datetime , date, timedelta
+from decimal import Decimal
+import base64
 import json
 import logging
-from typing import List, Any, Dict, Optional, Union, Tuple
+import os
+from functools import lru_cache
+import pandas as pd
+from typing import Iterator, List, Any, Dict, Optional, Union, Tuple
 from app.utils.utility_manager import UtilityManager
 from app.utils.invoice_number_generator import generate_invoice_number
-
+from app.utils.generate_uuid import uuid7_datetime
+from app.enums.stock_movement_reasons import StockMovementReason
+from app.enums.change_resources import ChangeResource
+from app.enums.live_event_types import LiveEventType
+from app.enums.result_modes import ResultMode
+from app.constants.app_constants import AppConstants
+from app.databases.invoice_archive import InvoiceArchive
+from app.databases.replica_router import pin_to_primary
+from app.databases.shard_router import DEFAULT_SHARD, route_by_tenant, shard_scope, tenant_scope
+from app.databases.result_shaping import shape_result
+from app.databases.unit_of_work import after_commit, outside_unit_of_work
+
+# Synced resources: table and primary key column stamped with the tenant sync version
+SYNC_TABLES = {
+    ChangeResource.PRODUCTS: ("products", "product_id"),
+    ChangeResource.CUSTOMERS: ("customers", "customer_id")
+}
+
+# On-hand quantity of products row `p`: the quantity compacted into the row (see compact_stock_snapshots)
+# plus the journal after it. Stock writes only append to the journal, so a popular product's row is
+# not a point of contention; products are always read through PRODUCT_COLUMNS.
+ON_HAND_QUANTITY = """p.quantity + COALESCE((
+    SELECT SUM(m.quantity_delta) FROM stock_movements m
+    WHERE m.user_id = p.user_id AND m.product_id = p.product_id AND m.movement_id > p.stock_through_movement_id
+), 0)"""
+PRODUCT_COLUMNS = f"""p.product_id, p.user_id, p.product, p.weight, p.batch_number, p.expiry_date,
+    {ON_HAND_QUANTITY} AS quantity, p.mrp, p.distributer_landing, p.selling_price, p.change_version"""
+PRODUCT_QUERY = f"SELECT {PRODUCT_COLUMNS} FROM products p WHERE p.product_id = :product_id AND p.user_id = :user_id"
+
+# Columns of an order export (see export_orders), in file order
+EXPORT_ORDER_COLUMNS = (
+    "order_id", "order_date", "invoice_id", "customer_id", "product_id", "quantity", "rate", "amount", "created_by_name"
+)
+
+# Slack around the creation time embedded in a UUIDv7 key when bounding the date columns:
+# those are server-local TIMESTAMPs set at transaction start, the key's time is UTC
+KEY_DATE_MARGIN = timedelta(days=1)
+
+
+@lru_cache(maxsize=1)
+def dummy_password_hash() -> str:
+    """
+    bcrypt hash of a random, discarded secret at the configured BCRYPT_ROUNDS; checked against
+    when the email is unknown, so that costs the same as checking a real user's hash.
+    """
+    return UtilityManager().hash_password(os.urandom(32).hex())
+
+
+@route_by_tenant
 class DatabaseController(UtilityManager):
     def __init__(self):
-        self.db = PostgreSQLManager()
+        self.db = get_database_manager()
         self.db.create_tables()
+        dummy_password_hash()  # Made at startup, not on the first unknown-email login
 
     # ====== User Management Methods ======
 
@@ -72,12 +127,15 @@ class DatabaseController(UtilityManager):
         }
 
         user = self.db.execute_query(query, params, fetch_one=True, return_json=return_json)
+        if self.db.shards:
+            self.db.shards.assign(user_id)
+            self._mirror_user(user_id)
         return user
 
     def get_user(self, user_id: str, return_json: Optional[bool] = False) -> Dict:
         """Retrieve a user by ID"""
         query = "SELECT * FROM users WHERE user_id = :id"
-        user = self.db.execute_query(query, params={"id": user_id}, fetch_one=True, return_json=return_json)
+        user = self.db.execute_query(query, params={"id": user_id}, fetch_one=True, return_json=return_json, read_only=True)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         return user
@@ -119,42 +177,79 @@ class DatabaseController(UtilityManager):
                     addressline1, addressline2, landmark, city, state, pincode, country;"""
         updates["id"] = user_id
 
-        user = self.db.execute_query(query, params=updates, fetch_one=True, return_json=return_json)
+        with shard_scope(DEFAULT_SHARD):
+            user = self.db.execute_query(query, params=updates, fetch_one=True, return_json=return_json)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        self._mirror_user(user_id)
         return user
 
     def delete_user(self, user_id: str) -> None:
         """Delete a user"""
         query = "DELETE FROM users WHERE user_id = :user_id RETURNING user_id;"
-        result = self.db.execute_query(query, params={"id": user_id}, fetch_one=False)
+        with shard_scope(DEFAULT_SHARD):
+            result = self.db.execute_query(query, params={"user_id": user_id}, fetch_one=False)
         if not result:
             raise HTTPException(status_code=404, detail="User not found")
+        if self.db.shards:
+            # Removes the mirror, and with it the tenant's rows on its shard
+            self._mirror_user(user_id)
+            self.db.shards.forget(user_id)
 
     def get_all_users(self, return_json: Optional[bool] = False) -> List[Dict]:
         """Fetch all users"""
         query = "SELECT * FROM users"
-        return self.db.execute_query(query, return_json=return_json)
+        return self.db.execute_query(query, return_json=return_json, read_only=True)
     
+    def get_credentials(self, email: str) -> Optional[Dict]:
+        """Fetch only what login needs, through idx_users_email"""
+        query = "SELECT user_id, username, password FROM users WHERE email = :email LIMIT 1"
+        # Not in the request's unit of work: its connection would sit idle in transaction through bcrypt
+        with outside_unit_of_work():
+            return self.db.execute_query(query, params={"email": email}, fetch_one=True, return_json=True)
+
+    def update_password_hash(self, user_id: str, password_hash: str) -> None:
+        """Replace a user's stored password hash"""
+        query = "UPDATE users SET password = :password WHERE user_id = :user_id"
+        with shard_scope(DEFAULT_SHARD):
+            self.db.execute_query(query, params={"password": password_hash, "user_id": user_id})
+        self._mirror_user(user_id)
+
+    def _mirror_user(self, user_id: str) -> None:
+        """Copy a users row of record (default shard) to the tenant's shard, where its rows reference it."""
+        shard = self.db.shards.entry(user_id).shard if self.db.shards else DEFAULT_SHARD
+        if shard == DEFAULT_SHARD:
+            return
+        with shard_scope(DEFAULT_SHARD), self.db.transaction() as conn:
+            user = conn.execute(typed_text("SELECT * FROM users WHERE user_id = :user_id"), {"user_id": user_id}).fetchone()
+        with shard_scope(shard), self.db.transaction() as conn:
+            if user is None:
+                conn.execute(typed_text("DELETE FROM users WHERE user_id = :user_id"), {"user_id": user_id})
+                return
+            columns = list(user._mapping.keys())
+            conn.execute(typed_text(f"""
+            INSERT INTO users ({", ".join(columns)}) VALUES ({", ".join(f":{c}" for c in columns)})
+            ON CONFLICT (user_id) DO UPDATE SET {", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "user_id")}
+            """), dict(user._mapping))
+
     def verify_user(self, email: str, password: str, return_json: bool=False) -> Dict:
-        """Verify user credentials and return user ID if successful."""
-        try:
-            query = "SELECT * FROM users WHERE email = :email"
-            user = self.db.execute_query(query, params={"email": email}, fetch_one=True, return_json=return_json)
-            if user and self.verify_password(password, user['password']):
-                return user
-            
-            raise HTTPException(
-                status_code=500,
-                detail="Invalid credentials"
-            )
-        
-        except Exception as e:
-            logging.error(f"Error verifying user: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to verify user credentials: {str(e)}"
-            )
+        """Verify user credentials and return user_id and username if successful (401 otherwise)."""
+        credentials = self.get_credentials(email)
+        if isinstance(credentials, dict) and "error" in credentials:
+            raise HTTPException(status_code=500, detail="Failed to verify user credentials")
+        if not credentials:
+            # Spend the same bcrypt time as a real check so unknown emails can't be told apart
+            self.verify_password(password, dummy_password_hash())
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        if not self.verify_password(password, credentials["password"]):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+
+        # Upgrade the hash while the plaintext is at hand if BCRYPT_ROUNDS changed
+        if self.password_needs_rehash(credentials["password"]):
+            self.update_password_hash(credentials["user_id"], self.hash_password(password))
+            logging.info("Rehashed password for user %s with the configured bcrypt cost", credentials["user_id"])
+
+        return {"user_id": credentials["user_id"], "username": credentials["username"]}
 
     # ====== Customer Management Methods ======
 
@@ -182,15 +277,20 @@ class DatabaseController(UtilityManager):
             "contact_info": contact_info,
             "address": address
         }
-        customer = self.db.execute_query(query, params, fetch_one=True, return_json=return_json)
-        if not customer:
-            raise HTTPException(status_code=400, detail="Failed to create customer")
-        return customer
-
-    def get_customer(self, customer_id: str, return_json: Optional[bool] = False) -> Dict:
-        """Retrieve a customer by ID"""
-        query = "SELECT * FROM customers WHERE customer_id = :customer_id"
-        customer = self.db.execute_query(query, params={"customer_id": customer_id}, fetch_one=True, return_json=return_json)
+        with self.db.transaction() as conn:
+            customer = conn.execute(typed_text(query), params).fetchone()
+            if not customer:
+                raise HTTPException(status_code=400, detail="Failed to create customer")
+            self._record_sync_changes(conn, user_id, ChangeResource.CUSTOMERS, [customer_id])
+            self._bump_change_versions(conn, user_id, ChangeResource.CUSTOMERS)
+        return dict(customer._mapping) if return_json else customer
+
+    def get_customer(self, customer_id: str, user_id: str, return_json: Optional[bool] = False) -> Dict:
+        """Retrieve a customer by ID and user_id"""
+        query = "SELECT * FROM customers WHERE customer_id = :customer_id AND user_id = :user_id"
+        customer = self.db.execute_query(
+            query, params={"customer_id": customer_id, "user_id": user_id}, fetch_one=True, return_json=return_json, read_only=True
+        )
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         return customer
@@ -198,6 +298,7 @@ class DatabaseController(UtilityManager):
     def update_customer(
         self,
         customer_id: str,
+        user_id: str,
         customer_name: Optional[str] = None,
         phone_number: Optional[str] = None,
         contact_info: Optional[str] = None,
@@ -215,25 +316,33 @@ class DatabaseController(UtilityManager):
             raise HTTPException(status_code=400, detail="No fields to update")
 
         set_clause = ", ".join([f"{k} = :{k}" for k in updates.keys()])
-        query = f"UPDATE customers SET {set_clause} WHERE customer_id = :customer_id RETURNING *;"
+        query = f"UPDATE customers SET {set_clause} WHERE customer_id = :customer_id AND user_id = :user_id RETURNING *;"
         updates["customer_id"] = customer_id
+        updates["user_id"] = user_id
 
-        customer = self.db.execute_query(query, params=updates, fetch_one=True, return_json=return_json)
-        if not customer:
-            raise HTTPException(status_code=404, detail="Customer not found")
-        return customer
+        with self.db.transaction() as conn:
+            customer = conn.execute(typed_text(query), updates).fetchone()
+            if not customer:
+                raise HTTPException(status_code=404, detail="Customer not found")
+            self._record_sync_changes(conn, user_id, ChangeResource.CUSTOMERS, [customer_id])
+            self._bump_change_versions(conn, user_id, ChangeResource.CUSTOMERS)
+        return dict(customer._mapping) if return_json else customer
 
-    def delete_customer(self, customer_id: str) -> None:
+    def delete_customer(self, customer_id: str, user_id: str) -> None:
         """Delete a customer"""
-        query = "DELETE FROM customers WHERE customer_id = :customer_id  RETURNING customer_id;"
-        result = self.db.execute_query(query, params={"customer_id": customer_id}, fetch_one=True)
-        if not result:
-            raise HTTPException(status_code=404, detail="Customer not found")
+        query = "DELETE FROM customers WHERE customer_id = :customer_id AND user_id = :user_id RETURNING customer_id;"
+        with self.db.transaction() as conn:
+            result = conn.execute(typed_text(query), {"customer_id": customer_id, "user_id": user_id}).fetchone()
+            if not result:
+                raise HTTPException(status_code=404, detail="Customer not found")
+            self._record_sync_changes(conn, user_id, ChangeResource.CUSTOMERS, [customer_id], deleted=True)
+            # Orders keep the line but lose the customer (ON DELETE SET NULL)
+            self._bump_change_versions(conn, user_id, ChangeResource.CUSTOMERS, ChangeResource.ORDERS)
 
     def get_all_customers(self, user_id: str, return_json: Optional[bool] = False) -> List[Dict]:
         """Fetch all customers for a user"""
         query = "SELECT * FROM customers WHERE user_id = :user_id"
-        return self.db.execute_query(query, params={"user_id": user_id}, return_json=return_json)
+        return self.db.execute_query(query, params={"user_id": user_id}, return_json=return_json, read_only=True)
 
     # ====== Product Management Methods ======
 
@@ -252,20 +361,23 @@ class DatabaseController(UtilityManager):
     ) -> Dict:
         """Create a new product"""
         product_id = self.generate_uuid()
+        pin_to_primary()  # A user signed up moments ago may not have reached the replicas yet
         user = self.get_user(user_id, return_json=True)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
+        # The opening stock is journaled first, so the row starts out compacted up to it
         query = """
         INSERT INTO products (
             product_id, user_id, product, weight, batch_number, expiry_date, quantity,
-            mrp, distributer_landing, selling_price
+            mrp, distributer_landing, selling_price, stock_through_movement_id
         )
         VALUES (
             :product_id, :user_id, :product, :weight, :batch_number, :expiry_date, :quantity,
-            :mrp, :distributer_landing, :selling_price
+            :mrp, :distributer_landing, :selling_price, :stock_through_movement_id
         )
-        RETURNING *;
+        RETURNING product_id, user_id, product, weight, batch_number, expiry_date, quantity,
+            mrp, distributer_landing, selling_price, change_version;
         """
         params = {
             "product_id": product_id,
@@ -279,8 +391,19 @@ class DatabaseController(UtilityManager):
             "distributer_landing": distributer_landing,
             "selling_price": selling_price
         }
-        product = self.db.execute_query(query, params, fetch_one=True, return_json=return_json)
-        return product
+        with self.db.transaction() as conn:
+            params["stock_through_movement_id"] = self._record_stock_movement(
+                conn,
+                product_id=product_id,
+                user_id=user_id,
+                quantity_delta=quantity,
+                reason=StockMovementReason.INITIAL_STOCK
+            )
+            created_product = conn.execute(typed_text(query), params).fetchone()
+            self._record_sync_changes(conn, user_id, ChangeResource.PRODUCTS, [product_id])
+            self._notify_stock_levels(conn, user_id, [product_id])
+            self._bump_change_versions(conn, user_id, ChangeResource.PRODUCTS)
+        return dict(created_product._mapping) if return_json else created_product
     
     def add_stock_entry(
         self,
@@ -293,33 +416,27 @@ class DatabaseController(UtilityManager):
         if quantity <= 0:
             raise HTTPException(status_code=400, detail="Quantity to add must be positive")
 
-        # Check if product exists
-        product = self.get_product(product_id, user_id)
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
-
-        # Update stock
-        query = """
-        UPDATE products 
-        SET quantity = quantity + :quantity 
-        WHERE product_id = :product_id AND user_id = :user_id 
-        RETURNING *;
-        """
-        params = {
-            "quantity": quantity,
-            "product_id": product_id,
-            "user_id": user_id
-        }
-        updated_product = self.db.execute_query(query, params, fetch_one=True, return_json=return_json)
-        if not updated_product:
-            raise HTTPException(status_code=500, detail="Failed to update stock")
+        # Journal the movement; the product row itself is not written
+        params = {"product_id": product_id, "user_id": user_id}
+        with self.db.transaction() as conn:
+            if not conn.execute(typed_text(PRODUCT_QUERY), params).fetchone():
+                raise HTTPException(status_code=404, detail="Product not found")
+            self._record_stock_movement(
+                conn,
+                product_id=product_id,
+                user_id=user_id,
+                quantity_delta=quantity,
+                reason=StockMovementReason.STOCK_ENTRY
+            )
+            updated_product = conn.execute(typed_text(PRODUCT_QUERY), params).fetchone()
+            self._notify_stock_levels(conn, user_id, [product_id])
+            self._bump_change_versions(conn, user_id, ChangeResource.PRODUCTS)
 
-        return updated_product
+        return dict(updated_product._mapping) if return_json else updated_product
 
     def get_product(self, product_id: str, user_id: str, return_json: Optional[bool] = False) -> Dict:
         """Retrieve a product by ID and user_id"""
-        query = "SELECT * FROM products WHERE product_id = :product_id AND user_id = :user_id"
-        product = self.db.execute_query(query, params={"product_id": product_id, "user_id": user_id}, fetch_one=True, return_json=return_json)
+        product = self.db.execute_query(PRODUCT_QUERY, params={"product_id": product_id, "user_id": user_id}, fetch_one=True, return_json=return_json, read_only=True)
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         return product
@@ -344,34 +461,441 @@ class DatabaseController(UtilityManager):
         if weight: updates["weight"] = weight
         if batch_number: updates["batch_number"] = batch_number
         if expiry_date: updates["expiry_date"] = expiry_date
-        if quantity is not None: updates["quantity"] = quantity
         if mrp is not None: updates["mrp"] = mrp
         if distributer_landing is not None: updates["distributer_landing"] = distributer_landing
         if selling_price is not None: updates["selling_price"] = selling_price
 
-        if not updates:
+        if not updates and quantity is None:
             raise HTTPException(status_code=400, detail="No fields to update")
 
-        set_clause = ", ".join([f"{k} = :{k}" for k in updates.keys()])
-        query = f"UPDATE products SET {set_clause} WHERE product_id = :product_id AND user_id = :user_id RETURNING *;"
-        updates.update({"product_id": product_id, "user_id": user_id})
-
-        product = self.db.execute_query(query, params=updates, fetch_one=True, return_json=return_json)
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
-        return product
+        keys = {"product_id": product_id, "user_id": user_id}
+        with self.db.transaction() as conn:
+            if updates:
+                set_clause = ", ".join([f"{k} = :{k}" for k in updates.keys()])
+                query = f"UPDATE products SET {set_clause} WHERE product_id = :product_id AND user_id = :user_id RETURNING product_id;"
+                if not conn.execute(typed_text(query), {**updates, **keys}).fetchone():
+                    raise HTTPException(status_code=404, detail="Product not found")
+                self._record_sync_changes(conn, user_id, ChangeResource.PRODUCTS, [product_id])
+
+            if quantity is not None:
+                # The difference below is taken from an on-hand quantity no sale can change meanwhile
+                self.db.lock_product_stock(conn, [product_id])
+            product = conn.execute(typed_text(PRODUCT_QUERY), keys).fetchone()
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
+            # A stock count: journal the difference from the on-hand quantity (sales made meanwhile still count)
+            if quantity is not None and quantity != product._mapping["quantity"]:
+                self._record_stock_movement(
+                    conn,
+                    product_id=product_id,
+                    user_id=user_id,
+                    quantity_delta=quantity - product._mapping["quantity"],
+                    reason=StockMovementReason.MANUAL_ADJUSTMENT
+                )
+                product = conn.execute(typed_text(PRODUCT_QUERY), keys).fetchone()
+            self._notify_stock_levels(conn, user_id, [product_id])
+            self._bump_change_versions(conn, user_id, ChangeResource.PRODUCTS)
+        return dict(product._mapping) if return_json else product
 
     def delete_product(self, product_id: str, user_id: str) -> None:
         """Delete a product"""
         query = "DELETE FROM products WHERE product_id = :product_id AND user_id = :user_id RETURNING product_id;"
-        result = self.db.execute_query(query, params={"product_id": product_id, "user_id": user_id}, fetch_one=False)
-        if not result:
-            raise HTTPException(status_code=404, detail="Product not found")
+        with self.db.transaction() as conn:
+            result = conn.execute(typed_text(query), {"product_id": product_id, "user_id": user_id}).fetchone()
+            if not result:
+                raise HTTPException(status_code=404, detail="Product not found")
+            self._record_sync_changes(conn, user_id, ChangeResource.PRODUCTS, [product_id], deleted=True)
+            self._notify_stock_levels(conn, user_id, [product_id], deleted=True)
+            # The product's orders go with it (ON DELETE CASCADE)
+            self._bump_change_versions(conn, user_id, ChangeResource.PRODUCTS, ChangeResource.ORDERS)
 
     def get_all_products(self, user_id: str, return_json: Optional[bool] = False) -> List[Dict]:
         """Fetch all products for a user"""
-        query = "SELECT * FROM products WHERE user_id = :user_id"
-        return self.db.execute_query(query, params={"user_id": user_id}, return_json=return_json)
+        query = f"SELECT {PRODUCT_COLUMNS} FROM products p WHERE p.user_id = :user_id"
+        return self.db.execute_query(query, params={"user_id": user_id}, return_json=return_json, read_only=True)
+
+    # ====== Stock Journal Methods ======
+
+    def _record_stock_movement(
+        self,
+        conn,
+        product_id: str,
+        user_id: str,
+        quantity_delta: int,
+        reason: StockMovementReason,
+        reference_id: Optional[str] = None
+    ) -> int:
+        """
+        Append a stock movement inside the caller's transaction; returns its movement_id. The movement
+        carries the sync version, so stock changes reach incremental sync without writing the product row.
+        A decrease is serialized with the product's other decreases and may not take its on-hand
+        quantity below zero (400).
+        """
+        if quantity_delta < 0:
+            self.db.lock_product_stock(conn, [product_id])
+            on_hand = conn.execute(
+                typed_text(f"SELECT {ON_HAND_QUANTITY} FROM products p WHERE p.product_id = :product_id AND p.user_id = :user_id"),
+                {"product_id": product_id, "user_id": user_id}
+            ).scalar()
+            if on_hand is not None and on_hand + quantity_delta < 0:
+                raise HTTPException(status_code=400, detail=f"Insufficient stock for product {product_id}")
+        version = conn.execute(
+            typed_text(self.db.CHANGE_VERSION_QUERY), {"user_id": user_id, "resource": ChangeResource.SYNC.value}
+        ).scalar_one()
+        query = """
+        INSERT INTO stock_movements (product_id, user_id, quantity_delta, reason, reference_id, change_version)
+        VALUES (:product_id, :user_id, :quantity_delta, :reason, :reference_id, :change_version)
+        RETURNING movement_id
+        """
+        return conn.execute(typed_text(query), {
+            "product_id": product_id,
+            "user_id": user_id,
+            "quantity_delta": quantity_delta,
+            "reason": reason.value,
+            "reference_id": reference_id,
+            "change_version": version
+        }).scalar_one()
+
+    def get_stock_movements(
+        self,
+        product_id: str,
+        user_id: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+        return_json: Optional[bool] = False
+    ) -> List[Dict]:
+        """Fetch the most recent stock movements for a product"""
+        query = """
+        SELECT movement_id, product_id, quantity_delta, reason, reference_id, created_at
+        FROM stock_movements
+        WHERE user_id = :user_id AND product_id = :product_id
+          AND (CAST(:since AS TIMESTAMP) IS NULL OR created_at >= :since)
+          AND (CAST(:until AS TIMESTAMP) IS NULL OR created_at <= :until)
+        ORDER BY created_at DESC, movement_id DESC
+        LIMIT :limit
+        """
+        params = {"product_id": product_id, "user_id": user_id, "since": since, "until": until, "limit": limit}
+        return self.db.execute_query(query, params=params, return_json=return_json, read_only=True)
+
+    def get_stock_at(
+        self,
+        product_id: str,
+        user_id: str,
+        as_of: Optional[datetime] = None,
+        return_json: Optional[bool] = False
+    ) -> Dict:
+        """
+        Compute the on-hand quantity of a product at a point in time.
+
+        Reads the latest snapshot taken at or before `as_of` and adds the journal
+        deltas after the movement it was taken through, so only a short range of the
+        journal is scanned.
+        """
+        query = """
+        WITH as_of AS (
+            SELECT COALESCE(CAST(:as_of AS TIMESTAMP), CURRENT_TIMESTAMP) AS ts
+        ),
+        snap AS (
+            SELECT s.snapshot_at, s.quantity, s.through_movement_id
+            FROM stock_snapshots s, as_of
+            WHERE s.user_id = :user_id AND s.product_id = :product_id AND s.snapshot_at <= as_of.ts
+            ORDER BY s.snapshot_at DESC
+            LIMIT 1
+        )
+        SELECT
+            p.product_id,
+            (SELECT ts FROM as_of) AS as_of,
+            (SELECT snapshot_at FROM snap) AS snapshot_at,
+            COALESCE((SELECT quantity FROM snap), 0) + COALESCE((
+                SELECT SUM(m.quantity_delta)
+                FROM stock_movements m, as_of
+                WHERE m.user_id = :user_id AND m.product_id = :product_id
+                  AND m.movement_id > COALESCE((SELECT through_movement_id FROM snap), 0)
+                  AND m.created_at <= as_of.ts
+            ), 0) AS quantity
+        FROM products p
+        WHERE p.product_id = :product_id AND p.user_id = :user_id
+        """
+        params = {"product_id": product_id, "user_id": user_id, "as_of": as_of}
+        stock = self.db.execute_query(query, params=params, fetch_one=True, return_json=return_json, read_only=True)
+        if not stock:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return stock
+
+    def compact_stock_snapshots(self, fence_timeout_seconds: float = 2.0) -> int:
+        """
+        Fold each moved product's journal into its row, and record the result as an on-hand snapshot.
+
+        Movements are folded up to the journal's high-water mark (see journal_high_water_mark), so
+        a movement whose transaction commits late is folded by a later run, never skipped. If the
+        journal can't be fenced within `fence_timeout_seconds` the run is skipped.
+        """
+        try:
+            through_movement_id = self.db.journal_high_water_mark(fence_timeout_seconds)
+        except OperationalError as e:
+            logging.warning(f"Stock snapshot compaction skipped, the journal is busy: {e}")
+            return 0
+        snapshot_query = """
+        INSERT INTO stock_snapshots (product_id, user_id, snapshot_at, quantity, through_movement_id)
+        SELECT p.product_id, p.user_id, CURRENT_TIMESTAMP, p.quantity + SUM(m.quantity_delta), :through_movement_id
+        FROM products p
+        JOIN stock_movements m ON m.user_id = p.user_id AND m.product_id = p.product_id
+            AND m.movement_id > p.stock_through_movement_id AND m.movement_id <= :through_movement_id
+        WHERE NOT (p.user_id = ANY(CAST(:frozen_user_ids AS UUID[])))  -- Also lets SQLite tell the upsert's ON from the join's
+        GROUP BY p.product_id, p.user_id, p.quantity
+        ON CONFLICT (user_id, product_id, snapshot_at) DO NOTHING
+        RETURNING product_id;
+        """
+        # Quantity and high-water mark change together, so readers always add the right journal tail
+        fold_query = """
+        UPDATE products
+        SET quantity = s.quantity, stock_through_movement_id = s.through_movement_id
+        FROM stock_snapshots s
+        WHERE s.user_id = products.user_id AND s.product_id = products.product_id
+          AND s.snapshot_at = CURRENT_TIMESTAMP AND s.through_movement_id = :through_movement_id
+        """
+        # Jobs run in a shard's scope, which the frozen-write check doesn't cover: skip tenants being moved
+        params = {"through_movement_id": through_movement_id, "frozen_user_ids": self._frozen_tenants()}
+        with self.db.transaction() as conn:
+            compacted = conn.execute(typed_text(snapshot_query), params).fetchall()
+            conn.execute(typed_text(fold_query), params)
+        logging.info(f"Stock snapshot compaction wrote {len(compacted)} snapshot(s).")
+        return len(compacted)
+
+    def _frozen_tenants(self) -> List[str]:
+        """Tenants being moved between shards (none without sharding), whose rows maintenance jobs leave alone"""
+        return self.db.shards.frozen_tenants() if self.db.shards else []
+
+    # ====== Change Counter Methods ======
+
+    def _bump_change_versions(self, conn, user_id: str, *resources: ChangeResource) -> None:
+        """
+        Advance the tenant's list versions once the caller's transaction commits, each in a short
+        transaction of its own: bumping inside the caller's would keep the tenant's counter rows
+        locked (and its writes queued behind each other) until the request ends. Until the bump
+        lands a poll may still be answered with the previous version's ETag; a crash in between
+        leaves the version behind until the tenant's next write.
+        """
+        query = """
+        INSERT INTO tenant_change_counters (user_id, resource, version)
+        VALUES (:user_id, :resource, 1)
+        ON CONFLICT (user_id, resource) DO UPDATE
+        SET version = tenant_change_counters.version + 1;
+        """
+        engine = conn.engine
+        # Fixed lock order, so two writers bumping the same pair cannot deadlock
+        resources = sorted(set(resources), key=lambda r: r.value)
+
+        def bump() -> None:
+            with engine.begin() as bump_conn:
+                for resource in resources:
+                    bump_conn.execute(typed_text(query), {"user_id": user_id, "resource": resource.value})
+
+        after_commit(conn, bump)
+
+    def get_change_version(self, user_id: str, resource: ChangeResource) -> int:
+        """Current list version for a tenant (0 until the first write)"""
+        query = "SELECT version FROM tenant_change_counters WHERE user_id = :user_id AND resource = :resource"
+        result = self.db.execute_query(
+            query, params={"user_id": user_id, "resource": resource.value}, fetch_one=True, return_json=True, read_only=True
+        )
+        return result["version"] if result else 0
+
+    def _record_sync_changes(
+        self,
+        conn,
+        user_id: str,
+        resource: ChangeResource,
+        row_ids: List[str],
+        deleted: bool = False
+    ) -> None:
+        """
+        Stamp changed rows (or write tombstones for deleted ones) with the transaction's sync version.
+        The version comes from the backend (see CHANGE_VERSION_QUERY), not from a shared counter row,
+        so concurrent writers of a tenant don't queue behind each other.
+        """
+        row_ids = sorted(set(row_ids))
+        if not row_ids:
+            return
+        version = conn.execute(
+            typed_text(self.db.CHANGE_VERSION_QUERY), {"user_id": user_id, "resource": ChangeResource.SYNC.value}
+        ).scalar_one()
+
+        if deleted:
+            tombstone_query = """
+            INSERT INTO sync_tombstones (user_id, resource, row_id, change_version)
+            VALUES (:user_id, :resource, :row_id, :version)
+            ON CONFLICT (user_id, resource, row_id) DO UPDATE
+            SET change_version = EXCLUDED.change_version, deleted_at = CURRENT_TIMESTAMP
+            """
+            conn.execute(typed_text(tombstone_query), [
+                {"user_id": user_id, "resource": resource.value, "row_id": row_id, "version": version}
+                for row_id in row_ids
+            ])
+        else:
+            table, key = SYNC_TABLES[resource]
+            stamp_query = f"UPDATE {table} SET change_version = :version WHERE user_id = :user_id AND {key} = ANY(CAST(:row_ids AS UUID[]))"
+            conn.execute(typed_text(stamp_query), {"version": version, "user_id": user_id, "row_ids": row_ids})
+
+    def get_sync_changes(self, user_id: str, since: Optional[int] = None, limit: int = 500) -> Dict:
+        """
+        Products, customers and tombstones changed after sync version `since` (everything when None).
+
+        Only versions below the backend's horizon (CHANGE_HORIZON_QUERY) are returned: versions are
+        taken when a transaction writes, not when it commits, and a smaller one may still be in flight.
+        A page never splits a version, so `next_since` is always safe to resume from; a single
+        version larger than `limit` is returned whole.
+        """
+        # Rows that predate incremental sync carry version 0 and only appear in a full sync
+        params = {"user_id": user_id, "since": -1 if since is None else since, "limit": limit}
+        changed = " FROM {table} WHERE user_id = :user_id AND change_version > :since"
+        # Stock changes are versioned on their journal entries; a full sync returns every product anyway
+        restocked = changed.format(table="stock_movements") + " AND :since >= 0"
+        boundary_query = f"""
+        SELECT change_version FROM (
+            SELECT change_version{changed.format(table="products")}
+            UNION ALL SELECT change_version{changed.format(table="customers")}
+            UNION ALL SELECT change_version{changed.format(table="sync_tombstones")}
+            UNION ALL SELECT change_version{restocked}
+        ) changes
+        WHERE change_version < :horizon
+        ORDER BY change_version
+        LIMIT 1 OFFSET :limit
+        """
+        page = " AND change_version <= :until ORDER BY change_version"
+        products_query = f"""
+        SELECT {PRODUCT_COLUMNS} FROM products p
+        WHERE p.user_id = :user_id AND (
+            p.change_version > :since AND p.change_version <= :until
+            OR p.product_id IN (SELECT product_id{restocked} AND change_version <= :until)
+        )
+        ORDER BY p.change_version
+        """
+
+        with self.db.read_engine().connect() as conn:
+            # One snapshot for every statement, so a commit between them cannot be half-read
+            conn = conn.execution_options(isolation_level=self.db.SNAPSHOT_ISOLATION_LEVEL)
+            with conn.begin():
+                # First statement: the horizon is taken from the same snapshot the pages are read in
+                params["horizon"] = conn.execute(
+                    typed_text(self.db.CHANGE_HORIZON_QUERY), {"user_id": user_id, "resource": ChangeResource.SYNC.value}
+                ).scalar()
+                boundary = conn.execute(typed_text(boundary_query), params).scalar()
+                if boundary is None:
+                    params["until"] = max(params["horizon"] - 1, params["since"], 0)
+                else:
+                    # Stop before the first version that doesn't fit, unless nothing else would
+                    params["until"] = boundary - 1 if boundary - 1 > params["since"] else boundary
+                products = conn.execute(typed_text(products_query), params).fetchall()
+                customers = conn.execute(typed_text("SELECT *" + changed.format(table="customers") + page), params).fetchall()
+                tombstones = conn.execute(
+                    typed_text("SELECT resource, row_id" + changed.format(table="sync_tombstones") + page), params
+                ).fetchall()
+
+        deleted = {ChangeResource.PRODUCTS.value: [], ChangeResource.CUSTOMERS.value: []}
+        for tombstone in tombstones:
+            deleted.setdefault(tombstone.resource, []).append(tombstone.row_id)
+        return {
+            "since": since,
+            "next_since": params["until"],
+            "has_more": boundary is not None,
+            "products": [dict(row._mapping) for row in products],
+            "customers": [dict(row._mapping) for row in customers],
+            "deleted": deleted
+        }
+
+    # ====== Live Event Methods ======
+
+    def _notify_after_commit(self, conn, query: str, *params: Dict) -> None:
+        """
+        Run a pg_notify query (once per params) in a short transaction of its own once the caller's commits, so
+        nothing is sent for a rolled-back write. Postgres serializes every notifying commit on
+        one database-wide queue lock; taking it here, rather than in the write's own commit,
+        keeps the write's row locks (a product's stock, an invoice) from being held while
+        queued for it. The cost is an extra commit per notifying write, and events lost if
+        the process dies in between; live clients refetch on reconnect.
+        """
+        engine = conn.engine
+
+        def notify() -> None:
+            with engine.begin() as notify_conn:
+                for notify_params in params:
+                    notify_conn.execute(typed_text(query), notify_params)
+
+        after_commit(conn, notify)
+
+    def _notify_stock_levels(self, conn, user_id: str, product_ids: List[str], deleted: bool = False) -> None:
+        """Queue stock events for the tenant's live streams, sent once the transaction commits"""
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return
+        if deleted:
+            notify_query = "SELECT pg_notify(:channel, :payload)"
+            self._notify_after_commit(conn, notify_query, *(
+                {
+                    "channel": AppConstants.LIVE_EVENTS_CHANNEL,
+                    "payload": json.dumps({
+                        "user_id": user_id,
+                        "event": LiveEventType.STOCK.value,
+                        "product_id": product_id,
+                        "quantity": None,
+                        "deleted": True
+                    })
+                }
+                for product_id in product_ids
+            ))
+            return
+        # Committed quantities, one notification per product
+        notify_query = f"""
+        SELECT pg_notify(:channel, json_build_object(
+            'user_id', p.user_id, 'event', :event, 'product_id', p.product_id, 'quantity', {ON_HAND_QUANTITY}
+        )::text)
+        FROM products p
+        WHERE p.user_id = :user_id AND p.product_id = ANY(CAST(:product_ids AS UUID[]))
+        """
+        self._notify_after_commit(conn, notify_query, {
+            "channel": AppConstants.LIVE_EVENTS_CHANNEL,
+            "event": LiveEventType.STOCK.value,
+            "user_id": user_id,
+            "product_ids": product_ids
+        })
+
+    def _notify_invoice_status(self, conn, user_id: str, invoice_id: str) -> None:
+        """Queue an invoice payment status event; sent after commit like _notify_stock_levels"""
+        notify_query = """
+        SELECT pg_notify(:channel, json_build_object(
+            'user_id', user_id, 'event', :event, 'invoice_id', invoice_id, 'invoice_number', invoice_number,
+            'payment_status', payment_status, 'amount_paid', amount_paid, 'total_amount', total_amount
+        )::text)
+        FROM invoices
+        WHERE invoice_id = :invoice_id AND user_id = :user_id
+        """
+        params = {
+            "channel": AppConstants.LIVE_EVENTS_CHANNEL,
+            "event": LiveEventType.INVOICE.value,
+            "user_id": user_id,
+            "invoice_id": invoice_id
+        }
+        notify_query += self._key_date_filter("invoice_date", invoice_id, params)
+        self._notify_after_commit(conn, notify_query, params)
+
+    # ====== Partition Pruning Methods ======
+
+    def _key_date_filter(self, column: str, key: str, params: Dict, open_ended: bool = False) -> str:
+        """
+        ` AND <column> ...` bounds around a UUIDv7 key's creation time, so lookups by key only scan
+        that month's partition(s); `open_ended` keeps only the lower bound (payments of an invoice).
+        Empty for older (v4) keys. Adds its bind values to `params`.
+        """
+        created_at = uuid7_datetime(key)
+        if created_at is None:
+            return ""
+        params[f"{column}_from"] = created_at - KEY_DATE_MARGIN
+        if open_ended:
+            return f" AND {column} >= :{column}_from"
+        params[f"{column}_to"] = created_at + KEY_DATE_MARGIN
+        return f" AND {column} BETWEEN :{column}_from AND :{column}_to"
 
     # ====== Order Management Methods ======
 
@@ -461,7 +985,19 @@ class DatabaseController(UtilityManager):
         order_results = []
         total_amount = 0.0
 
-        with self.db.engine.begin() as conn:
+        with self.db.transaction() as conn:
+            # Step 0: Claim the invoice number; the registry keeps numbers unique across invoice partitions.
+            # CURRENT_TIMESTAMP is the transaction's start, so it equals the invoice's default invoice_date.
+            registry_query = """
+            INSERT INTO invoice_numbers (invoice_number, invoice_id, invoice_date, user_id)
+            VALUES (:invoice_number, :invoice_id, CURRENT_TIMESTAMP, :user_id);
+            """
+            conn.execute(typed_text(registry_query), {
+                "invoice_number": invoice_number,
+                "invoice_id": invoice_id,
+                "user_id": user_id
+            })
+
             # Step 1: Insert the invoice first with a temporary total_amount
             invoice_query = """
             INSERT INTO invoices (
@@ -480,10 +1016,11 @@ class DatabaseController(UtilityManager):
                 "total_amount": 0.0,  # Temporary value, updated later
                 "created_by_name": created_by_name
             }
-            invoice = conn.execute(text(invoice_query), invoice_params).fetchone()
+            invoice = conn.execute(typed_text(invoice_query), invoice_params).fetchone()
             invoice_result = dict(invoice._mapping) if return_json else invoice
 
-            # Step 2: Process orders
+            # Step 2: Process orders. Their products' stock is locked up front, in one order (see lock_product_stock)
+            self.db.lock_product_stock(conn, [order_data["product_id"] for order_data in orders])
             for order_data in orders:
                 order_id = self.generate_uuid()
                 product_id = order_data["product_id"]
@@ -492,8 +1029,11 @@ class DatabaseController(UtilityManager):
                 amount = quantity * rate
                 total_amount += amount
 
-                product = self.get_product(product_id, user_id, return_json=True)
-                if product["quantity"] < quantity:
+                # Against the on-hand quantity with every earlier sale of the product committed
+                product = conn.execute(typed_text(PRODUCT_QUERY), {"product_id": product_id, "user_id": user_id}).fetchone()
+                if not product:
+                    raise HTTPException(status_code=404, detail="Product not found")
+                if product._mapping["quantity"] < quantity:
                     raise HTTPException(status_code=400, detail=f"Insufficient stock for product {product_id}")
 
                 order_query = """
@@ -516,55 +1056,90 @@ class DatabaseController(UtilityManager):
                     "rate": rate,
                     "amount": amount
                 }
-                order = conn.execute(text(order_query), order_params).fetchone()
+                order = conn.execute(typed_text(order_query), order_params).fetchone()
                 order_results.append(dict(order._mapping) if return_json else order)
+                self._apply_sales_delta(
+                    conn,
+                    user_id=user_id,
+                    sales_date=order._mapping["order_date"],
+                    product_id=product_id,
+                    customer_id=customer_id,
+                    order_count=1,
+                    quantity=quantity,
+                    amount=amount
+                )
 
-                stock_query = """
-                UPDATE products 
-                SET quantity = quantity - :quantity 
-                WHERE product_id = :product_id AND user_id = :user_id
-                """
-                conn.execute(text(stock_query), {"quantity": quantity, "product_id": product_id, "user_id": user_id})
+                self._record_stock_movement(
+                    conn,
+                    product_id=product_id,
+                    user_id=user_id,
+                    quantity_delta=-quantity,
+                    reason=StockMovementReason.ORDER_CREATED,
+                    reference_id=order_id
+                )
 
             # Step 3: Update the invoice with the calculated total_amount
             update_invoice_query = """
             UPDATE invoices 
             SET total_amount = :total_amount 
-            WHERE invoice_id = :invoice_id
+            WHERE invoice_id = :invoice_id AND invoice_date = :invoice_date
             RETURNING *;
             """
             invoice_params = {
                 "invoice_id": invoice_id,
+                "invoice_date": invoice._mapping["invoice_date"],
                 "total_amount": total_amount
             }
-            invoice = conn.execute(text(update_invoice_query), invoice_params).fetchone()
+            invoice = conn.execute(typed_text(update_invoice_query), invoice_params).fetchone()
             invoice_result = dict(invoice._mapping) if return_json else invoice
+            self._apply_receivable_delta(
+                conn,
+                user_id=user_id,
+                customer_id=customer_id,
+                invoiced=total_amount
+            )
+            self._notify_stock_levels(conn, user_id, [o["product_id"] for o in orders])
+            self._bump_change_versions(conn, user_id, ChangeResource.ORDERS, ChangeResource.PRODUCTS)
 
         invoice_result["orders"] = order_results
         return invoice_result
 
     
-    def get_invoice(self, invoice_number: str, return_json: Optional[bool] = False) -> Dict:
-        """Retrieve an invoice by invoice_number"""
-        query = "SELECT * FROM invoices WHERE invoice_number = :invoice_number"
-        invoice = self.db.execute_query(query, params={"invoice_number": invoice_number}, fetch_one=True, return_json=return_json)
+    def get_invoice(self, invoice_number: str, user_id: str, return_json: Optional[bool] = False) -> Dict:
+        """Retrieve an invoice by invoice_number and user_id"""
+        # Through the registry, so only the invoice's own partition is probed
+        query = """
+        SELECT invoices.*
+        FROM invoice_numbers
+        JOIN invoices ON invoices.invoice_id = invoice_numbers.invoice_id
+            AND invoices.invoice_date = invoice_numbers.invoice_date
+        WHERE invoice_numbers.invoice_number = :invoice_number AND invoice_numbers.user_id = :user_id
+        """
+        params = {"invoice_number": invoice_number, "user_id": user_id}
+        invoice = self.db.execute_query(query, params=params, fetch_one=True, return_json=return_json, read_only=True)
+        if not invoice:
+            invoice = InvoiceArchive().find_invoice(invoice_number, user_id=user_id)
         if not invoice:
             raise HTTPException(status_code=404, detail="Invoice not found")
         return invoice
     
 
 
-    def get_invoice_orders(self, invoice_id: str, return_json: Optional[bool] = False) -> List[Dict]:
-        """Retrieve all orders for an invoice by invoice_id"""
-        query = "SELECT * FROM orders WHERE invoice_id = :invoice_id"
-        return self.db.execute_query(query, params={"invoice_id": invoice_id}, return_json=return_json)
+    def get_invoice_orders(self, invoice_id: str, user_id: str, return_json: Optional[bool] = False) -> List[Dict]:
+        """Retrieve all orders for an invoice by invoice_id and user_id"""
+        # Orders are created in the invoice's transaction, so they share its creation time
+        params = {"invoice_id": invoice_id, "user_id": user_id}
+        query = "SELECT * FROM orders WHERE invoice_id = :invoice_id AND user_id = :user_id" + self._key_date_filter("order_date", invoice_id, params)
+        orders = self.db.execute_query(query, params=params, return_json=return_json, read_only=True)
+        return orders or InvoiceArchive().find_rows("orders", invoice_id, user_id=user_id)
     
 
     
     def get_order(self, order_id: str, user_id: str, return_json: Optional[bool] = False) -> Dict:
         """Retrieve an order by ID and user_id"""
-        query = "SELECT * FROM orders WHERE order_id = :order_id AND user_id = :user_id"
-        order = self.db.execute_query(query, params={"order_id": order_id, "user_id": user_id}, fetch_one=True, return_json=return_json)
+        params = {"order_id": order_id, "user_id": user_id}
+        query = "SELECT * FROM orders WHERE order_id = :order_id AND user_id = :user_id" + self._key_date_filter("order_date", order_id, params)
+        order = self.db.execute_query(query, params=params, fetch_one=True, return_json=return_json, read_only=True)
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
         return order
@@ -580,7 +1155,8 @@ class DatabaseController(UtilityManager):
         return_json: Optional[bool] = False
     ) -> Dict:
         """Update an order, adjust stock if quantity changes, and update the associated invoice's total_amount"""
-        # Fetch the original order
+        # Fetch the original order (from the primary: the update is computed from it)
+        pin_to_primary()
         order = self.get_order(order_id, user_id, return_json=True)
         original_quantity = order["quantity"]
         invoice_id = order.get("invoice_id")  # Check if the order is linked to an invoice
@@ -599,28 +1175,53 @@ class DatabaseController(UtilityManager):
             updates["amount"] = (updates.get("quantity", original_quantity)) * (updates.get("rate", order["rate"]))
 
         # Use a transaction to ensure atomicity across orders, products, and invoices
-        with self.db.engine.begin() as conn:
+        with self.db.transaction() as conn:
             # Update the order
             set_clause = ", ".join([f"{k} = :{k}" for k in updates.keys()])
-            query = f"UPDATE orders SET {set_clause} WHERE order_id = :order_id AND user_id = :user_id RETURNING *;"
-            updates.update({"order_id": order_id, "user_id": user_id})
-            updated_order = conn.execute(text(query), updates).fetchone()
+            query = f"""
+            UPDATE orders SET {set_clause}
+            WHERE order_id = :order_id AND user_id = :user_id AND order_date = :order_date
+            RETURNING *;
+            """
+            updates.update({"order_id": order_id, "user_id": user_id, "order_date": order["order_date"]})
+            updated_order = conn.execute(typed_text(query), updates).fetchone()
             if not updated_order:
                 raise HTTPException(status_code=404, detail="Order not found")
             updated_order_dict = dict(updated_order._mapping) if return_json else updated_order
+            new_order = updated_order._mapping
+
+            # Move the line out of its old rollup bucket and into its new one
+            self._apply_sales_delta(
+                conn,
+                user_id=user_id,
+                sales_date=order["order_date"],
+                product_id=order["product_id"],
+                customer_id=order["customer_id"],
+                order_count=-1,
+                quantity=-order["quantity"],
+                amount=-order["amount"]
+            )
+            self._apply_sales_delta(
+                conn,
+                user_id=user_id,
+                sales_date=new_order["order_date"],
+                product_id=new_order["product_id"],
+                customer_id=new_order["customer_id"],
+                order_count=1,
+                quantity=new_order["quantity"],
+                amount=new_order["amount"]
+            )
             # Adjust stock if quantity changed
             if quantity is not None and quantity != original_quantity:
                 stock_adjustment = original_quantity - quantity  # Positive if reducing, negative if increasing
-                product_query = """
-                UPDATE products 
-                SET quantity = quantity + :stock_adjustment 
-                WHERE product_id = :product_id AND user_id = :user_id
-                """
-                conn.execute(text(product_query), {
-                    "stock_adjustment": stock_adjustment,
-                    "product_id": order["product_id"],
-                    "user_id": user_id
-                })
+                self._record_stock_movement(
+                    conn,
+                    product_id=order["product_id"],
+                    user_id=user_id,
+                    quantity_delta=stock_adjustment,
+                    reason=StockMovementReason.ORDER_UPDATED,
+                    reference_id=order_id
+                )
 
             # Update the invoice's total_amount if linked
             if invoice_id:
@@ -630,7 +1231,9 @@ class DatabaseController(UtilityManager):
                 FROM orders 
                 WHERE invoice_id = :invoice_id
                 """
-                total_amount_result = conn.execute(text(total_amount_query), {"invoice_id": invoice_id}).fetchone()
+                total_amount_params = {"invoice_id": invoice_id}
+                total_amount_query += self._key_date_filter("order_date", invoice_id, total_amount_params)
+                total_amount_result = conn.execute(typed_text(total_amount_query), total_amount_params).fetchone()
                 total_amount_result = dict(total_amount_result._mapping) if return_json else total_amount_result
                 new_total_amount = total_amount_result["total_amount"] if total_amount_result else 0.0
                 # Update the invoice
@@ -638,12 +1241,20 @@ class DatabaseController(UtilityManager):
                 UPDATE invoices 
                 SET total_amount = :total_amount 
                 WHERE invoice_id = :invoice_id
-                RETURNING *;
                 """
-                conn.execute(text(invoice_query), {
-                    "total_amount": new_total_amount,
-                    "invoice_id": invoice_id
-                })
+                invoice_params = {"total_amount": new_total_amount, "invoice_id": invoice_id}
+                invoice_query += self._key_date_filter("invoice_date", invoice_id, invoice_params) + " RETURNING *;"
+                updated_invoice = conn.execute(typed_text(invoice_query), invoice_params).fetchone()
+                if updated_invoice and new_order["amount"] != order["amount"]:
+                    self._apply_receivable_delta(
+                        conn,
+                        user_id=user_id,
+                        customer_id=updated_invoice._mapping["customer_id"],
+                        invoiced=new_order["amount"] - order["amount"]
+                    )
+            if quantity is not None and quantity != original_quantity:
+                self._notify_stock_levels(conn, user_id, [order["product_id"]])
+            self._bump_change_versions(conn, user_id, ChangeResource.ORDERS, ChangeResource.PRODUCTS)
 
         return updated_order_dict
     
@@ -651,64 +1262,105 @@ class DatabaseController(UtilityManager):
 
     def delete_order(self, order_id: str, user_id: str) -> None:
         """Delete an order and restore stock"""
-        order = self.get_order(order_id, user_id, return_json=True)
-        query = "DELETE FROM orders WHERE order_id = :order_id AND user_id = :user_id RETURNING order_id;"
-        result = self.db.execute_query(query, params={"order_id": order_id, "user_id": user_id}, fetch_one=True, return_json=True)
-        if not result:
-            raise HTTPException(status_code=404, detail="Order not found")
-        
-        # Restore stock
-        restore_query = """
-        UPDATE products 
-        SET quantity = quantity + :quantity 
-        WHERE product_id = :product_id AND user_id = :user_id
-        """
-        self.db.execute_query(restore_query, params={
-            "quantity": order["quantity"],
-            "product_id": order["product_id"],
-            "user_id": user_id
-        })
+        with self.db.transaction() as conn:
+            params = {"order_id": order_id, "user_id": user_id}
+            query = f"""
+            DELETE FROM orders
+            WHERE order_id = :order_id AND user_id = :user_id{self._key_date_filter("order_date", order_id, params)}
+            RETURNING order_id, product_id, customer_id, quantity, amount, order_date;
+            """
+            result = conn.execute(typed_text(query), params).fetchone()
+            if not result:
+                raise HTTPException(status_code=404, detail="Order not found")
+            order = dict(result._mapping)
+
+            # Restore stock
+            self._record_stock_movement(
+                conn,
+                product_id=order["product_id"],
+                user_id=user_id,
+                quantity_delta=order["quantity"],
+                reason=StockMovementReason.ORDER_DELETED,
+                reference_id=order_id
+            )
+            self._apply_sales_delta(
+                conn,
+                user_id=user_id,
+                sales_date=order["order_date"],
+                product_id=order["product_id"],
+                customer_id=order["customer_id"],
+                order_count=-1,
+                quantity=-order["quantity"],
+                amount=-order["amount"]
+            )
+            self._notify_stock_levels(conn, user_id, [order["product_id"]])
+            self._bump_change_versions(conn, user_id, ChangeResource.ORDERS, ChangeResource.PRODUCTS)
 
     
     def delete_invoice(self, user_id: str, invoice_id: str, return_json: Optional[bool] = False) -> None:
-        """Delete an invoice, let CASCADE delete orders, and restore stock"""
-        with self.db.engine.begin() as conn:
-            # Fetch orders to restore stock before deletion
-            orders_query = """
-            SELECT product_id, quantity 
-            FROM orders 
-            WHERE invoice_id = :invoice_id AND user_id = :user_id
+        """Delete an invoice with its orders and payments, and restore stock"""
+        params = {"invoice_id": invoice_id, "user_id": user_id}
+        with self.db.transaction() as conn:
+            # Orders and payments are deleted explicitly: partitioned tables have no foreign key to cascade from
+            delete_orders_query = f"""
+            DELETE FROM orders
+            WHERE invoice_id = :invoice_id AND user_id = :user_id{self._key_date_filter("order_date", invoice_id, params)}
+            RETURNING order_id, product_id, customer_id, quantity, amount, order_date;
             """
-            orders = conn.execute(text(orders_query), {"invoice_id": invoice_id, "user_id": user_id}).fetchall()
-            # Delete the invoice (CASCADE will delete orders)
-            delete_query = """
+            orders = conn.execute(typed_text(delete_orders_query), params).fetchall()
+            delete_payments_query = f"""
+            DELETE FROM payments
+            WHERE invoice_id = :invoice_id AND user_id = :user_id{self._key_date_filter("payment_date", invoice_id, params, open_ended=True)};
+            """
+            conn.execute(typed_text(delete_payments_query), params)
+            delete_query = f"""
             DELETE FROM invoices 
-            WHERE invoice_id = :invoice_id AND user_id = :user_id 
+            WHERE invoice_id = :invoice_id AND user_id = :user_id{self._key_date_filter("invoice_date", invoice_id, params)}
             RETURNING *;
             """
-            invoice = conn.execute(text(delete_query), {"invoice_id": invoice_id, "user_id": user_id}).fetchone()
+            invoice = conn.execute(typed_text(delete_query), params).fetchone()
             if not invoice and not orders:
                 raise HTTPException(status_code=404, detail="Invoice not found")
+            conn.execute(typed_text("DELETE FROM invoice_numbers WHERE invoice_id = :invoice_id"), params)
+            if invoice:
+                deleted_invoice = invoice._mapping
+                self._apply_receivable_delta(
+                    conn,
+                    user_id=user_id,
+                    customer_id=deleted_invoice["customer_id"],
+                    invoiced=-deleted_invoice["total_amount"],
+                    paid=-(deleted_invoice["amount_paid"] or 0)
+                )
 
             # Restore stock for all affected products
             for order in orders:
                 order = dict(order._mapping) if return_json else order
-                restore_stock_query = """
-                UPDATE products 
-                SET quantity = quantity + :quantity 
-                WHERE product_id = :product_id AND user_id = :user_id
-                """
-                conn.execute(text(restore_stock_query), {
-                    "quantity": order["quantity"],
-                    "product_id": order["product_id"],
-                    "user_id": user_id
-                })
+                self._record_stock_movement(
+                    conn,
+                    product_id=order["product_id"],
+                    user_id=user_id,
+                    quantity_delta=order["quantity"],
+                    reason=StockMovementReason.INVOICE_DELETED,
+                    reference_id=order["order_id"]
+                )
+                self._apply_sales_delta(
+                    conn,
+                    user_id=user_id,
+                    sales_date=order["order_date"],
+                    product_id=order["product_id"],
+                    customer_id=order["customer_id"],
+                    order_count=-1,
+                    quantity=-order["quantity"],
+                    amount=-order["amount"]
+                )
+            self._notify_stock_levels(conn, user_id, [o._mapping["product_id"] for o in orders])
+            self._bump_change_versions(conn, user_id, ChangeResource.ORDERS, ChangeResource.PRODUCTS)
 
 
     def get_all_orders(self, user_id: str, return_json: Optional[bool] = False) -> List[Dict]:
         """Fetch all orders for a user"""
         query = "SELECT * FROM orders WHERE user_id = :user_id"
-        return self.db.execute_query(query, params={"user_id": user_id}, return_json=return_json)
+        return self.db.execute_query(query, params={"user_id": user_id}, return_json=return_json, read_only=True)
     
 
     def create_payment(
@@ -723,7 +1375,7 @@ class DatabaseController(UtilityManager):
         """Add a payment to an invoice and update its status and amount paid"""
         payment_id = self.generate_uuid()
 
-        with self.db.engine.begin() as conn:
+        with self.db.transaction() as conn:
             # Step 1: Insert the payment
             payment_query = """
             INSERT INTO payments (
@@ -742,26 +1394,28 @@ class DatabaseController(UtilityManager):
                 "payment_method": payment_method,
                 "note": note
             }
-            payment = conn.execute(text(payment_query), payment_params).fetchone()
+            payment = conn.execute(typed_text(payment_query), payment_params).fetchone()
             payment_result = dict(payment._mapping) if return_json else payment
 
             # Step 2: Calculate total paid from payments table
+            total_paid_params = {"invoice_id": invoice_id}
             total_paid_query = """
             SELECT SUM(amount) as total_paid
             FROM payments
             WHERE invoice_id = :invoice_id
-            """
-            total_paid_result = conn.execute(text(total_paid_query), {"invoice_id": invoice_id}).fetchone()
+            """ + self._key_date_filter("payment_date", invoice_id, total_paid_params, open_ended=True)
+            total_paid_result = conn.execute(typed_text(total_paid_query), total_paid_params).fetchone()
             total_paid_result = dict(total_paid_result._mapping) if return_json else total_paid_result
             total_paid = total_paid_result["total_paid"] if total_paid_result["total_paid"] is not None else 0.0
 
             # Step 3: Fetch invoice details
+            invoice_params = {"invoice_id": invoice_id, "user_id": user_id}
             invoice_query = """
-            SELECT total_amount
+            SELECT total_amount, amount_paid, customer_id, invoice_date
             FROM invoices
             WHERE invoice_id = :invoice_id AND user_id = :user_id
-            """
-            invoice = conn.execute(text(invoice_query), {"invoice_id": invoice_id, "user_id": user_id}).fetchone()
+            """ + self._key_date_filter("invoice_date", invoice_id, invoice_params)
+            invoice = conn.execute(typed_text(invoice_query), invoice_params).fetchone()
             invoice = dict(invoice._mapping) if return_json else invoice
             if not invoice:
                 raise HTTPException(status_code=404, detail="Invoice not found")
@@ -779,14 +1433,27 @@ class DatabaseController(UtilityManager):
             UPDATE invoices
             SET payment_status = :payment_status,
                 amount_paid = :total_paid
-            WHERE invoice_id = :invoice_id AND user_id = :user_id
+            WHERE invoice_id = :invoice_id AND user_id = :user_id AND invoice_date = :invoice_date
             RETURNING *;
             """
             updated_invoice = conn.execute(
-                text(update_invoice_query),
-                {"payment_status": payment_status, "total_paid": total_paid, "invoice_id": invoice_id, "user_id": user_id}
+                typed_text(update_invoice_query),
+                {
+                    "payment_status": payment_status,
+                    "total_paid": total_paid,
+                    "invoice_id": invoice_id,
+                    "user_id": user_id,
+                    "invoice_date": invoice["invoice_date"]
+                }
             ).fetchone()
             invoice_result = dict(updated_invoice._mapping) if return_json else updated_invoice
+            self._apply_receivable_delta(
+                conn,
+                user_id=user_id,
+                customer_id=invoice["customer_id"],
+                paid=Decimal(str(total_paid)) - (invoice["amount_paid"] or Decimal("0"))
+            )
+            self._notify_invoice_status(conn, user_id, invoice_id)
 
         # Return payment details and updated invoice
         return {
@@ -801,12 +1468,13 @@ class DatabaseController(UtilityManager):
         return_json: Optional[bool] = False
     ) -> Dict:
         """Retrieve a payment by ID"""
+        params = {"payment_id": payment_id, "user_id": user_id}
         query = """
         SELECT *
         FROM payments
         WHERE payment_id = :payment_id AND user_id = :user_id
-        """
-        payment = self.db.execute_query(query, params={"payment_id": payment_id, "user_id": user_id}, fetch_one=True, return_json=return_json)
+        """ + self._key_date_filter("payment_date", payment_id, params)
+        payment = self.db.execute_query(query, params=params, fetch_one=True, return_json=return_json, read_only=True)
         if not payment:
             raise HTTPException(status_code=404, detail="Payment not found")
         return payment
@@ -824,8 +1492,10 @@ class DatabaseController(UtilityManager):
         FROM payments
         WHERE invoice_id = :invoice_id AND user_id = :user_id
         """
-        payments = self.db.execute_query(query, params={"invoice_id": invoice_id, "user_id": user_id}, return_json=return_json)
-        return payments
+        params = {"invoice_id": invoice_id, "user_id": user_id}
+        query += self._key_date_filter("payment_date", invoice_id, params, open_ended=True)
+        payments = self.db.execute_query(query, params=params, return_json=return_json, read_only=True)
+        return payments or InvoiceArchive().find_rows("payments", invoice_id, user_id=user_id)
 
 
     def update_payment(
@@ -838,6 +1508,7 @@ class DatabaseController(UtilityManager):
         return_json: Optional[bool] = False
     ) -> Dict:
         """Update a payment and adjust the associated invoice"""
+        pin_to_primary()  # The payment row below must be current, not a replica's copy
         payment = self.get_payment(payment_id, user_id, return_json=True)
         invoice_id = payment["invoice_id"]
 
@@ -849,37 +1520,39 @@ class DatabaseController(UtilityManager):
         if not updates:
             raise HTTPException(status_code=400, detail="No fields to update")
 
-        with self.db.engine.begin() as conn:
+        with self.db.transaction() as conn:
             # Update payment
             set_clause = ", ".join([f"{k} = :{k}" for k in updates.keys()])
             query = f"""
             UPDATE payments
             SET {set_clause}
-            WHERE payment_id = :payment_id AND user_id = :user_id
+            WHERE payment_id = :payment_id AND user_id = :user_id AND payment_date = :payment_date
             RETURNING *;
             """
-            updates.update({"payment_id": payment_id, "user_id": user_id})
-            updated_payment = conn.execute(text(query), updates).fetchone()
+            updates.update({"payment_id": payment_id, "user_id": user_id, "payment_date": payment["payment_date"]})
+            updated_payment = conn.execute(typed_text(query), updates).fetchone()
             if not updated_payment:
                 raise HTTPException(status_code=404, detail="Payment not found")
             payment_result = dict(updated_payment._mapping) if return_json else updated_payment
 
             # Recalculate total paid and update invoice
+            total_paid_params = {"invoice_id": invoice_id}
             total_paid_query = """
             SELECT SUM(amount) as total_paid
             FROM payments
             WHERE invoice_id = :invoice_id
-            """
-            total_paid_result = conn.execute(text(total_paid_query), {"invoice_id": invoice_id}).fetchone()
+            """ + self._key_date_filter("payment_date", invoice_id, total_paid_params, open_ended=True)
+            total_paid_result = conn.execute(typed_text(total_paid_query), total_paid_params).fetchone()
             total_paid_result = dict(total_paid_result._mapping) if return_json else total_paid_result
             total_paid = total_paid_result["total_paid"] if total_paid_result["total_paid"] is not None else 0.0
 
+            invoice_params = {"invoice_id": invoice_id, "user_id": user_id}
             invoice_query = """
-            SELECT total_amount
+            SELECT total_amount, amount_paid, customer_id, invoice_date
             FROM invoices
             WHERE invoice_id = :invoice_id AND user_id = :user_id
-            """
-            invoice = conn.execute(text(invoice_query), {"invoice_id": invoice_id, "user_id": user_id}).fetchone()
+            """ + self._key_date_filter("invoice_date", invoice_id, invoice_params)
+            invoice = conn.execute(typed_text(invoice_query), invoice_params).fetchone()
             invoice = dict(invoice._mapping) if return_json else invoice
             if not invoice:
                 raise HTTPException(status_code=404, detail="Invoice not found")
@@ -894,15 +1567,23 @@ class DatabaseController(UtilityManager):
             update_invoice_query = """
             UPDATE invoices
             SET amount_paid = :total_paid, payment_status = :payment_status
-            WHERE invoice_id = :invoice_id AND user_id = :user_id
+            WHERE invoice_id = :invoice_id AND user_id = :user_id AND invoice_date = :invoice_date
             RETURNING *;
             """
-            conn.execute(text(update_invoice_query), {
+            conn.execute(typed_text(update_invoice_query), {
                 "total_paid": total_paid,
                 "payment_status": payment_status,
                 "invoice_id": invoice_id,
-                "user_id": user_id
+                "user_id": user_id,
+                "invoice_date": invoice["invoice_date"]
             })
+            self._apply_receivable_delta(
+                conn,
+                user_id=user_id,
+                customer_id=invoice["customer_id"],
+                paid=Decimal(str(total_paid)) - (invoice["amount_paid"] or Decimal("0"))
+            )
+            self._notify_invoice_status(conn, user_id, invoice_id)
 
         return payment_result
     
@@ -914,37 +1595,44 @@ class DatabaseController(UtilityManager):
         return_json: Optional[bool] = False
     ) -> None:
         """Delete a payment and adjust the associated invoice"""
+        pin_to_primary()  # The payment row below must be current, not a replica's copy
         payment = self.get_payment(payment_id, user_id, return_json=True)
         invoice_id = payment["invoice_id"]
 
-        with self.db.engine.begin() as conn:
+        with self.db.transaction() as conn:
             # Delete payment
             delete_query = """
             DELETE FROM payments
-            WHERE payment_id = :payment_id AND user_id = :user_id
+            WHERE payment_id = :payment_id AND user_id = :user_id AND payment_date = :payment_date
             RETURNING *;
             """
-            result = conn.execute(text(delete_query), {"payment_id": payment_id, "user_id": user_id}).fetchone()
+            result = conn.execute(typed_text(delete_query), {
+                "payment_id": payment_id,
+                "user_id": user_id,
+                "payment_date": payment["payment_date"]
+            }).fetchone()
             result = dict(result._mapping) if return_json else result
             if not result:
                 raise HTTPException(status_code=404, detail="Payment not found")
 
             # Recalculate total paid and update invoice
+            total_paid_params = {"invoice_id": invoice_id}
             total_paid_query = """
             SELECT SUM(amount) as total_paid
             FROM payments
             WHERE invoice_id = :invoice_id
-            """
-            total_paid_result = conn.execute(text(total_paid_query), {"invoice_id": invoice_id}).fetchone()
+            """ + self._key_date_filter("payment_date", invoice_id, total_paid_params, open_ended=True)
+            total_paid_result = conn.execute(typed_text(total_paid_query), total_paid_params).fetchone()
             total_paid_result = dict(total_paid_result._mapping) if return_json else total_paid_result
             total_paid = total_paid_result["total_paid"] if total_paid_result["total_paid"] is not None else 0.0
 
+            invoice_params = {"invoice_id": invoice_id, "user_id": user_id}
             invoice_query = """
-            SELECT total_amount
+            SELECT total_amount, amount_paid, customer_id, invoice_date
             FROM invoices
             WHERE invoice_id = :invoice_id AND user_id = :user_id
-            """
-            invoice = conn.execute(text(invoice_query), {"invoice_id": invoice_id, "user_id": user_id}).fetchone()
+            """ + self._key_date_filter("invoice_date", invoice_id, invoice_params)
+            invoice = conn.execute(typed_text(invoice_query), invoice_params).fetchone()
             invoice = dict(invoice._mapping) if return_json else invoice
             if not invoice:
                 raise HTTPException(status_code=404, detail="Invoice not found")
@@ -959,12 +1647,513 @@ class DatabaseController(UtilityManager):
             update_invoice_query = """
             UPDATE invoices
             SET amount_paid = :total_paid, payment_status = :payment_status
-            WHERE invoice_id = :invoice_id AND user_id = :user_id
+            WHERE invoice_id = :invoice_id AND user_id = :user_id AND invoice_date = :invoice_date
             RETURNING *;
             """
-            conn.execute(text(update_invoice_query), {
+            conn.execute(typed_text(update_invoice_query), {
                 "total_paid": total_paid,
                 "payment_status": payment_status,
                 "invoice_id": invoice_id,
-                "user_id": user_id
-            })
\ No newline at end of file
+                "user_id": user_id,
+                "invoice_date": invoice["invoice_date"]
+            })
+            self._apply_receivable_delta(
+                conn,
+                user_id=user_id,
+                customer_id=invoice["customer_id"],
+                paid=Decimal(str(total_paid)) - (invoice["amount_paid"] or Decimal("0"))
+            )
+            self._notify_invoice_status(conn, user_id, invoice_id)
+
+    # ====== Archival Methods ======
+
+    def archive_closed_invoices(self, older_than_days: int = 365, batch_size: int = 500) -> int:
+        """
+        Move fully paid invoices older than `older_than_days`, with their orders and payments, to the
+        Parquet archive; one transaction per batch of `batch_size` invoices. Returns the number archived.
+        Rollups and stock are left as they are: archived sales still happened.
+        """
+        cutoff = datetime.now() - timedelta(days=older_than_days)
+        self._index_committed_batches()
+        archived = 0
+        while True:
+            count = self._archive_invoice_batch(cutoff, batch_size)
+            archived += count
+            if count < batch_size:
+                return archived
+
+    def _archive_invoice_batch(self, cutoff: datetime, batch_size: int) -> int:
+        with self.db.transaction() as conn:
+            # Locked for the batch, so a late payment or edit can't slip in between copy and delete
+            # Jobs run in a shard's scope, which the frozen-write check doesn't cover: skip tenants being moved
+            invoices_query = """
+            SELECT * FROM invoices
+            WHERE payment_status = 'fully_paid' AND invoice_date < :cutoff
+              AND NOT (user_id = ANY(CAST(:frozen_user_ids AS UUID[])))
+            ORDER BY invoice_date
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+            """
+            result = conn.execute(typed_text(invoices_query), {
+                "cutoff": cutoff, "batch_size": batch_size, "frozen_user_ids": self._frozen_tenants()
+            })
+            # One numpy array per column: the frames are built without a per-row pass
+            invoices = pd.DataFrame(shape_result(result, False, False, ResultMode.ARRAYS))
+            if invoices.empty:
+                return 0
+            # Orders share their invoice's transaction timestamp and payments come after it,
+            # which bounds both scans to the batch's date range (and partitions)
+            params = {
+                "invoice_ids": invoices["invoice_id"].astype(str).tolist(),
+                "oldest": invoices["invoice_date"].min().to_pydatetime(),
+                "newest": invoices["invoice_date"].max().to_pydatetime()
+            }
+            orders_filter = "invoice_id = ANY(CAST(:invoice_ids AS UUID[])) AND order_date <= :newest"
+            payments_filter = "invoice_id = ANY(CAST(:invoice_ids AS UUID[])) AND payment_date >= :oldest"
+            result = conn.execute(typed_text(f"SELECT * FROM orders WHERE {orders_filter}"), params)
+            orders = pd.DataFrame(shape_result(result, False, False, ResultMode.ARRAYS))
+            result = conn.execute(typed_text(f"SELECT * FROM payments WHERE {payments_filter}"), params)
+            payments = pd.DataFrame(shape_result(result, False, False, ResultMode.ARRAYS))
+
+            # Written before the delete commits: a failure here leaves the rows hot, never lost.
+            # Indexed (readable) only after it commits, so a rolled-back batch never shadows a
+            # later edit or delete. invoice_numbers keeps the numbers, so archived ones are never reissued.
+            archive = InvoiceArchive()
+            batch = archive.write_batch(invoices, orders, payments)
+            tenants = sorted(invoices["user_id"].astype(str).unique())
+            if set(tenants) & set(self._frozen_tenants()):
+                # A move began while the files were written: deleting now could race its copy
+                logging.info("Archive batch %s left unindexed: a tenant in it is being moved.", batch)
+                return 0
+            after_commit(conn, lambda: archive.index_batch(batch))
+            conn.execute(typed_text(f"DELETE FROM orders WHERE {orders_filter}"), params)
+            conn.execute(typed_text(f"DELETE FROM payments WHERE {payments_filter}"), params)
+            conn.execute(typed_text("""
+            DELETE FROM invoices
+            WHERE invoice_id = ANY(CAST(:invoice_ids AS UUID[])) AND invoice_date BETWEEN :oldest AND :newest
+            """), params)
+            for user_id in tenants:
+                self._bump_change_versions(conn, user_id, ChangeResource.ORDERS)
+        return len(invoices)
+
+    def _index_committed_batches(self) -> None:
+        """
+        Index archived invoices whose delete committed but whose batch was never indexed (the
+        process stopped in between): still registered in invoice_numbers, gone from invoices.
+        A rolled-back batch's invoices are still hot, or were since deleted (unregistered) or
+        archived again (already indexed; newest batches go first and don't replace).
+        """
+        archive = InvoiceArchive()
+        pin_to_primary()  # A replica may not have seen the delete yet
+        query = """
+        SELECT n.invoice_id FROM invoice_numbers n
+        WHERE n.invoice_id = ANY(CAST(:invoice_ids AS UUID[]))
+          AND NOT EXISTS (SELECT 1 FROM invoices i WHERE i.invoice_id = n.invoice_id)
+        """
+        for batch in archive.unindexed_batches():
+            batch_invoices = archive.batch_invoices(batch)
+            if batch_invoices.empty:
+                continue
+            # A batch comes from one shard: any of its tenants routes there. Not the writer's own
+            # connection: rebuild_analytics_rollups calls this while holding SQLite's only one.
+            with tenant_scope(str(batch_invoices["user_id"].iloc[0])), self.db.read_engine().connect() as conn:
+                archived = set(map(str, conn.execute(
+                    typed_text(query), {"invoice_ids": batch_invoices["invoice_id"].astype(str).tolist()}
+                ).scalars()))
+            if archived:
+                archive.index_batch(batch, invoice_ids=archived, replace=False)
+
+    # ====== Search Methods ======
+
+    def search_invoices(
+        self,
+        user_id: str,
+        customer_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        payment_status: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict:
+        """Invoices matching the filters, newest first, one page at a time, with totals over every match"""
+        filters, params = self._search_filters(
+            user_id, "invoice_date", "total_amount", customer_id, start_date, end_date, min_amount, max_amount
+        )
+        if payment_status:
+            # Unpaid invoices start as 'Pending' (the column default); payment updates write 'pending'
+            filters += " AND LOWER(payment_status) = :payment_status"
+            params["payment_status"] = payment_status.lower()
+        totals = {
+            "invoice_count": "COUNT(*)",
+            "total_amount": "COALESCE(SUM(total_amount), 0)",
+            "amount_paid": "COALESCE(SUM(amount_paid), 0)"
+        }
+        return self._keyset_search("invoices", "invoice_date", "invoice_id", filters, totals, params, cursor, limit)
+
+    def search_orders(
+        self,
+        user_id: str,
+        customer_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        payment_status: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict:
+        """Orders matching the filters (payment_status is their invoice's), newest first, with totals over every match"""
+        filters, params = self._search_filters(
+            user_id, "order_date", "amount", customer_id, start_date, end_date, min_amount, max_amount
+        )
+        if payment_status:
+            filters += """ AND invoice_id IN (
+                SELECT invoice_id FROM invoices WHERE user_id = :user_id AND LOWER(payment_status) = :payment_status
+            )"""
+            params["payment_status"] = payment_status.lower()
+        totals = {
+            "order_count": "COUNT(*)",
+            "quantity": "COALESCE(SUM(quantity), 0)",
+            "amount": "COALESCE(SUM(amount), 0)"
+        }
+        return self._keyset_search("orders", "order_date", "order_id", filters, totals, params, cursor, limit)
+
+    def export_orders(
+        self,
+        user_id: str,
+        customer_id: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Iterator[Tuple]:
+        """Order lines matching the filters, oldest first, as (EXPORT_ORDER_COLUMNS) tuples read lazily"""
+        filters, params = self._search_filters(user_id, "order_date", "amount", customer_id, start_date, end_date, None, None)
+        query = f"""
+        SELECT {", ".join(EXPORT_ORDER_COLUMNS)}
+        FROM orders
+        WHERE {filters}
+        ORDER BY order_date, order_id
+        """
+        # Server-side cursor: the export never holds more than one batch of rows
+        return self.db.execute_query(query, params=params, read_only=True, result_mode=ResultMode.ITERATOR)
+
+    @staticmethod
+    def _search_filters(
+        user_id: str,
+        date_column: str,
+        amount_column: str,
+        customer_id: Optional[str],
+        start_date: Optional[date],
+        end_date: Optional[date],
+        min_amount: Optional[float],
+        max_amount: Optional[float]
+    ) -> Tuple[str, Dict]:
+        """WHERE conditions and their params, shaped for the (user_id[, customer_id], date, key) indexes"""
+        filters = "user_id = :user_id"
+        params: Dict[str, Any] = {"user_id": user_id}
+        if customer_id:
+            filters += " AND customer_id = :customer_id"
+            params["customer_id"] = customer_id
+        # Half-open timestamp range: whole days, and the partitions outside it are pruned
+        if start_date:
+            filters += f" AND {date_column} >= :date_from"
+            params["date_from"] = datetime.combine(start_date, datetime.min.time())
+        if end_date:
+            filters += f" AND {date_column} < :date_until"
+            params["date_until"] = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        if min_amount is not None:
+            filters += f" AND {amount_column} >= :min_amount"
+            params["min_amount"] = Decimal(str(min_amount))
+        if max_amount is not None:
+            filters += f" AND {amount_column} <= :max_amount"
+            params["max_amount"] = Decimal(str(max_amount))
+        return filters, params
+
+    def _keyset_search(
+        self,
+        table: str,
+        date_column: str,
+        key_column: str,
+        filters: str,
+        totals: Dict[str, str],
+        params: Dict,
+        cursor: Optional[str],
+        limit: int
+    ) -> Dict:
+        """
+        One page of `table` rows after `cursor`, ordered by (date, key) descending, and `totals`
+        over all the rows matching `filters`, in a single query. The page seeks past the cursor
+        in the index instead of skipping rows with OFFSET, so every page costs the same.
+        """
+        page_filters = filters
+        if cursor:
+            params["after_date"], params["after_key"] = self._decode_search_cursor(cursor)
+            page_filters += f" AND ({date_column}, {key_column}) < (:after_date, :after_key)"
+        params["page_size"] = limit + 1  # One row past the page tells whether there is a next one
+        query = f"""
+        SELECT totals.*, page.*
+        FROM (SELECT {", ".join(f"{expression} AS {name}" for name, expression in totals.items())}
+              FROM {table} WHERE {filters}) totals
+        LEFT JOIN (
+            SELECT * FROM {table}
+            WHERE {page_filters}
+            ORDER BY {date_column} DESC, {key_column} DESC
+            LIMIT :page_size
+        ) page ON TRUE
+        ORDER BY page.{date_column} DESC, page.{key_column} DESC
+        """
+        result = self.db.execute_query(query, params=params, read_only=True, result_mode=ResultMode.TUPLES)
+        if "error" in result:
+            raise HTTPException(status_code=500, detail=result["error"])
+
+        # Totals lead every row; a page past the last match is the totals alone, with NULL rows
+        columns = result["columns"][len(totals):]
+        totals_row = result["rows"][0][:len(totals)] if result["rows"] else [0] * len(totals)
+        rows = [dict(zip(columns, row[len(totals):])) for row in result["rows"] if row[len(totals)] is not None]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_search_cursor(rows[-1][date_column], rows[-1][key_column])
+        return {
+            table: rows,
+            "totals": dict(zip(totals, totals_row)),
+            "next_cursor": next_cursor
+        }
+
+    @staticmethod
+    def _encode_search_cursor(after_date: datetime, after_key: str) -> str:
+        """Opaque cursor for the position after the last row of a page"""
+        position = json.dumps([after_date.isoformat(), str(after_key)])
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def _decode_search_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            after_date, after_key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(after_date), str(after_key)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # ====== Analytics Methods ======
+
+    def _apply_sales_delta(
+        self,
+        conn,
+        user_id: str,
+        sales_date: Union[datetime, date],
+        product_id: str,
+        customer_id: Optional[str],
+        order_count: int,
+        quantity: int,
+        amount: Union[float, Decimal]
+    ) -> None:
+        """Add a delta to the daily sales rollup inside the caller's transaction"""
+        query = """
+        INSERT INTO daily_sales_rollup (user_id, sales_date, product_id, customer_id, order_count, quantity, amount)
+        VALUES (:user_id, CAST(:sales_date AS DATE), :product_id, COALESCE(:customer_id, ''), :order_count, :quantity, :amount)
+        ON CONFLICT (user_id, sales_date, product_id, customer_id) DO UPDATE SET
+            order_count = daily_sales_rollup.order_count + EXCLUDED.order_count,
+            quantity = daily_sales_rollup.quantity + EXCLUDED.quantity,
+            amount = daily_sales_rollup.amount + EXCLUDED.amount
+        """
+        conn.execute(typed_text(query), {
+            "user_id": user_id,
+            "sales_date": sales_date,
+            "product_id": product_id,
+            "customer_id": customer_id,
+            "order_count": order_count,
+            "quantity": quantity,
+            "amount": amount
+        })
+
+    def _apply_receivable_delta(
+        self,
+        conn,
+        user_id: str,
+        customer_id: Optional[str],
+        invoiced: Union[float, Decimal] = 0,
+        paid: Union[float, Decimal] = 0
+    ) -> None:
+        """Add a delta to the customer receivables rollup inside the caller's transaction"""
+        if not invoiced and not paid:
+            return
+        query = """
+        INSERT INTO customer_receivables_rollup (user_id, customer_id, total_invoiced, total_paid)
+        VALUES (:user_id, COALESCE(:customer_id, ''), :invoiced, :paid)
+        ON CONFLICT (user_id, customer_id) DO UPDATE SET
+            total_invoiced = customer_receivables_rollup.total_invoiced + EXCLUDED.total_invoiced,
+            total_paid = customer_receivables_rollup.total_paid + EXCLUDED.total_paid,
+            updated_at = CURRENT_TIMESTAMP
+        """
+        conn.execute(typed_text(query), {
+            "user_id": user_id,
+            "customer_id": customer_id,
+            "invoiced": invoiced,
+            "paid": paid
+        })
+
+    def get_daily_sales(
+        self,
+        user_id: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        product_id: Optional[str] = None,
+        customer_id: Optional[str] = None,
+        return_json: Optional[bool] = False,
+        result_mode: ResultMode = ResultMode.ROWS
+    ) -> Union[List[Dict], Dict[str, List]]:
+        """Fetch sales totals per day from the rollup, optionally for one product or customer"""
+        query = """
+        SELECT sales_date, SUM(order_count) AS order_count, SUM(quantity) AS quantity, SUM(amount) AS amount
+        FROM daily_sales_rollup
+        WHERE user_id = :user_id
+          AND (CAST(:start_date AS DATE) IS NULL OR sales_date >= :start_date)
+          AND (CAST(:end_date AS DATE) IS NULL OR sales_date <= :end_date)
+          AND (CAST(:product_id AS VARCHAR) IS NULL OR product_id = :product_id)
+          AND (CAST(:customer_id AS VARCHAR) IS NULL OR customer_id = :customer_id)
+        GROUP BY sales_date
+        HAVING SUM(order_count) <> 0
+        ORDER BY sales_date
+        """
+        params = {
+            "user_id": user_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "product_id": product_id,
+            "customer_id": customer_id
+        }
+        return self.db.execute_query(query, params=params, return_json=return_json, read_only=True, result_mode=result_mode)
+
+    def get_sales_by_product(
+        self,
+        user_id: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: int = 50,
+        return_json: Optional[bool] = False,
+        result_mode: ResultMode = ResultMode.ROWS
+    ) -> Union[List[Dict], Dict[str, List]]:
+        """Fetch the top selling products for a date range from the rollup"""
+        query = """
+        SELECT product_id, SUM(order_count) AS order_count, SUM(quantity) AS quantity, SUM(amount) AS amount
+        FROM daily_sales_rollup
+        WHERE user_id = :user_id
+          AND (CAST(:start_date AS DATE) IS NULL OR sales_date >= :start_date)
+          AND (CAST(:end_date AS DATE) IS NULL OR sales_date <= :end_date)
+        GROUP BY product_id
+        HAVING SUM(order_count) <> 0
+        ORDER BY amount DESC
+        LIMIT :limit
+        """
+        params = {"user_id": user_id, "start_date": start_date, "end_date": end_date, "limit": limit}
+        return self.db.execute_query(query, params=params, return_json=return_json, read_only=True, result_mode=result_mode)
+
+    def get_sales_by_customer(
+        self,
+        user_id: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        limit: int = 50,
+        return_json: Optional[bool] = False,
+        result_mode: ResultMode = ResultMode.ROWS
+    ) -> Union[List[Dict], Dict[str, List]]:
+        """Fetch the top customers by sales for a date range from the rollup"""
+        query = """
+        SELECT NULLIF(customer_id, '') AS customer_id, SUM(order_count) AS order_count,
+               SUM(quantity) AS quantity, SUM(amount) AS amount
+        FROM daily_sales_rollup
+        WHERE user_id = :user_id
+          AND (CAST(:start_date AS DATE) IS NULL OR sales_date >= :start_date)
+          AND (CAST(:end_date AS DATE) IS NULL OR sales_date <= :end_date)
+        GROUP BY customer_id
+        HAVING SUM(order_count) <> 0
+        ORDER BY amount DESC
+        LIMIT :limit
+        """
+        params = {"user_id": user_id, "start_date": start_date, "end_date": end_date, "limit": limit}
+        return self.db.execute_query(query, params=params, return_json=return_json, read_only=True, result_mode=result_mode)
+
+    def get_receivables(
+        self,
+        user_id: str,
+        outstanding_only: bool = True,
+        return_json: Optional[bool] = False,
+        result_mode: ResultMode = ResultMode.ROWS
+    ) -> Union[List[Dict], Dict[str, List]]:
+        """Fetch invoiced, paid and outstanding amounts per customer from the rollup"""
+        outstanding_clause = "AND total_invoiced - total_paid > 0" if outstanding_only else ""
+        query = f"""
+        SELECT NULLIF(customer_id, '') AS customer_id, total_invoiced, total_paid,
+               total_invoiced - total_paid AS outstanding, updated_at
+        FROM customer_receivables_rollup
+        WHERE user_id = :user_id {outstanding_clause}
+        ORDER BY outstanding DESC
+        """
+        return self.db.execute_query(query, params={"user_id": user_id}, return_json=return_json, read_only=True, result_mode=result_mode)
+
+    def rebuild_analytics_rollups(self, user_id: str) -> None:
+        """
+        Recompute a tenant's rollups from the base tables and the invoice archive, e.g. after a
+        reconciliation (archived sales and receivables still count). The hot tables are read in
+        one snapshot; archived invoices still visible in it are counted from the hot copy only,
+        so a batch archived meanwhile is neither lost nor counted twice.
+        """
+        params = {"user_id": user_id}
+        with self.db.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level=self.db.SNAPSHOT_ISOLATION_LEVEL)
+            with conn.begin():
+                # First statement: fixes the snapshot. Batches committed before it are indexed next.
+                hot_invoice_ids = set(map(str, conn.execute(
+                    typed_text("SELECT invoice_id FROM invoices WHERE user_id = :user_id"), params
+                ).scalars()))
+                self._index_committed_batches()
+                archive = InvoiceArchive()
+                archived_orders = archive.read_tenant("orders", user_id)
+                archived_invoices = archive.read_tenant("invoices", user_id)
+
+                conn.execute(typed_text("DELETE FROM daily_sales_rollup WHERE user_id = :user_id"), params)
+                conn.execute(typed_text("DELETE FROM customer_receivables_rollup WHERE user_id = :user_id"), params)
+                conn.execute(typed_text("""
+                INSERT INTO daily_sales_rollup (user_id, sales_date, product_id, customer_id, order_count, quantity, amount)
+                SELECT user_id, CAST(order_date AS DATE), product_id, COALESCE(CAST(customer_id AS VARCHAR), ''),
+                       COUNT(*), SUM(quantity), SUM(amount)
+                FROM orders
+                WHERE user_id = :user_id
+                GROUP BY user_id, CAST(order_date AS DATE), product_id, COALESCE(CAST(customer_id AS VARCHAR), '')
+                """), params)
+                conn.execute(typed_text("""
+                INSERT INTO customer_receivables_rollup (user_id, customer_id, total_invoiced, total_paid)
+                SELECT user_id, COALESCE(CAST(customer_id AS VARCHAR), ''), SUM(total_amount), SUM(COALESCE(amount_paid, 0))
+                FROM invoices
+                WHERE user_id = :user_id
+                GROUP BY user_id, COALESCE(CAST(customer_id AS VARCHAR), '')
+                """), params)
+
+                if not archived_orders.empty:
+                    archived_orders = archived_orders[~archived_orders["invoice_id"].astype(str).isin(hot_invoice_ids)]
+                    archived_orders = archived_orders.assign(
+                        sales_date=pd.to_datetime(archived_orders["order_date"]).dt.date,
+                        customer_id=archived_orders["customer_id"].map(lambda c: None if pd.isna(c) else str(c))
+                    )
+                    sales = archived_orders.groupby(["sales_date", "product_id", "customer_id"], dropna=False).agg(
+                        order_count=("order_id", "count"), quantity=("quantity", "sum"), amount=("amount", "sum")
+                    )
+                    for (sales_date, product_id, customer_id), row in sales.iterrows():
+                        self._apply_sales_delta(
+                            conn, user_id, sales_date, str(product_id), None if pd.isna(customer_id) else customer_id,
+                            int(row["order_count"]), int(row["quantity"]), Decimal(str(row["amount"]))
+                        )
+                if not archived_invoices.empty:
+                    archived_invoices = archived_invoices[~archived_invoices["invoice_id"].astype(str).isin(hot_invoice_ids)]
+                    archived_invoices = archived_invoices.assign(
+                        customer_id=archived_invoices["customer_id"].map(lambda c: None if pd.isna(c) else str(c))
+                    )
+                    receivables = archived_invoices.groupby("customer_id", dropna=False).agg(
+                        invoiced=("total_amount", "sum"), paid=("amount_paid", "sum")
+                    )
+                    for customer_id, row in receivables.iterrows():
+                        self._apply_receivable_delta(
+                            conn, user_id, None if pd.isna(customer_id) else customer_id,
+                            invoiced=Decimal(str(row["invoiced"])), paid=Decimal(str(row["paid"] or 0))
+                        )
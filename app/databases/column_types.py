@@ -0,0 +1,121 @@
+import re
+import uuid
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Dict
+from sqlalchemy import Integer, String, bindparam, text
+from sqlalchemy.exc import DBAPIError, StatementError
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.types import Numeric, TypeDecorator, TypeEngine
+from app.databases.uuid_key_migration import UUID_KEY_COLUMNS
+
+
+# SQLSTATE for input that doesn't parse as the column type (e.g. a non-UUID key)
+INVALID_TEXT_REPRESENTATION = "22P02"
+
+
+class MalformedKey(ValueError):
+    """A key that isn't a UUID: it can't match any row."""
+
+
+class UuidKey(TypeDecorator):
+    """
+    A uuid key in the API's string form, checked before the query is sent. Bound without a
+    ::uuid cast: the rollups compare the same parameters with their VARCHAR keys.
+    """
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = str(value)
+        try:
+            uuid.UUID(value)
+        except ValueError:
+            raise MalformedKey(f"{value!r} is not a valid key") from None
+        return value
+
+
+class Money(TypeDecorator):
+    """DECIMAL(10, 2) amounts, bound as Decimal (floats go through their shortest repr, not binary)."""
+    impl = Numeric(10, 2)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(Numeric(10, 2))
+        # SQLite's Numeric binds as float; as text the NUMERIC column keeps the exact value
+        return dialect.type_descriptor(String())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, Decimal):
+            return value
+        return Decimal(str(value))
+
+
+class Quantity(TypeDecorator):
+    """INTEGER counts, bound as int."""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"{value} is not a whole number")
+        return int(value)
+
+
+# Declared types of the columns that queries bind parameters to. Parameters are named after
+# their column, so one name has one type across tables.
+TABLE_COLUMNS: Dict[str, Dict[str, TypeEngine]] = {
+    table: {column: UuidKey() for column in columns} for table, columns in UUID_KEY_COLUMNS.items()
+}
+TABLE_COLUMNS["products"].update(
+    quantity=Quantity(), mrp=Money(), distributer_landing=Money(), selling_price=Money()
+)
+TABLE_COLUMNS["orders"].update(quantity=Quantity(), rate=Money(), amount=Money())
+TABLE_COLUMNS["invoices"].update(total_amount=Money(), amount_paid=Money())
+TABLE_COLUMNS["payments"].update(amount=Money())
+TABLE_COLUMNS["stock_movements"].update(quantity_delta=Quantity())
+TABLE_COLUMNS["stock_snapshots"].update(quantity=Quantity())
+
+
+def _parameter_types() -> Dict[str, TypeEngine]:
+    types: Dict[str, TypeEngine] = {}
+    for table, columns in TABLE_COLUMNS.items():
+        for column, column_type in columns.items():
+            declared = types.setdefault(column, column_type)
+            if type(declared) is not type(column_type):
+                raise TypeError(f"{table}.{column} is {column_type!r}, elsewhere {declared!r}")
+    return types
+
+
+PARAMETER_TYPES = _parameter_types()
+# text()'s own rule for :name parameters (not '::' casts, not escaped '\:')
+_PARAMETER = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+
+
+@lru_cache(maxsize=1024)
+def typed_text(query: str) -> TextClause:
+    """
+    text(query) with the declared type of each parameter bound to a known column. Other
+    parameters are bound as the Python values passed. Built once per query string.
+    """
+    names = dict.fromkeys(_PARAMETER.findall(query))
+    return text(query).bindparams(
+        *(bindparam(name, type_=PARAMETER_TYPES[name]) for name in names if name in PARAMETER_TYPES)
+    )
+
+
+def is_invalid_parameter(error: StatementError) -> bool:
+    """True when a declared type rejected a value (a malformed key or number) before it reached the database."""
+    return not isinstance(error, DBAPIError) and isinstance(error.orig, (ValueError, InvalidOperation))
+
+
+def is_malformed_key(error: StatementError) -> bool:
+    """True when a key wasn't a UUID, whether its declared type or Postgres rejected it."""
+    if isinstance(error, DBAPIError):
+        return getattr(error.orig, "pgcode", None) == INVALID_TEXT_REPRESENTATION
+    return isinstance(error.orig, MalformedKey)
@@ -0,0 +1,23 @@
+import os
+from typing import Union
+from app.databases.postgres_database_manager import PostgreSQLManager
+from app.databases.sqlite_database_manager import SQLiteManager
+from app.enums.env_keys import EnvKeys
+
+DatabaseManager = Union[PostgreSQLManager, SQLiteManager]
+BACKENDS = {
+    "postgres": PostgreSQLManager,
+    "sqlite": SQLiteManager,
+}
+
+
+def get_database_manager() -> DatabaseManager:
+    """
+    The storage backend selected by DATABASE_BACKEND. Both managers offer the same interface:
+    execute_query/stream_query, engine (transactions), read_engine, all_engines, query_engines, for_each_shard,
+    create_tables, and `shards`/`replicas` (None where unsupported).
+    """
+    backend = os.getenv(EnvKeys.DATABASE_BACKEND.value, "postgres").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown DATABASE_BACKEND '{backend}'; expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[backend]()
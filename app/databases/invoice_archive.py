@@ -0,0 +1,160 @@
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Set
+import pandas as pd
+from app.enums.env_keys import EnvKeys
+from app.utils.generate_uuid import generate_uuid
+
+ARCHIVE_TABLES = ("invoices", "orders", "payments")
+INDEX_FILE = "index.db"
+PARQUET_COMPRESSION = "zstd"
+
+
+def _records(frame: pd.DataFrame) -> List[Dict]:
+    """Parquet rows back as plain Python values (datetimes, Decimals, None), like database rows."""
+    records = []
+    for record in frame.astype(object).to_dict("records"):
+        for key, value in record.items():
+            if isinstance(value, pd.Timestamp):
+                record[key] = value.to_pydatetime()
+            elif value is pd.NaT or (isinstance(value, float) and value != value):
+                record[key] = None
+        records.append(record)
+    return records
+
+
+class InvoiceArchive:
+    """
+    Cold storage for closed invoices. Each archival batch is a directory of Parquet files
+    (invoices, orders, payments); a small SQLite index maps invoice numbers and IDs to their
+    batch, so a read-through only opens the one batch holding the invoice.
+    """
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(InvoiceArchive, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "directory"):  # Prevent reinitialization
+            self.directory = Path(os.getenv(EnvKeys.INVOICE_ARCHIVE_DIR.value, "archive"))
+
+    def _index(self) -> sqlite3.Connection:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index = sqlite3.connect(self.directory / INDEX_FILE)
+        index.execute("""
+        CREATE TABLE IF NOT EXISTS archived_invoices (
+            invoice_number TEXT PRIMARY KEY,
+            invoice_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            batch TEXT NOT NULL
+        )
+        """)
+        index.execute("CREATE INDEX IF NOT EXISTS idx_archived_invoices_invoice_id ON archived_invoices (invoice_id)")
+        return index
+
+    def write_batch(self, invoices: pd.DataFrame, orders: pd.DataFrame, payments: pd.DataFrame) -> str:
+        """
+        Write one batch's files; returns the batch name. The files are complete before the batch
+        directory appears under its final name, so readers never see a partial one. Reads only
+        find the batch once index_batch() has run, after the rows' delete commits.
+        """
+        batch = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{generate_uuid()[-12:]}"
+        staging = self.directory / f".{batch}"
+        staging.mkdir(parents=True)
+        for table, frame in zip(ARCHIVE_TABLES, (invoices, orders, payments)):
+            frame.to_parquet(staging / f"{table}.parquet", compression=PARQUET_COMPRESSION, index=False)
+        staging.rename(self.directory / batch)
+        logging.info("Wrote %d invoices to archive batch %s.", len(invoices), batch)
+        return batch
+
+    def batch_invoices(self, batch: str) -> pd.DataFrame:
+        """invoice_number, invoice_id and user_id of every invoice in a batch."""
+        return pd.read_parquet(
+            self.directory / batch / "invoices.parquet", columns=["invoice_number", "invoice_id", "user_id"]
+        )
+
+    def index_batch(self, batch: str, invoice_ids: Optional[Set[str]] = None, replace: bool = True) -> None:
+        """
+        Make a written batch's invoices (or only `invoice_ids` of them) readable through find_invoice
+        and find_rows. With `replace`, the batch supersedes an earlier copy of the same invoice;
+        without it, invoices already indexed keep their batch.
+        """
+        entries = [
+            (invoice_number, str(invoice_id), str(user_id), batch)
+            for invoice_number, invoice_id, user_id in self.batch_invoices(batch).itertuples(index=False)
+            if invoice_ids is None or str(invoice_id) in invoice_ids
+        ]
+        with closing(self._index()) as index, index:
+            index.executemany(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO archived_invoices VALUES (?, ?, ?, ?)", entries
+            )
+        logging.info("Indexed %d archived invoices of batch %s.", len(entries), batch)
+
+    def unindexed_batches(self) -> List[str]:
+        """
+        Written batches without index entries, newest first: in flight, rolled back, or their
+        indexing was interrupted.
+        """
+        if not self.directory.exists():
+            return []
+        with closing(self._index()) as index:
+            indexed = {batch for (batch,) in index.execute("SELECT DISTINCT batch FROM archived_invoices")}
+        return sorted((
+            path.name for path in self.directory.iterdir()
+            if path.is_dir() and not path.name.startswith(".") and path.name not in indexed
+        ), reverse=True)
+
+    def read_tenant(self, table: str, user_id: str) -> pd.DataFrame:
+        """Every indexed archived row of `table` for one tenant (empty if there are none)."""
+        if not (self.directory / INDEX_FILE).exists():
+            return pd.DataFrame()
+        with closing(sqlite3.connect(self.directory / INDEX_FILE)) as index:
+            batches = [batch for (batch,) in index.execute(
+                "SELECT DISTINCT batch FROM archived_invoices WHERE user_id = ? ORDER BY batch", (str(user_id),)
+            )]
+        frames = [
+            pd.read_parquet(self.directory / batch / f"{table}.parquet", filters=[("user_id", "==", str(user_id))])
+            for batch in batches
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _lookup(self, column: str, value: str) -> Optional[sqlite3.Row]:
+        if not (self.directory / INDEX_FILE).exists():
+            return None
+        with closing(sqlite3.connect(self.directory / INDEX_FILE)) as index:
+            index.row_factory = sqlite3.Row
+            return index.execute(
+                f"SELECT invoice_id, user_id, batch FROM archived_invoices WHERE {column} = ?", (value,)
+            ).fetchone()
+
+    def _read(self, batch: str, table: str, invoice_id: str) -> List[Dict]:
+        frame = pd.read_parquet(
+            self.directory / batch / f"{table}.parquet",
+            filters=[("invoice_id", "==", invoice_id)]
+        )
+        return _records(frame)
+
+    def find_invoice(self, invoice_number: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """The archived invoice with this number, or None (also when it isn't the user's)."""
+        entry = self._lookup("invoice_number", invoice_number)
+        if entry is None or (user_id is not None and entry["user_id"] != str(user_id)):
+            return None
+        invoices = self._read(entry["batch"], "invoices", entry["invoice_id"])
+        return invoices[0] if invoices else None
+
+    def find_rows(self, table: str, invoice_id: str, user_id: Optional[str] = None) -> List[Dict]:
+        """Archived orders or payments of an invoice (empty if it isn't archived or isn't the user's)."""
+        entry = self._lookup("invoice_id", str(invoice_id))
+        if entry is None or (user_id is not None and entry["user_id"] != str(user_id)):
+            return []
+        return self._read(entry["batch"], table, entry["invoice_id"])
@@ -0,0 +1,56 @@
+import time
+from collections import deque
+from threading import Lock
+from typing import Deque, Tuple
+from sqlalchemy.pool import QueuePool
+
+
+class PoolWaitMonitor:
+    """Recent connection checkout wait times, shared by every MonitoredQueuePool in the process."""
+    _instance = None
+    _lock = Lock()
+    # Samples older than this no longer count, so shedding recovers once the pool drains
+    WINDOW_SECONDS = 5.0
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(PoolWaitMonitor, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "samples"):  # Prevent reinitialization
+            self.samples: Deque[Tuple[float, float]] = deque(maxlen=1000)
+            self.samples_lock = Lock()
+
+    def record(self, wait_seconds: float) -> None:
+        with self.samples_lock:
+            self.samples.append((time.monotonic(), wait_seconds))
+
+    def recent_wait_seconds(self) -> float:
+        """Mean checkout wait over the last WINDOW_SECONDS (0.0 when idle)."""
+        cutoff = time.monotonic() - self.WINDOW_SECONDS
+        with self.samples_lock:
+            recent = [wait for at, wait in self.samples if at >= cutoff]
+        return sum(recent) / len(recent) if recent else 0.0
+
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a free connection, and how many are waiting."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self._waiting_lock = Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        with self._waiting_lock:
+            self.waiting += 1
+        try:
+            return super()._do_get()
+        finally:
+            with self._waiting_lock:
+                self.waiting -= 1
+            PoolWaitMonitor().record(time.perf_counter() - started)
@@ -0,0 +1,234 @@
+"""
+Monthly range partitions. Old partitions are detached by the daily maintenance job once
+PARTITION_DETACH_AFTER_MONTHS is set, or by hand (on every shard):
+
+    python -m app.databases.partition_manager <table> <before YYYY-MM-DD>
+"""
+import argparse
+import logging
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# Tables range-partitioned by month, and their partition key.
+# Invoices come first: converting them drops the foreign keys that orders/payments point at them.
+PARTITIONED_TABLES: Dict[str, str] = {
+    "invoices": "invoice_date",
+    "orders": "order_date",
+    "payments": "payment_date",
+}
+# Partitioned (per-partition) indexes for the lookups the controller makes without a date
+PARTITIONED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_invoices_invoice_id ON invoices (invoice_id)",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_user_date ON invoices (user_id, invoice_date)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_invoice_id ON orders (invoice_id)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_user_date ON orders (user_id, order_date)",
+    "CREATE INDEX IF NOT EXISTS idx_payments_invoice_id ON payments (invoice_id)",
+]
+# Invoice and order search: each filter's rows in keyset order, so a page is one index range scan.
+# Created by create_tables, and again here since converting a table to partitions drops its indexes.
+SEARCH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_invoices_user_date_key ON invoices (user_id, invoice_date DESC, invoice_id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_user_customer_date_key ON invoices (user_id, customer_id, invoice_date DESC, invoice_id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_invoices_user_status_date_key ON invoices (user_id, LOWER(payment_status), invoice_date DESC, invoice_id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_user_date_key ON orders (user_id, order_date DESC, order_id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_user_customer_date_key ON orders (user_id, customer_id, order_date DESC, order_id DESC)",
+]
+
+_PARTITION_NAME_PATTERN = re.compile(r"^(?P<table>\w+)_y(?P<year>\d{4})m(?P<month>\d{2})$")
+
+
+def month_start(value: date, offset: int = 0) -> date:
+    """First day of the month `offset` months after `value`'s month."""
+    month_index = value.year * 12 + value.month - 1 + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+class PartitionManager:
+    """
+    Monthly range partitions for orders, invoices and payments.
+
+    Partitioned tables can't be referenced by a single-column foreign key, so orders/payments
+    lose their FK to invoices (delete_invoice removes them explicitly) and invoice numbers are
+    kept unique by the `invoice_numbers` registry instead of a UNIQUE constraint.
+    """
+
+    def __init__(self, engine: Engine, months_ahead: int = 3, detach_after_months: int = 0):
+        self.engine = engine
+        self.months_ahead = months_ahead
+        # Partitions this many months older than the current month get detached (0 keeps them all)
+        self.detach_after_months = detach_after_months
+
+    def setup(self) -> None:
+        """Convert any still-unpartitioned table, then make sure upcoming partitions exist."""
+        with self.engine.begin() as conn:
+            # Serialize workers starting together; the others find the work done
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('partition_manager'))"))
+            for table, column in PARTITIONED_TABLES.items():
+                if self._table_exists(conn, table) and not self._is_partitioned(conn, table):
+                    self._convert(conn, table, column)
+            for index_query in PARTITIONED_INDEXES + SEARCH_INDEXES:
+                conn.execute(text(index_query))
+        self.ensure_partitions()
+
+    def ensure_partitions(self) -> List[str]:
+        """Create this month's and the next `months_ahead` months' partitions; returns those created."""
+        created = []
+        this_month = month_start(date.today())
+        with self.engine.begin() as conn:
+            for table in PARTITIONED_TABLES:
+                if not self._is_partitioned(conn, table):
+                    continue
+                existing = set(self._partitions(conn, table))
+                for offset in range(self.months_ahead + 1):
+                    month = month_start(this_month, offset)
+                    if partition_name(table, month) not in existing:
+                        self._create_partition(conn, table, month)
+                        created.append(partition_name(table, month))
+        if created:
+            logging.info("Created partitions: %s", ", ".join(created))
+        return created
+
+    def maintain(self) -> Dict[str, List[str]]:
+        """
+        The periodic maintenance pass: create upcoming partitions and, with a retention window,
+        detach the partitions that have fallen out of it. Returns the partitions created and detached.
+        """
+        result = {"created": self.ensure_partitions(), "detached": []}
+        if self.detach_after_months > 0:
+            cutoff = month_start(date.today(), -self.detach_after_months)
+            for table in PARTITIONED_TABLES:
+                result["detached"].extend(self.detach_partitions_before(table, cutoff))
+        return result
+
+    def detach_partitions_before(self, table: str, before: date) -> List[str]:
+        """
+        Detach `table`'s monthly partitions that end on or before `before`, for archival.
+        Detached partitions stay as ordinary tables (same name) until archived and dropped.
+        """
+        if table not in PARTITIONED_TABLES:
+            raise ValueError(f"{table} is not a partitioned table")
+        detached = []
+        with self.engine.begin() as conn:
+            if not self._is_partitioned(conn, table):
+                return detached
+            for name, month in self._monthly_partitions(conn, table):
+                if month_start(month, 1) <= before:
+                    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                    detached.append(name)
+        if detached:
+            logging.info("Detached partitions of %s: %s", table, ", ".join(detached))
+        return detached
+
+    def _monthly_partitions(self, conn, table: str) -> List[Tuple[str, date]]:
+        monthly = []
+        for name in self._partitions(conn, table):
+            match = _PARTITION_NAME_PATTERN.match(name)
+            if match and match.group("table") == table:
+                monthly.append((name, date(int(match.group("year")), int(match.group("month")), 1)))
+        return sorted(monthly, key=lambda partition: partition[1])
+
+    @staticmethod
+    def _table_exists(conn, table: str) -> bool:
+        return conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table}).scalar()
+
+    @staticmethod
+    def _is_partitioned(conn, table: str) -> bool:
+        query = "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+        return conn.execute(text(query), {"table": table}).scalar()
+
+    @staticmethod
+    def _partitions(conn, table: str) -> List[str]:
+        query = """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(:table)
+        """
+        return [row.relname for row in conn.execute(text(query), {"table": table})]
+
+    @staticmethod
+    def _create_partition(conn, table: str, month: date) -> None:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_start(month, 1).isoformat()}')"
+        ))
+
+    def _convert(self, conn, table: str, column: str) -> None:
+        """Rebuild an ordinary table as a partitioned one, copying its rows (holds an exclusive lock)."""
+        logging.info("Converting %s to monthly partitions by %s", table, column)
+        legacy = f"{table}_unpartitioned"
+        conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+
+        primary_key = [row.attname for row in conn.execute(text("""
+        SELECT a.attname
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = to_regclass(:table) AND i.indisprimary
+        ORDER BY array_position(i.indkey, a.attnum)
+        """), {"table": table})]
+        foreign_keys = conn.execute(text("""
+        SELECT conname, conrelid = to_regclass(:table) AS outgoing,
+               conrelid::regclass::text AS table_name,
+               confrelid::regclass::text AS referenced_table,
+               pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE contype = 'f' AND (conrelid = to_regclass(:table) OR confrelid = to_regclass(:table))
+        """), {"table": table}).fetchall()
+        # Incoming keys can't point at a partitioned table's partial key; drop them for good
+        for fk in foreign_keys:
+            if not fk.outgoing or fk.referenced_table == table:
+                conn.execute(text(f'ALTER TABLE {fk.table_name} DROP CONSTRAINT "{fk.conname}"'))
+
+        bounds = conn.execute(text(f"SELECT MIN({column}), MAX({column}) FROM {table}")).fetchone()
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+        conn.execute(text(
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({column})"
+        ))
+        key_columns = [name for name in primary_key if name != column] + [column]
+        conn.execute(text(
+            f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL, ADD PRIMARY KEY ({', '.join(key_columns)})"
+        ))
+        for fk in foreign_keys:
+            if fk.outgoing and fk.referenced_table not in PARTITIONED_TABLES:
+                conn.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT "{fk.conname}" {fk.definition}'))
+
+        self._create_covering_partitions(conn, table, bounds)
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+        columns = ", ".join(
+            f'"{row.column_name}"' for row in conn.execute(text("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = :table
+            ORDER BY ordinal_position
+            """), {"table": table})
+        )
+        conn.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}"))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+
+    def _create_covering_partitions(self, conn, table: str, bounds: Tuple[Optional[datetime], Optional[datetime]]) -> None:
+        """Monthly partitions from the oldest existing row's month to `months_ahead` months from now."""
+        oldest, newest = bounds
+        first = month_start(oldest or date.today())
+        last = month_start(max(newest.date() if newest else date.today(), date.today()), self.months_ahead)
+        month = first
+        while month <= last:
+            self._create_partition(conn, table, month)
+            month = month_start(month, 1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Detach a partitioned table's monthly partitions ending on or before a date")
+    parser.add_argument("table", choices=list(PARTITIONED_TABLES))
+    parser.add_argument("before", type=date.fromisoformat)
+    arguments = parser.parse_args()
+    from app.databases.postgres_database_manager import PostgreSQLManager
+    db = PostgreSQLManager()
+    db.for_each_shard(lambda: db.partition_manager().detach_partitions_before(arguments.table, arguments.before))
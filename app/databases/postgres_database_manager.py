@@ -3,15 +3,59 @@ import json
 import os
 import logging
 import traceback
-from typing import Optional, Dict, Any, Union, List
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.engine import URL
-from sqlalchemy.exc import SQLAlchemyError
+from typing import Callable, ContextManager, Optional, Dict, Any, Union, List, Iterator
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, scoped_session
+from sqlalchemy.engine import URL, Connection, Engine
+from sqlalchemy.exc import DataError, OperationalError, SQLAlchemyError, StatementError
 from app.utils.utility_manager import UtilityManager
+from app.databases.column_types import INVALID_TEXT_REPRESENTATION, is_invalid_parameter, typed_text
+from app.databases.result_shaping import empty_result, shape_result
+from app.databases.monitored_pool import MonitoredQueuePool
+from app.databases.stock_snapshot_migration import migrate_stock_snapshots
+from app.databases.uuid_key_migration import migrate_keys_to_uuid
+from app.databases.partition_manager import SEARCH_INDEXES, PartitionManager
+from app.databases.replica_router import ReplicaRouter
+from app.databases.shard_router import DEFAULT_SHARD, ShardRouter, shard_scope
+from app.databases.unit_of_work import current_unit_of_work, transaction
+from app.enums.env_keys import EnvKeys
+from app.enums.result_modes import ResultMode
+
+UUID_OID = 2950
+UUID_ARRAY_OID = 2951
+
+
+def _uuid_values_as_strings(dbapi_connection, connection_record) -> None:
+    """
+    Keep uuid key columns in the API's string format. SQLAlchemy registers psycopg2's
+    uuid.UUID conversion on connect; this listener runs after it and overrides it.
+    """
+    from psycopg2 import extensions
+    uuid_as_string = extensions.new_type((UUID_OID,), "UUID_AS_STRING", lambda value, cursor: value)
+    extensions.register_type(uuid_as_string, dbapi_connection)
+    extensions.register_type(
+        extensions.new_array_type((UUID_ARRAY_OID,), "UUID_AS_STRING[]", uuid_as_string), dbapi_connection
+    )
+
 
 class PostgreSQLManager(UtilityManager):
     _instance = None
+    # Isolation level giving a transaction one snapshot for all its statements
+    SNAPSHOT_ISOLATION_LEVEL = "REPEATABLE READ"
+    # Sync version of a writing transaction: its own (64-bit, never reused) transaction id, plus the
+    # tenant's offset in its sync counter row. The row is only read here (so writers don't queue on
+    # it); it carries the version from the counter this replaced, and is raised by tenant moves.
+    CHANGE_VERSION_QUERY = """
+    SELECT txid_current() + COALESCE((
+        SELECT version FROM tenant_change_counters WHERE user_id = :user_id AND resource = :resource
+    ), 0)
+    """
+    # Sync versions below this are final: every transaction with a smaller id has ended, as of the snapshot
+    CHANGE_HORIZON_QUERY = """
+    SELECT txid_snapshot_xmin(txid_current_snapshot()) + COALESCE((
+        SELECT version FROM tenant_change_counters WHERE user_id = :user_id AND resource = :resource
+    ), 0)
+    """
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -37,7 +81,6 @@ class PostgreSQLManager(UtilityManager):
         self.database = database or os.getenv('POSTGRES_DB_NAME')
         self.user = user or os.getenv('POSTGRES_DB_USER')
         self.password = password or os.getenv('POSTGRES_DB_PASSWORD')
-        print(self.password)
         self.port = port or int(os.getenv('POSTGRES_DB_PORT', '5432'))
         self.schema = schema or os.getenv('POSTGRES_DB_SCHEMA')
         self.ssl_mode = ssl_mode or os.getenv('POSTGRES_SSLMODE', 'prefer')
@@ -57,14 +100,37 @@ class PostgreSQLManager(UtilityManager):
             logging.info(f"Connecting to PostgreSQL at {self.host}:{self.port}/{self.database}")
 
             # Create engine
-            self.engine = create_engine(connection_url, pool_pre_ping=True)
+            # MonitoredQueuePool reports checkout waits for admission control's load shedding
+            self.primary_engine = self._create_engine(connection_url)
             
             # Create scoped session
-            session_factory = sessionmaker(bind=self.engine)
+            session_factory = sessionmaker(bind=self.primary_engine)
             self._session = scoped_session(session_factory)
 
+            # Optional tenant shards (name=url pairs); this database is the default shard
+            shard_urls = dict(
+                pair.strip().split("=", 1) for pair in os.getenv(EnvKeys.POSTGRES_SHARD_URLS.value, "").split(",")
+                if pair.strip()
+            )
+            self.shards = ShardRouter(
+                {DEFAULT_SHARD: self.primary_engine, **{
+                    name.strip(): self._create_engine(url.strip()) for name, url in shard_urls.items()
+                }},
+                cache_seconds=float(os.getenv(EnvKeys.SHARD_DIRECTORY_CACHE_SECONDS.value, "5"))
+            ) if shard_urls else None
+
+            # Optional read replicas (of the default shard) for read_only queries
+            replica_urls = [url.strip() for url in os.getenv(EnvKeys.POSTGRES_REPLICA_URLS.value, "").split(",") if url.strip()]
+            self.replicas = ReplicaRouter(
+                primary=self.primary_engine,
+                urls=replica_urls,
+                max_lag_seconds=float(os.getenv(EnvKeys.POSTGRES_REPLICA_MAX_LAG_SECONDS.value, "5")),
+                check_interval_seconds=float(os.getenv(EnvKeys.POSTGRES_REPLICA_CHECK_SECONDS.value, "5")),
+                on_connect=_uuid_values_as_strings
+            ) if replica_urls else None
+
             # Verify connection
-            with self.engine.connect() as connection:
+            with self.primary_engine.connect() as connection:
                 logging.info("Database connection established successfully")
 
             self.initialized = True
@@ -74,16 +140,87 @@ class PostgreSQLManager(UtilityManager):
             logging.debug(traceback.format_exc())
             raise
 
+    @staticmethod
+    def _create_engine(url) -> Engine:
+        # MonitoredQueuePool reports checkout waits for admission control's load shedding
+        engine = create_engine(url, pool_pre_ping=True, poolclass=MonitoredQueuePool)
+        event.listen(engine, "connect", _uuid_values_as_strings)
+        return engine
+
+    @property
+    def engine(self) -> Engine:
+        """Engine of the current tenant's shard (see ShardRouter); the one database without sharding."""
+        return self.shards.engine() if self.shards else self.primary_engine
+
+    def all_engines(self) -> List[Engine]:
+        return list(self.shards.engines.values()) if self.shards else [self.primary_engine]
+
+    def query_engines(self) -> List[Engine]:
+        """Every engine a request's statements can run on: each shard's primary and each read replica."""
+        replicas = [replica.engine for replica in self.replicas.replicas] if self.replicas else []
+        return self.all_engines() + replicas
+
+    def for_each_shard(self, func: Callable[[], Any]) -> None:
+        """Run `func` once per shard, routed to that shard (schema setup, maintenance jobs)."""
+        if not self.shards:
+            func()
+            return
+        for name in self.shards.names:
+            with shard_scope(name):
+                func()
+
+    def _on_default_shard(self) -> bool:
+        return not self.shards or self.shards.current_shard() == DEFAULT_SHARD
+
     def get_session(self):
         """Get a database session."""
+        if not self._on_default_shard():
+            return self.shards.sessions[self.shards.current_shard()]()
         return self._session()
 
+    def read_engine(self) -> Engine:
+        """Engine for this request's reads: a healthy, caught-up replica, else the primary."""
+        replica = self.replicas.for_request() if self.replicas and self._on_default_shard() else None
+        return replica.engine if replica else self.engine
+
+    def transaction(self) -> ContextManager[Connection]:
+        """Connection in a transaction on the current shard; the request's unit of work inside a request."""
+        return transaction(self.engine)
+
+    def journal_high_water_mark(self, lock_timeout_seconds: float) -> int:
+        """
+        Largest stock movement id at or below which no movement can still commit. Ids are drawn
+        when a row is inserted, not when its transaction commits, so the journal is fenced first:
+        SHARE mode waits out the transactions that have inserted movements, holding back new
+        inserts meanwhile (for at most `lock_timeout_seconds`, then OperationalError).
+        """
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{int(lock_timeout_seconds * 1000)}ms'")
+            conn.exec_driver_sql("LOCK TABLE stock_movements IN SHARE MODE")
+            return conn.exec_driver_sql("SELECT COALESCE(MAX(movement_id), 0) FROM stock_movements").scalar_one()
+
+    @staticmethod
+    def lock_product_stock(conn: Connection, product_ids: List[str]) -> None:
+        """
+        Serialize stock decreases of these products until `conn`'s transaction ends, so an on-hand
+        check sees every sale committed before it. A transaction-scoped advisory lock per product:
+        the products rows themselves stay unlocked for reads and unrelated updates. Taken in one
+        order, so two multi-product orders can't deadlock on them.
+        """
+        for product_id in sorted(set(map(str, product_ids))):
+            conn.execute(
+                typed_text("SELECT pg_advisory_xact_lock(hashtext('stock'), hashtext(CAST(:product_id AS TEXT)))"),
+                {"product_id": product_id}
+            )
+
     def execute_query(
         self, 
         query: str, 
         params: Optional[Dict[str, Any]] = None, 
         fetch_one: bool = False,
-        return_json: bool = False
+        return_json: bool = False,
+        read_only: bool = False,
+        result_mode: ResultMode = ResultMode.ROWS
     ) -> Union[Dict[str, Any], List[Dict[str, Any]], Any]:
         """
         Execute a SQL query with optional parameters.
@@ -93,51 +230,62 @@ class PostgreSQLManager(UtilityManager):
             params: Optional dictionary of query parameters
             fetch_one: If True, fetch single row, otherwise fetch all rows
             return_json: If True, return results as JSON objects
+            read_only: If True, the query may run on a read replica (see ReplicaRouter)
+            result_mode: Shape of the rows (see ResultMode); ITERATOR streams them from a
+                server-side cursor on a connection of its own (see stream_query)
             
         Returns:
             Query results in requested format, or error dictionary if query fails
         """
+        if result_mode is ResultMode.ITERATOR:
+            return self.stream_query(query, params, return_json=return_json, read_only=read_only)
+        replica = self.replicas.for_request() if read_only and self.replicas and self._on_default_shard() else None
+        unit_of_work = current_unit_of_work() if replica is None else None
         try:
-            session = self.get_session()
-            
-            # Ensure all parameters are strings where needed
-            if params:
-                params = {
-                    k: str(v) if isinstance(v, (int, float)) or (
-                        isinstance(v, str) and len(v) == 36
-                    ) else v 
-                    for k, v in params.items()
-                }
-
-            logging.debug(f"Executing query: {query}")
-            logging.debug(f"Query parameters: {params}")
-
-            # Use text() for safe parameter binding
-            result = session.execute(text(query), params or {})
-
-            if query.strip().lower().startswith("select") or "returning" in query.lower():
-                # Fetch results for SELECT or RETURNING queries
-                if return_json:
-                    # Get column names from result
-                    columns = result.keys()
-                    
-                    if fetch_one:
-                        row = result.fetchone()
-                        data = dict(zip(columns, row)) if row else None
-                    else:
-                        # Create list of dictionaries for all rows
-                        data = [dict(zip(columns, row)) for row in result.fetchall()]
-                else:
-                    # Original behavior
-                    data = result.fetchone() if fetch_one else result.fetchall()
+            if replica:
+                session = replica.sessions()
+            elif unit_of_work:
+                # Inside the request's transaction; a savepoint undoes just this statement if it fails
+                session = Session(bind=unit_of_work.connection(self.engine), join_transaction_mode="create_savepoint")
             else:
-                data = None  # No result needed for non-SELECT queries
+                session = self.get_session()
+
+            # Lazy %-style args: nothing is formatted unless DEBUG is enabled (and sampled)
+            logging.debug("Executing query: %s", query)
+            logging.debug("Query parameters: %s", params)
+
+            # Parameters bound to known columns go out with their declared types (see column_types)
+            result = session.execute(typed_text(query), params or {})
+
+            if result.returns_rows:
+                # Fetch results of any row-returning statement (SELECT, WITH, RETURNING), in the requested shape
+                data = shape_result(result, fetch_one, return_json, result_mode)
+            else:
+                data = None  # No rows to fetch
 
             session.commit()  # Commit the transaction
             return data  # Return fetched data
             
+        except DataError as e:
+            session.rollback()
+            if getattr(e.orig, "pgcode", None) != INVALID_TEXT_REPRESENTATION:
+                logging.error(f"Database query error: {e}")
+                return {"error": str(e)}
+            # A malformed ID (not a UUID) cannot match any row
+            logging.info("Query with malformed key treated as no match: %s", e.orig)
+            return empty_result(fetch_one, result_mode)
+
         except SQLAlchemyError as e:
             session.rollback()
+            if isinstance(e, StatementError) and is_invalid_parameter(e):
+                # Rejected by its declared type before it was sent, like a malformed key by the server
+                logging.info("Query with malformed parameter treated as no match: %s", e.orig)
+                return empty_result(fetch_one, result_mode)
+            if replica is not None and isinstance(e, OperationalError):
+                # Unreachable replica or a recovery conflict: out of rotation, answer from the primary
+                logging.warning(f"Read on replica {replica.name} failed, retrying on the primary: {e}")
+                self.replicas.mark_unhealthy(replica)
+                return self.execute_query(query, params, fetch_one, return_json, result_mode=result_mode)
             logging.error(f"Database query error: {e}")
             logging.debug(traceback.format_exc())
             return {"error": str(e)}
@@ -145,12 +293,62 @@ class PostgreSQLManager(UtilityManager):
         finally:
             session.close()  # Close session instead of rollback
             
+    def stream_query(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+        return_json: bool = True,
+        read_only: bool = False
+    ) -> Iterator[Any]:
+        """
+        Stream the rows of a SELECT query through a server-side cursor.
+
+        Args:
+            query: SQL query string
+            params: Optional dictionary of query parameters
+            batch_size: Number of rows fetched from the server per round trip
+            return_json: If False, yield the Row tuples themselves instead of dictionaries
+            read_only: If True, the query may run on a read replica (see ReplicaRouter)
+
+        Returns:
+            Iterator of one dictionary (or Row) per row; at most `batch_size` rows are held in memory
+        """
+        # Chosen now, in the caller's tenant scope: the rows are read later, often after it has exited
+        engine = self.read_engine() if read_only else self.engine
+        return self._stream_rows(engine, query, params, batch_size, return_json)
+
+    @staticmethod
+    def _stream_rows(
+        engine: Engine, query: str, params: Optional[Dict[str, Any]], batch_size: int, return_json: bool
+    ) -> Iterator[Any]:
+        try:
+            with engine.connect() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                    typed_text(query), params or {}
+                )
+                if not return_json:
+                    yield from result
+                    return
+                columns = list(result.keys())
+                for row in result:
+                    yield dict(zip(columns, row))
+        except SQLAlchemyError as e:
+            logging.error(f"Database stream error: {e}")
+            logging.debug(traceback.format_exc())
+            raise
+
     def create_tables(self):
-        """Create required tables if they do not exist."""
+        """Create required tables if they do not exist, on every shard."""
+        if self.shards:
+            self.shards.ensure_directory()
+        self.for_each_shard(self._create_tables)
+
+    def _create_tables(self):
         queries = [
                 """
                 CREATE TABLE IF NOT EXISTS users (
-                user_id VARCHAR(50) PRIMARY KEY,
+                user_id UUID PRIMARY KEY,
                 username VARCHAR(50) NOT NULL,
                 password VARCHAR(255) NOT NULL,
                 email VARCHAR(100),
@@ -166,9 +364,12 @@ class PostgreSQLManager(UtilityManager):
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
                 """,
                 """
+                CREATE INDEX IF NOT EXISTS idx_users_email ON users (email);
+                """,
+                """
                 CREATE TABLE IF NOT EXISTS customers (
-                    customer_id VARCHAR(50) PRIMARY KEY,
-                    user_id VARCHAR(50) NOT NULL,
+                    customer_id UUID PRIMARY KEY,
+                    user_id UUID NOT NULL,
                     customer_name VARCHAR(100) NOT NULL,
                     phone_number VARCHAR(20),
                     contact_info VARCHAR(100),
@@ -178,13 +379,13 @@ class PostgreSQLManager(UtilityManager):
                 """,
                 """
                 CREATE TABLE IF NOT EXISTS products (
-                    product_id VARCHAR(50),
-                    user_id VARCHAR(50),
+                    product_id UUID,
+                    user_id UUID,
                     product VARCHAR(100) NOT NULL,
                     weight VARCHAR(50),
                     batch_number VARCHAR(50),
                     expiry_date DATE,
-                    quantity INTEGER NOT NULL CHECK (quantity >= 0),
+                    quantity INTEGER NOT NULL,
                     mrp DECIMAL(10, 2) NOT NULL,
                     distributer_landing DECIMAL(10, 2),
                     selling_price DECIMAL(10, 2) NOT NULL,
@@ -194,12 +395,12 @@ class PostgreSQLManager(UtilityManager):
                 """,
                 """
                 CREATE TABLE IF NOT EXISTS orders (
-                    order_id VARCHAR(50),
-                    product_id VARCHAR(50),
-                    user_id VARCHAR(50),
-                    customer_id VARCHAR(50),
+                    order_id UUID,
+                    product_id UUID,
+                    user_id UUID,
+                    customer_id UUID,
                     created_by_name VARCHAR(50),
-                    invoice_id VARCHAR(50),
+                    invoice_id UUID,
                     quantity INTEGER NOT NULL CHECK (quantity > 0),
                     rate DECIMAL(10, 2) NOT NULL,
                     amount DECIMAL(10, 2) NOT NULL,
@@ -213,9 +414,9 @@ class PostgreSQLManager(UtilityManager):
                 """,
                 """
                  CREATE TABLE IF NOT EXISTS invoices (
-                    invoice_id VARCHAR(50) PRIMARY KEY,
-                    user_id VARCHAR(50) NOT NULL,
-                    customer_id VARCHAR(50),
+                    invoice_id UUID PRIMARY KEY,
+                    user_id UUID NOT NULL,
+                    customer_id UUID,
                     invoice_number VARCHAR(50) NOT NULL UNIQUE,
                     invoice_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     total_amount DECIMAL(10, 2) NOT NULL,
@@ -228,9 +429,9 @@ class PostgreSQLManager(UtilityManager):
                 """,
                 """
                 CREATE TABLE IF NOT EXISTS payments(
-                    payment_id VARCHAR(50) PRIMARY KEY,
-                    invoice_id VARCHAR(50) NOT NULL,
-                    user_id VARCHAR(50) NOT NULL,
+                    payment_id UUID PRIMARY KEY,
+                    invoice_id UUID NOT NULL,
+                    user_id UUID NOT NULL,
                     amount DECIMAL(10, 2) NOT NULL,
                     payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     payment_method VARCHAR(50),  -- e.g., 'cash', 'credit_card', 'bank_transfer'
@@ -239,13 +440,187 @@ class PostgreSQLManager(UtilityManager):
                     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
                 );
                 """,
+                # Append-only stock journal. No foreign keys so inserts never lock
+                # the (hot) product row and history survives product deletion.
+                """
+                CREATE TABLE IF NOT EXISTS stock_movements (
+                    movement_id BIGSERIAL PRIMARY KEY,
+                    product_id UUID NOT NULL,
+                    user_id UUID NOT NULL,
+                    quantity_delta INTEGER NOT NULL,
+                    reason VARCHAR(30) NOT NULL,
+                    reference_id VARCHAR(50),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS idx_stock_movements_product_time
+                    ON stock_movements (user_id, product_id, created_at);
+                """,
+                # The journal tail after a product's compacted quantity, read by every stock lookup
+                """
+                CREATE INDEX IF NOT EXISTS idx_stock_movements_product_movement
+                    ON stock_movements (user_id, product_id, movement_id);
+                """,
+                # Stock changes reach incremental sync through the journal, not the product row
+                "ALTER TABLE stock_movements ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0;",
+                "CREATE INDEX IF NOT EXISTS idx_stock_movements_user_change_version ON stock_movements (user_id, change_version);",
+                """
+                CREATE TABLE IF NOT EXISTS stock_snapshots (
+                    product_id UUID NOT NULL,
+                    user_id UUID NOT NULL,
+                    snapshot_at TIMESTAMP NOT NULL,
+                    quantity INTEGER NOT NULL,
+                    through_movement_id BIGINT NOT NULL,
+                    PRIMARY KEY (user_id, product_id, snapshot_at)
+                );
+                """,
+                # Snapshots from before movement-id high-water marks: see migrate_stock_snapshots
+                "ALTER TABLE stock_snapshots ADD COLUMN IF NOT EXISTS through_movement_id BIGINT;",
+                # products.quantity is the quantity compacted up to stock_through_movement_id; the on-hand
+                # quantity adds the journal after it. Stock writes only append to the journal, so the
+                # CHECK on the row can't see them: decreases are checked under a per-product advisory
+                # lock instead (see lock_product_stock).
+                "ALTER TABLE products ADD COLUMN IF NOT EXISTS stock_through_movement_id BIGINT;",
+                "ALTER TABLE products DROP CONSTRAINT IF EXISTS products_quantity_check;",
+                # Seed an opening balance for products that predate the journal
+                """
+                INSERT INTO stock_movements (product_id, user_id, quantity_delta, reason)
+                SELECT p.product_id, p.user_id, p.quantity, 'opening_balance'
+                FROM products p
+                WHERE p.stock_through_movement_id IS NULL AND NOT EXISTS (
+                    SELECT 1 FROM stock_movements m
+                    WHERE m.user_id = p.user_id AND m.product_id = p.product_id
+                );
+                """,
+                # Products whose quantity was kept up to date in place: all of their journal is already in it
+                """
+                UPDATE products p SET stock_through_movement_id = COALESCE((
+                    SELECT MAX(m.movement_id) FROM stock_movements m
+                    WHERE m.user_id = p.user_id AND m.product_id = p.product_id
+                ), 0)
+                WHERE p.stock_through_movement_id IS NULL;
+                """,
+                "ALTER TABLE products ALTER COLUMN stock_through_movement_id SET DEFAULT 0;",
+                # Analytics rollups, maintained incrementally by the order and payment write paths.
+                # customer_id is '' for orders without a customer so it can be part of the key.
+                """
+                CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+                    user_id VARCHAR(50) NOT NULL,
+                    sales_date DATE NOT NULL,
+                    product_id VARCHAR(50) NOT NULL,
+                    customer_id VARCHAR(50) NOT NULL DEFAULT '',
+                    order_count INTEGER NOT NULL DEFAULT 0,
+                    quantity INTEGER NOT NULL DEFAULT 0,
+                    amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, sales_date, product_id, customer_id)
+                );
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS customer_receivables_rollup (
+                    user_id VARCHAR(50) NOT NULL,
+                    customer_id VARCHAR(50) NOT NULL DEFAULT '',
+                    total_invoiced DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                    total_paid DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, customer_id)
+                );
+                """,
+                # One-off backfill the first time the rollups are created on an existing database
+                """
+                INSERT INTO daily_sales_rollup (user_id, sales_date, product_id, customer_id, order_count, quantity, amount)
+                SELECT user_id, CAST(order_date AS DATE), product_id, COALESCE(CAST(customer_id AS VARCHAR), ''),
+                       COUNT(*), SUM(quantity), SUM(amount)
+                FROM orders
+                WHERE NOT EXISTS (SELECT 1 FROM daily_sales_rollup)
+                GROUP BY user_id, CAST(order_date AS DATE), product_id, COALESCE(CAST(customer_id AS VARCHAR), '');
+                """,
+                """
+                INSERT INTO customer_receivables_rollup (user_id, customer_id, total_invoiced, total_paid)
+                SELECT user_id, COALESCE(CAST(customer_id AS VARCHAR), ''), SUM(total_amount), SUM(COALESCE(amount_paid, 0))
+                FROM invoices
+                WHERE NOT EXISTS (SELECT 1 FROM customer_receivables_rollup)
+                GROUP BY user_id, COALESCE(CAST(customer_id AS VARCHAR), '');
+                """,
+                # Shared token buckets for RATE_LIMIT_BACKEND=postgres; UNLOGGED since losing them on a crash is harmless
+                """
+                CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+                    bucket_key VARCHAR(255) PRIMARY KEY,
+                    tokens DOUBLE PRECISION NOT NULL,
+                    allowed BOOLEAN NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL
+                );
+                """,
+                # Per-tenant list versions behind the list endpoints' ETags; bumped by every write path
+                """
+                CREATE TABLE IF NOT EXISTS tenant_change_counters (
+                    user_id UUID REFERENCES users(user_id) ON DELETE CASCADE,
+                    resource VARCHAR(50) NOT NULL,
+                    version BIGINT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, resource)
+                );
+                """,
+                # Incremental sync: rows carry the tenant sync version of their last change, deletes leave tombstones
+                "ALTER TABLE products ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0;",
+                "ALTER TABLE customers ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0;",
+                "CREATE INDEX IF NOT EXISTS idx_products_user_change_version ON products (user_id, change_version);",
+                "CREATE INDEX IF NOT EXISTS idx_customers_user_change_version ON customers (user_id, change_version);",
+                """
+                CREATE TABLE IF NOT EXISTS sync_tombstones (
+                    user_id UUID REFERENCES users(user_id) ON DELETE CASCADE,
+                    resource VARCHAR(50) NOT NULL,
+                    row_id VARCHAR(50) NOT NULL,
+                    change_version BIGINT NOT NULL,
+                    deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, resource, row_id)
+                );
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user_change_version ON sync_tombstones (user_id, change_version);",
+                # Invoice number -> invoice key and partition key. Keeps numbers unique once invoices are
+                # partitioned (a partitioned table's unique indexes must include invoice_date)
+                """
+                CREATE TABLE IF NOT EXISTS invoice_numbers (
+                    invoice_number VARCHAR(50) PRIMARY KEY,
+                    invoice_id UUID NOT NULL,
+                    invoice_date TIMESTAMP,
+                    user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE
+                );
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_invoice_numbers_invoice_id ON invoice_numbers (invoice_id);",
+                """
+                INSERT INTO invoice_numbers (invoice_number, invoice_id, invoice_date, user_id)
+                SELECT invoice_number, invoice_id, invoice_date, user_id FROM invoices
+                WHERE NOT EXISTS (SELECT 1 FROM invoice_numbers)
+                ON CONFLICT (invoice_number) DO NOTHING;
+                """,
             ]
         try:
-            for query in queries:
+            # Existing databases: retype key columns before new tables add uuid foreign keys to them
+            migrate_keys_to_uuid(self.engine)
+        except Exception as e:
+            logging.error(f"Key column migration to uuid failed: {e}")
+        try:
+            for query in queries + SEARCH_INDEXES:
                 self.execute_query(query=query)
             logging.info("Tables created successfully (if not exist).")
         except Exception as e:
             logging.error(str(e))
+        try:
+            migrate_stock_snapshots(self.engine)
+        except Exception as e:
+            logging.error(f"Stock snapshot migration failed: {e}")
+        if os.getenv(EnvKeys.TABLE_PARTITIONING.value, "False").lower() in ("true", "1", "yes"):
+            try:
+                self.partition_manager().setup()
+            except Exception as e:
+                logging.error(f"Table partitioning setup failed: {e}")
+
+    def partition_manager(self) -> PartitionManager:
+        return PartitionManager(
+            self.engine,
+            months_ahead=int(os.getenv(EnvKeys.PARTITION_MONTHS_AHEAD.value, "3")),
+            detach_after_months=int(os.getenv(EnvKeys.PARTITION_DETACH_AFTER_MONTHS.value, "0"))
+        )
         
 
          
\ No newline at end of file
@@ -0,0 +1,157 @@
+import contextvars
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, List, Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker
+from app.base.log_pipeline import request_id_var
+
+REPLICA_CONNECT_TIMEOUT_SECONDS = 3
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received
+# (pg_last_xact_replay_timestamp alone would grow while the primary is idle). Having replayed
+# everything received says nothing when nothing is being received, so a replica whose WAL
+# receiver is gone, not streaming, or silent for longer than the primary's keepalive period
+# (wal_sender_timeout / 2, 30s by default) counts as infinitely behind. The receiver's status
+# and receipt time are only visible to roles with pg_read_all_stats; without it, only a
+# missing receiver is caught.
+RECEIVER_SILENCE_SECONDS = 60
+LAG_QUERY = f"""
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN NOT EXISTS (
+        SELECT 1 FROM pg_stat_wal_receiver
+        WHERE COALESCE(status, 'streaming') = 'streaming'
+          AND COALESCE(last_msg_receipt_time, now()) > now() - interval '{RECEIVER_SILENCE_SECONDS} seconds'
+    ) THEN 'Infinity'::float8
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: Engine
+    sessions: sessionmaker
+    healthy: bool = True
+    lag_seconds: float = 0.0
+    checked_at: float = 0.0
+    checking: bool = False
+
+
+@dataclass
+class _RoutingState:
+    """Routing decisions of one request: pinned after its first write, sticky to one replica."""
+    request_id: Optional[str]
+    pinned: bool = False
+    replica: Optional[Replica] = None
+
+
+_routing_state: contextvars.ContextVar[Optional[_RoutingState]] = contextvars.ContextVar("routing_state", default=None)
+
+
+def _current_state() -> _RoutingState:
+    # Keyed by request ID: a state inherited from the context that started the server
+    # (e.g. create_tables at startup) doesn't carry over into requests
+    request_id = request_id_var.get()
+    state = _routing_state.get()
+    if state is None or state.request_id != request_id:
+        state = _RoutingState(request_id)
+        _routing_state.set(state)
+    return state
+
+
+def pin_to_primary() -> None:
+    """Send the rest of this request's reads to the primary (read-your-writes)."""
+    _current_state().pinned = True
+
+
+def _pin_on_write(conn, cursor, statement, parameters, context, executemany) -> None:
+    if not statement.lstrip()[:6].lower() == "select":
+        pin_to_primary()
+
+
+class ReplicaRouter:
+    """
+    Round-robin over read replicas that are reachable and no more than `max_lag_seconds` behind.
+    Health and lag are re-checked at most every `check_interval_seconds` per replica, by whichever
+    request finds the check due. Returns None (use the primary) when no replica qualifies.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        urls: List[str],
+        max_lag_seconds: float,
+        check_interval_seconds: float,
+        on_connect: Callable
+    ):
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.replicas: List[Replica] = []
+        for url in urls:
+            engine = create_engine(
+                url,
+                pool_pre_ping=True,
+                connect_args={"connect_timeout": REPLICA_CONNECT_TIMEOUT_SECONDS}
+            )
+            event.listen(engine, "connect", on_connect)
+            name = make_url(url).render_as_string(hide_password=True)
+            self.replicas.append(Replica(name=name, engine=engine, sessions=sessionmaker(bind=engine)))
+        self.rotation = itertools.count()
+        self.lock = Lock()
+        # Anything but a SELECT on the primary pins the request there
+        event.listen(primary, "before_cursor_execute", _pin_on_write)
+        logging.info("Routing reads to %d replica(s): %s", len(self.replicas), ", ".join(r.name for r in self.replicas))
+
+    def for_request(self) -> Optional[Replica]:
+        """The replica this request reads from, or None for the primary."""
+        state = _current_state()
+        if state.pinned:
+            return None
+        if state.replica is not None and self._usable(state.replica):
+            # Sticky: replicas replay at different speeds, so a second replica could be older than the first
+            return state.replica
+        state.replica = self._choose()
+        return state.replica
+
+    def _choose(self) -> Optional[Replica]:
+        start = next(self.rotation)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            self._refresh_if_due(replica)
+            if self._usable(replica):
+                return replica
+        return None
+
+    def _usable(self, replica: Replica) -> bool:
+        return replica.healthy and replica.lag_seconds <= self.max_lag_seconds
+
+    def _refresh_if_due(self, replica: Replica) -> None:
+        with self.lock:
+            if replica.checking or time.monotonic() - replica.checked_at < self.check_interval_seconds:
+                return
+            replica.checking = True
+        try:
+            with replica.engine.connect() as conn:
+                replica.lag_seconds = float(conn.execute(text(LAG_QUERY)).scalar() or 0)
+            if not replica.healthy:
+                logging.info("Replica %s is back (lag %.1fs).", replica.name, replica.lag_seconds)
+            replica.healthy = True
+        except Exception as e:
+            if replica.healthy:
+                logging.warning("Replica %s failed its health check: %s", replica.name, e)
+            replica.healthy = False
+        finally:
+            replica.checked_at = time.monotonic()
+            replica.checking = False
+
+    def mark_unhealthy(self, replica: Replica) -> None:
+        """Take a replica out of rotation until its next health check."""
+        replica.healthy = False
+        replica.checked_at = time.monotonic()
@@ -0,0 +1,35 @@
+from typing import Any, List
+import numpy as np
+from sqlalchemy.engine import Result
+from app.enums.result_modes import ResultMode
+
+
+def shape_result(result: Result, fetch_one: bool, return_json: bool, result_mode: ResultMode) -> Any:
+    """Fetch a query's rows in the shape execute_query's caller asked for (see ResultMode)."""
+    if result_mode is ResultMode.ROWS:
+        if return_json:
+            columns = result.keys()
+            if fetch_one:
+                row = result.fetchone()
+                return dict(zip(columns, row)) if row else None
+            return [dict(zip(columns, row)) for row in result.fetchall()]
+        return result.fetchone() if fetch_one else result.fetchall()
+
+    columns = list(result.keys())
+    rows = result.fetchmany(1) if fetch_one else result.fetchall()
+    if result_mode is ResultMode.TUPLES:
+        return {"columns": columns, "rows": [tuple(row) for row in rows]}
+    # Transposed in C; an empty result still has every column
+    values: List[tuple] = list(zip(*rows)) if rows else [()] * len(columns)
+    if result_mode is ResultMode.ARRAYS:
+        return {column: np.array(column_values) for column, column_values in zip(columns, values)}
+    return {column: list(column_values) for column, column_values in zip(columns, values)}
+
+
+def empty_result(fetch_one: bool, result_mode: ResultMode) -> Any:
+    """What a query matching no rows returns, in the caller's shape (for queries that never ran)."""
+    if result_mode is ResultMode.TUPLES:
+        return {"columns": [], "rows": []}
+    if result_mode in (ResultMode.COLUMNS, ResultMode.ARRAYS):
+        return {}
+    return None if fetch_one else []
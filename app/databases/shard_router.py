@@ -0,0 +1,183 @@
+import contextvars
+import functools
+import hashlib
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Iterator, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import sessionmaker
+
+# The original database: holds the tenant directory and the users table of record, and every
+# tenant that was never placed elsewhere
+DEFAULT_SHARD = "default"
+
+_tenant_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("tenant", default=None)
+_shard_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("shard", default=None)
+
+
+@contextmanager
+def tenant_scope(user_id: Optional[str]) -> Iterator[None]:
+    """Route the database work inside the block to `user_id`'s shard."""
+    token = _tenant_var.set(str(user_id) if user_id is not None else None)
+    try:
+        yield
+    finally:
+        _tenant_var.reset(token)
+
+
+@contextmanager
+def shard_scope(shard: str) -> Iterator[None]:
+    """Route the database work inside the block to one shard, whatever the tenant."""
+    token = _shard_var.set(shard)
+    try:
+        yield
+    finally:
+        _shard_var.reset(token)
+
+
+def set_request_tenant(user_id: str) -> None:
+    """Tenant of the current request (set by the auth dependency, lasts until the request ends)."""
+    _tenant_var.set(user_id)
+
+
+def current_tenant() -> Optional[str]:
+    return _tenant_var.get()
+
+
+def route_by_tenant(cls):
+    """Class decorator: run every public method that takes a `user_id` in that tenant's scope."""
+    for name, func in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.isfunction(func):
+            continue
+        signature = inspect.signature(func)
+        if "user_id" in signature.parameters:
+            setattr(cls, name, _in_tenant_scope(func, signature))
+    return cls
+
+
+def _in_tenant_scope(func, signature: inspect.Signature):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        user_id = signature.bind_partial(*args, **kwargs).arguments.get("user_id")
+        if user_id is None:
+            return func(*args, **kwargs)
+        with tenant_scope(user_id):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@dataclass
+class DirectoryEntry:
+    shard: str
+    frozen: bool
+    expires_at: float
+
+
+class ShardRouter:
+    """
+    Maps tenants to shard databases through the `tenant_shards` directory (on the default shard).
+    New tenants are placed by rendezvous hashing on their user_id; tenants missing from the
+    directory predate sharding and live on the default shard. Entries are cached for
+    `cache_seconds`, which is also how long a move waits for every worker to see a change.
+    """
+
+    def __init__(self, engines: Dict[str, Engine], cache_seconds: float = 5.0):
+        self.engines = engines
+        self.sessions = {name: sessionmaker(bind=engine) for name, engine in engines.items()}
+        self.cache_seconds = cache_seconds
+        self.cache: Dict[str, DirectoryEntry] = {}
+        self.cache_lock = Lock()
+        for engine in engines.values():
+            event.listen(engine, "before_cursor_execute", self._reject_frozen_writes)
+        logging.info("Tenant sharding across: %s", ", ".join(engines))
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.engines)
+
+    def ensure_directory(self) -> None:
+        with self.engines[DEFAULT_SHARD].begin() as conn:
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS tenant_shards (
+                user_id UUID PRIMARY KEY,
+                shard VARCHAR(50) NOT NULL,
+                frozen BOOLEAN NOT NULL DEFAULT FALSE,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """))
+
+    def current_shard(self) -> str:
+        shard = _shard_var.get()
+        if shard is not None:
+            return shard
+        tenant = _tenant_var.get()
+        return self.entry(tenant).shard if tenant else DEFAULT_SHARD
+
+    def engine(self) -> Engine:
+        return self.engines[self.current_shard()]
+
+    def entry(self, user_id: str) -> DirectoryEntry:
+        now = time.monotonic()
+        entry = self.cache.get(user_id)
+        if entry is not None and entry.expires_at > now:
+            return entry
+        try:
+            with self.engines[DEFAULT_SHARD].connect() as conn:
+                row = conn.execute(
+                    text("SELECT shard, frozen FROM tenant_shards WHERE user_id = :user_id"), {"user_id": user_id}
+                ).fetchone()
+        except DataError:
+            row = None  # Not a UUID: no such tenant anywhere
+        entry = DirectoryEntry(
+            shard=row.shard if row and row.shard in self.engines else DEFAULT_SHARD,
+            frozen=bool(row.frozen) if row else False,
+            expires_at=now + self.cache_seconds
+        )
+        with self.cache_lock:
+            if len(self.cache) >= 100000:
+                self.cache.clear()
+            self.cache[user_id] = entry
+        return entry
+
+    def placement(self, user_id: str) -> str:
+        """Rendezvous hash: adding a shard only moves placement of the tenants it wins."""
+        return max(self.engines, key=lambda name: hashlib.sha256(f"{name}:{user_id}".encode()).digest())
+
+    def assign(self, user_id: str, shard: Optional[str] = None, frozen: bool = False) -> str:
+        """Record (or change) a tenant's shard in the directory; returns it."""
+        shard = shard or self.placement(user_id)
+        with self.engines[DEFAULT_SHARD].begin() as conn:
+            conn.execute(text("""
+            INSERT INTO tenant_shards (user_id, shard, frozen)
+            VALUES (:user_id, :shard, :frozen)
+            ON CONFLICT (user_id) DO UPDATE SET shard = EXCLUDED.shard, frozen = EXCLUDED.frozen,
+                updated_at = CURRENT_TIMESTAMP
+            """), {"user_id": user_id, "shard": shard, "frozen": frozen})
+        self.cache.pop(user_id, None)
+        return shard
+
+    def frozen_tenants(self) -> List[str]:
+        """Tenants being moved right now, read from the directory (not the cache)."""
+        with self.engines[DEFAULT_SHARD].connect() as conn:
+            return [str(user_id) for user_id in conn.execute(
+                text("SELECT user_id FROM tenant_shards WHERE frozen")
+            ).scalars()]
+
+    def forget(self, user_id: str) -> None:
+        with self.engines[DEFAULT_SHARD].begin() as conn:
+            conn.execute(text("DELETE FROM tenant_shards WHERE user_id = :user_id"), {"user_id": user_id})
+        self.cache.pop(user_id, None)
+
+    def _reject_frozen_writes(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        tenant = _tenant_var.get()
+        if tenant and _shard_var.get() is None and statement.lstrip()[:6].lower() != "select":
+            if self.entry(tenant).frozen:
+                raise HTTPException(status_code=503, detail="Tenant data is being moved, retry shortly",
+                                    headers={"Retry-After": str(int(self.cache_seconds) + 1)})
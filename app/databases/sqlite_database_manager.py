@@ -0,0 +1,654 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import traceback
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, SQLAlchemyError, StatementError
+from sqlalchemy.orm import scoped_session, sessionmaker
+from app.databases.column_types import is_invalid_parameter, typed_text
+from app.databases.result_shaping import empty_result, shape_result
+from app.databases.unit_of_work import transaction
+from app.databases.monitored_pool import MonitoredQueuePool
+from app.databases.partition_manager import SEARCH_INDEXES
+from app.enums.env_keys import EnvKeys
+from app.enums.result_modes import ResultMode
+from app.utils.utility_manager import UtilityManager
+
+# Applied to every connection. In WAL mode readers never block the writer (or each other), and
+# synchronous=NORMAL leaves fsync to checkpoints (a power loss can drop the last commits, never
+# corrupt the database). Queued write transactions also share commits (see _CommitBatch).
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",  # 64 MiB
+    "mmap_size": "268435456",  # 256 MiB
+    "wal_autocheckpoint": "1000",
+}
+
+# The controller's Postgres-isms, rewritten on their way to SQLite (statements are in qmark style by then)
+_TRANSLATIONS = [
+    (re.compile(r"=\s*ANY\(CAST\(\? AS \w+\[\]\)\)", re.IGNORECASE), "IN (SELECT value FROM json_each(?))"),
+    (re.compile(r"CURRENT_TIMESTAMP - make_interval\(secs => \?\)", re.IGNORECASE),
+     "datetime(CURRENT_TIMESTAMP, '-' || ? || ' seconds')"),
+    (re.compile(r"'-infinity'::timestamp", re.IGNORECASE), "'0001-01-01 00:00:00'"),
+    (re.compile(r"::\w+(\[\])?"), ""),
+    (re.compile(r"CAST\(([^()]*) AS DATE\)", re.IGNORECASE), r"date(\1)"),
+    (re.compile(r"CAST\(([^()]*) AS TIMESTAMP\)", re.IGNORECASE), r"\1"),
+    (re.compile(r"\bjson_build_object\(", re.IGNORECASE), "json_object("),
+    (re.compile(r"\s+FOR UPDATE( SKIP LOCKED)?", re.IGNORECASE), ""),
+    # Postgres' CURRENT_TIMESTAMP is the transaction's start time, SQLite's the statement's
+    (re.compile(r"\bCURRENT_TIMESTAMP\b", re.IGNORECASE), "transaction_timestamp()"),
+]
+
+
+@lru_cache(maxsize=1024)
+def translate(statement: str) -> str:
+    for pattern, replacement in _TRANSLATIONS:
+        statement = pattern.sub(replacement, statement)
+    return statement
+
+
+def _bind_value(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return json.dumps([str(item) for item in value])  # Read back through json_each
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def _parse_timestamp(value: bytes) -> Union[datetime, str]:
+    try:
+        return datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+class _CommitBatch:
+    """
+    Write transactions sharing one SQLite transaction, and so one COMMIT: each runs in a savepoint
+    of it, and a caller reports success only once `done` is set without an `error`.
+    """
+
+    def __init__(self):
+        self.units = 0
+        self.notifications: List = []
+        self.done = Event()
+        self.error: Optional[sqlite3.Error] = None
+
+
+# The calling thread's group commit: whether it waits for its batch to commit (see
+# SQLiteManager._batched_commit), and the batch its last write transaction joined
+_group_commit = threading.local()
+
+
+class _Connection(sqlite3.Connection):
+    """
+    Holds pg_notify payloads until the transaction commits, like Postgres does.
+
+    On the writer, a transaction whose caller waits for it joins the open batch when writers are
+    queued: its commit releases its savepoint, and the batch commits once no queued writer is left
+    to join it (at checkin) or it holds `max_batch_units` transactions. A transaction that fails
+    rolls back to its savepoint only.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.notifications: List = []
+        self.deliver: Optional[Callable[[str, str], None]] = None
+        self.max_batch_units = 1  # Set on the writer; 1 commits every transaction on its own
+        self.batch: Optional[_CommitBatch] = None
+        self.in_unit = False
+
+    def begin(self, immediate: bool) -> None:
+        if self.batch is not None and not self.in_transaction:
+            # SQLite rolled the whole batch back (an I/O error), savepoints and all
+            self._finish_batch(sqlite3.OperationalError("The batched transaction was rolled back"))
+        if self.batch is None:
+            # IMMEDIATE takes the write lock up front, so a transaction never fails midway on upgrade
+            self.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            if self.max_batch_units <= 1 or not getattr(_group_commit, "waits", False):
+                return
+            self.batch = _CommitBatch()
+        self.execute("SAVEPOINT unit")
+        self.in_unit = True
+
+    def commit(self) -> None:
+        if not self.in_unit:
+            super().commit()
+            self._deliver_all(self.notifications)
+            self.notifications = []
+            return
+        self.execute("RELEASE unit")
+        self.in_unit = False
+        self.batch.units += 1
+        self.batch.notifications.extend(self.notifications)
+        self.notifications = []
+        if getattr(_group_commit, "waits", False):
+            _group_commit.batch = self.batch
+        else:
+            # The caller takes this commit as durable: commit the batch it joined now
+            error = self.commit_batch()
+            if error is not None:
+                raise error
+
+    def rollback(self) -> None:
+        self.notifications = []
+        if self.in_unit:
+            self.in_unit = False
+            try:
+                self.execute("ROLLBACK TO unit")
+                self.execute("RELEASE unit")
+            except sqlite3.Error as e:
+                self._finish_batch(e)
+        elif self.batch is None:
+            super().rollback()
+        # Otherwise the pool's reset after a released savepoint: the batch stays open
+
+    def checkin(self, writers_waiting: bool) -> None:
+        """Back in the pool: commit the open batch, unless a queued writer can still join it."""
+        if self.batch is None:
+            return
+        if writers_waiting and self.batch.units < self.max_batch_units and self.in_transaction:
+            return
+        error = self.commit_batch()
+        if error is not None:
+            logging.error(f"Batched commit failed: {error}")
+
+    def commit_batch(self) -> Optional[sqlite3.Error]:
+        """Commit the open batch; returns the error its callers are given, if it failed."""
+        if not self.in_transaction:
+            error = sqlite3.OperationalError("The batched transaction was rolled back")
+        else:
+            try:
+                super().commit()
+                error = None
+            except sqlite3.Error as e:
+                super().rollback()
+                error = e
+        self._finish_batch(error)
+        return error
+
+    def _finish_batch(self, error: Optional[sqlite3.Error]) -> None:
+        batch, self.batch = self.batch, None
+        batch.error = error
+        batch.done.set()
+        if error is None:
+            self._deliver_all(batch.notifications)
+
+    def _deliver_all(self, notifications: List) -> None:
+        if self.deliver is not None:
+            for channel, payload in notifications:
+                self.deliver(channel, payload)
+
+
+# Declared column types read back as the Python types psycopg2 returns
+sqlite3.register_converter("TIMESTAMP", _parse_timestamp)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+sqlite3.register_converter("BOOLEAN", lambda value: value not in (b"0", b""))
+
+
+class SQLiteManager(UtilityManager):
+    """
+    Local storage backend (DATABASE_BACKEND=sqlite) running the same controller SQL as Postgres.
+
+    One writer connection (writes queue for it, as they would for SQLite's write lock anyway)
+    and a pool of reader connections for read_only queries. Postgres-only features (read
+    replicas, sharding, partitioning, LISTEN) are absent; NOTIFYs are delivered in-process.
+    """
+    _instance = None
+    _lock = Lock()
+    # A WAL read transaction already reads one snapshot
+    SNAPSHOT_ISOLATION_LEVEL = "SERIALIZABLE"
+    # How long a caller waits for its batch before committing it itself (the writer that was to
+    # join it gave up its place in the queue)
+    GROUP_COMMIT_FLUSH_SECONDS = 0.1
+    # Writes already run one at a time here, so a per-tenant counter row costs no concurrency;
+    # every version below the counter's next value is committed
+    CHANGE_VERSION_QUERY = """
+    INSERT INTO tenant_change_counters (user_id, resource, version)
+    VALUES (:user_id, :resource, 1)
+    ON CONFLICT (user_id, resource) DO UPDATE
+    SET version = tenant_change_counters.version + 1
+    RETURNING version
+    """
+    CHANGE_HORIZON_QUERY = """
+    SELECT COALESCE(MAX(version), 0) + 1 FROM tenant_change_counters
+    WHERE user_id = :user_id AND resource = :resource
+    """
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(SQLiteManager, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if hasattr(self, "initialized"):  # Prevent reinitialization
+            return
+        self.path = os.getenv(EnvKeys.SQLITE_DB_PATH.value, "app/databases/local_database.db")
+        self.busy_timeout_ms = int(os.getenv(EnvKeys.SQLITE_BUSY_TIMEOUT_MS.value, "5000"))
+        read_pool_size = int(os.getenv(EnvKeys.SQLITE_READ_POOL_SIZE.value, "8"))
+        self.group_commit_max_units = int(os.getenv(EnvKeys.SQLITE_GROUP_COMMIT_MAX_UNITS.value, "32"))
+        self.shards = None
+        self.replicas = None
+        self.notify_handlers: Dict[str, List[Callable[[str], None]]] = {}
+        logging.info(f"Opening SQLite database at {self.path}")
+
+        self.primary_engine = self._create_engine(pool_size=1, writer=True)
+        self._reader_engine = self._create_engine(pool_size=read_pool_size, writer=False)
+        self._session = scoped_session(sessionmaker(bind=self.primary_engine))
+        self._read_sessions = sessionmaker(bind=self._reader_engine)
+        with self.primary_engine.connect():
+            logging.info("Database connection established successfully")
+        self.initialized = True
+
+    def _create_engine(self, pool_size: int, writer: bool) -> Engine:
+        # MonitoredQueuePool reports checkout waits for admission control's load shedding
+        engine = create_engine(
+            f"sqlite:///{self.path}",
+            poolclass=MonitoredQueuePool,
+            pool_size=pool_size,
+            max_overflow=0,
+            connect_args={"detect_types": sqlite3.PARSE_DECLTYPES, "check_same_thread": False, "factory": _Connection}
+        )
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            # Transactions are begun explicitly below, not by the driver
+            dbapi_connection.isolation_level = None
+            for name, value in PRAGMAS.items():
+                dbapi_connection.execute(f"PRAGMA {name} = {value}")
+            dbapi_connection.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+            if writer:
+                dbapi_connection.max_batch_units = self.group_commit_max_units
+            else:
+                dbapi_connection.execute("PRAGMA query_only = ON")
+            info = connection_record.info
+            dbapi_connection.create_function(
+                "transaction_timestamp", 0,
+                lambda: info.get("transaction_timestamp") or datetime.utcnow().isoformat(" ")
+            )
+            dbapi_connection.create_function(
+                "pg_notify", 2, lambda channel, payload: dbapi_connection.notifications.append((channel, payload))
+            )
+            dbapi_connection.deliver = self._deliver
+
+        @event.listens_for(engine, "begin")
+        def on_begin(conn):
+            conn.connection.dbapi_connection.begin(immediate=writer)
+            conn.connection.info["transaction_timestamp"] = datetime.utcnow().isoformat(" ")
+
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            if dbapi_connection is not None:
+                dbapi_connection.checkin(writers_waiting=engine.pool.waiting > 0)
+
+        @event.listens_for(engine, "commit")
+        @event.listens_for(engine, "rollback")
+        def on_end(conn):
+            conn.connection.info.pop("transaction_timestamp", None)
+
+        @event.listens_for(engine, "before_cursor_execute", retval=True)
+        def to_sqlite(conn, cursor, statement, parameters, context, executemany):
+            if executemany:
+                parameters = [tuple(_bind_value(value) for value in row) for row in parameters]
+            elif parameters:
+                parameters = tuple(_bind_value(value) for value in parameters)
+            return translate(statement), parameters
+
+        return engine
+
+    @property
+    def engine(self) -> Engine:
+        """The writer: every transaction that may write runs here, one at a time."""
+        return self.primary_engine
+
+    def all_engines(self) -> List[Engine]:
+        return [self.primary_engine]
+
+    def query_engines(self) -> List[Engine]:
+        """Every engine a request's statements can run on: the writer and the readers."""
+        return [self.primary_engine, self._reader_engine]
+
+    def for_each_shard(self, func: Callable[[], Any]) -> None:
+        func()
+
+    def get_session(self):
+        """Get a database session."""
+        return self._session()
+
+    def read_engine(self) -> Engine:
+        """Engine for this request's reads: the reader pool (WAL readers see every committed write)."""
+        return self._reader_engine
+
+    @contextmanager
+    def transaction(self) -> Iterator[Connection]:
+        """
+        Connection in a transaction of its own. Requests' units of work are not used here: they
+        would hold the one writer across the request's awaits, and local commits are cheap.
+        The transaction may share its commit with queued ones (see _CommitBatch).
+        """
+        with self._batched_commit() as await_commit:
+            with transaction(self.primary_engine, join_unit_of_work=False, on_commit=await_commit) as conn:
+                yield conn
+
+    @contextmanager
+    def _batched_commit(self) -> Iterator[Callable[[], None]]:
+        """
+        Write transactions in the block may join a commit batch. Yields the wait for the batch's
+        commit, which raises if the batch failed; leaving the block waits too.
+        """
+        waits = getattr(_group_commit, "waits", False)
+        _group_commit.waits, _group_commit.batch = True, None
+        try:
+            yield self._await_commit
+        finally:
+            _group_commit.waits = waits
+        self._await_commit()
+
+    def _await_commit(self) -> None:
+        batch, _group_commit.batch = getattr(_group_commit, "batch", None), None
+        if batch is None:
+            return
+        while not batch.done.wait(self.GROUP_COMMIT_FLUSH_SECONDS):
+            # Checking the writer in commits the batch when no one else is queued for it
+            with self.primary_engine.connect():
+                pass
+        if batch.error is not None:
+            raise OperationalError("COMMIT", None, batch.error)
+
+    def journal_high_water_mark(self, lock_timeout_seconds: float) -> int:
+        """
+        Largest stock movement id: once the writer is ours, every movement written so far has
+        committed or is in the open batch, which this transaction's commit commits.
+        """
+        with self.primary_engine.begin() as conn:
+            return conn.exec_driver_sql("SELECT COALESCE(MAX(movement_id), 0) FROM stock_movements").scalar_one()
+
+    @staticmethod
+    def lock_product_stock(conn: Connection, product_ids: List[str]) -> None:
+        """Nothing to take: write transactions begin IMMEDIATE, so the one writer already serializes stock decreases."""
+
+    def listen(self, channel: str, handler: Callable[[str], None]) -> None:
+        """Call `handler` with the payload of every pg_notify on `channel`, after its transaction commits."""
+        self.notify_handlers.setdefault(channel, []).append(handler)
+
+    def _deliver(self, channel: str, payload: str) -> None:
+        for handler in self.notify_handlers.get(channel, []):
+            handler(payload)
+
+    def execute_query(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        fetch_one: bool = False,
+        return_json: bool = False,
+        read_only: bool = False,
+        result_mode: ResultMode = ResultMode.ROWS
+    ) -> Union[Dict[str, Any], List[Dict[str, Any]], Any]:
+        """
+        Execute a SQL query with optional parameters (same contract as PostgreSQLManager.execute_query).
+
+        Args:
+            query: SQL query string
+            params: Optional dictionary of query parameters
+            fetch_one: If True, fetch single row, otherwise fetch all rows
+            return_json: If True, return results as JSON objects
+            read_only: If True, the query runs on a reader connection instead of the writer
+            result_mode: Shape of the rows (see ResultMode); ITERATOR streams them (see stream_query)
+
+        Returns:
+            Query results or error dictionary
+        """
+        if result_mode is ResultMode.ITERATOR:
+            return self.stream_query(query, params, return_json=return_json)
+        session = self._read_sessions() if read_only else self.get_session()
+        try:
+            with nullcontext() if read_only else self._batched_commit():
+                try:
+                    logging.debug("Executing query: %s", query)
+                    logging.debug("Query parameters: %s", params)
+                    result = session.execute(typed_text(query), params or {})
+
+                    if result.returns_rows:
+                        data = shape_result(result, fetch_one, return_json, result_mode)
+                    else:
+                        data = None
+
+                    session.commit()
+                finally:
+                    session.close()  # The writer goes back to the pool before waiting for the batch
+            return data
+
+        except SQLAlchemyError as e:
+            session.rollback()
+            if isinstance(e, StatementError) and is_invalid_parameter(e):
+                logging.info("Query with malformed parameter treated as no match: %s", e.orig)
+                return empty_result(fetch_one, result_mode)
+            logging.error(f"Database query error: {e}")
+            logging.debug(traceback.format_exc())
+            return {"error": str(e)}
+
+        finally:
+            session.close()
+
+    def stream_query(
+        self,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+        return_json: bool = True
+    ) -> Iterator[Any]:
+        """Run a read-only query on a reader connection, yielding rows as dictionaries (Rows without return_json)."""
+        try:
+            with self._reader_engine.connect() as conn:
+                result = conn.execution_options(yield_per=batch_size).execute(typed_text(query), params or {})
+                if not return_json:
+                    yield from result
+                    return
+                columns = list(result.keys())
+                for row in result:
+                    yield dict(zip(columns, row))
+        except SQLAlchemyError as e:
+            logging.error(f"Database stream error: {e}")
+            logging.debug(traceback.format_exc())
+            raise
+
+    def create_tables(self):
+        """Create required tables if they do not exist (the Postgres schema in SQLite types)."""
+        queries = [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                username VARCHAR(50) NOT NULL,
+                password VARCHAR(255) NOT NULL,
+                email VARCHAR(100),
+                phone_number VARCHAR(20),
+                company_name VARCHAR(100) NOT NULL,
+                addressline1 VARCHAR(100) NOT NULL,
+                addressline2 VARCHAR(100),
+                landmark VARCHAR(100),
+                city VARCHAR(50) NOT NULL,
+                state VARCHAR(50) NOT NULL,
+                pincode VARCHAR(10) NOT NULL,
+                country VARCHAR(50) NOT NULL,
+                created_at TIMESTAMP DEFAULT (transaction_timestamp())
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_users_email ON users (email);",
+            """
+            CREATE TABLE IF NOT EXISTS customers (
+                customer_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                customer_name VARCHAR(100) NOT NULL,
+                phone_number VARCHAR(20),
+                contact_info VARCHAR(100),
+                address TEXT,
+                created_at TIMESTAMP DEFAULT (transaction_timestamp()),
+                change_version INTEGER NOT NULL DEFAULT 0
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS products (
+                product_id TEXT,
+                user_id TEXT REFERENCES users(user_id) ON DELETE CASCADE,
+                product VARCHAR(100) NOT NULL,
+                weight VARCHAR(50),
+                batch_number VARCHAR(50),
+                expiry_date DATE,
+                quantity INTEGER NOT NULL,
+                mrp DECIMAL(10, 2) NOT NULL,
+                distributer_landing DECIMAL(10, 2),
+                selling_price DECIMAL(10, 2) NOT NULL,
+                change_version INTEGER NOT NULL DEFAULT 0,
+                stock_through_movement_id INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (product_id, user_id)
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS invoices (
+                invoice_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                customer_id TEXT REFERENCES customers(customer_id) ON DELETE SET NULL,
+                invoice_number VARCHAR(50) NOT NULL UNIQUE,
+                invoice_date TIMESTAMP DEFAULT (transaction_timestamp()),
+                total_amount DECIMAL(10, 2) NOT NULL,
+                created_by_name VARCHAR(50),
+                amount_paid DECIMAL(10, 2) DEFAULT 0.0,
+                payment_status VARCHAR DEFAULT 'Pending'
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS orders (
+                order_id TEXT,
+                product_id TEXT,
+                user_id TEXT REFERENCES users(user_id) ON DELETE CASCADE,
+                customer_id TEXT REFERENCES customers(customer_id) ON DELETE SET NULL,
+                created_by_name VARCHAR(50),
+                invoice_id TEXT REFERENCES invoices(invoice_id) ON DELETE CASCADE,
+                quantity INTEGER NOT NULL CHECK (quantity > 0),
+                rate DECIMAL(10, 2) NOT NULL,
+                amount DECIMAL(10, 2) NOT NULL,
+                order_date TIMESTAMP DEFAULT (transaction_timestamp()),
+                PRIMARY KEY (order_id, user_id),
+                FOREIGN KEY (product_id, user_id) REFERENCES products(product_id, user_id) ON DELETE CASCADE
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_orders_invoice_id ON orders (invoice_id);",
+            "CREATE INDEX IF NOT EXISTS idx_orders_user_date ON orders (user_id, order_date);",
+            """
+            CREATE TABLE IF NOT EXISTS payments (
+                payment_id TEXT PRIMARY KEY,
+                invoice_id TEXT NOT NULL REFERENCES invoices(invoice_id) ON DELETE CASCADE,
+                user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                amount DECIMAL(10, 2) NOT NULL,
+                payment_date TIMESTAMP DEFAULT (transaction_timestamp()),
+                payment_method VARCHAR(50),
+                note TEXT
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_payments_invoice_id ON payments (invoice_id);",
+            """
+            CREATE TABLE IF NOT EXISTS stock_movements (
+                movement_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                quantity_delta INTEGER NOT NULL,
+                reason VARCHAR(30) NOT NULL,
+                reference_id VARCHAR(50),
+                created_at TIMESTAMP DEFAULT (transaction_timestamp()),
+                change_version INTEGER NOT NULL DEFAULT 0
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_stock_movements_product_time ON stock_movements (user_id, product_id, created_at);",
+            "CREATE INDEX IF NOT EXISTS idx_stock_movements_product_movement ON stock_movements (user_id, product_id, movement_id);",
+            "CREATE INDEX IF NOT EXISTS idx_stock_movements_user_change_version ON stock_movements (user_id, change_version);",
+            """
+            CREATE TABLE IF NOT EXISTS stock_snapshots (
+                product_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                snapshot_at TIMESTAMP NOT NULL,
+                quantity INTEGER NOT NULL,
+                through_movement_id INTEGER NOT NULL,
+                PRIMARY KEY (user_id, product_id, snapshot_at)
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+                user_id VARCHAR(50) NOT NULL,
+                sales_date DATE NOT NULL,
+                product_id VARCHAR(50) NOT NULL,
+                customer_id VARCHAR(50) NOT NULL DEFAULT '',
+                order_count INTEGER NOT NULL DEFAULT 0,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, sales_date, product_id, customer_id)
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS customer_receivables_rollup (
+                user_id VARCHAR(50) NOT NULL,
+                customer_id VARCHAR(50) NOT NULL DEFAULT '',
+                total_invoiced DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                total_paid DECIMAL(14, 2) NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT (transaction_timestamp()),
+                PRIMARY KEY (user_id, customer_id)
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS tenant_change_counters (
+                user_id TEXT REFERENCES users(user_id) ON DELETE CASCADE,
+                resource VARCHAR(50) NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, resource)
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_products_user_change_version ON products (user_id, change_version);",
+            "CREATE INDEX IF NOT EXISTS idx_customers_user_change_version ON customers (user_id, change_version);",
+            """
+            CREATE TABLE IF NOT EXISTS sync_tombstones (
+                user_id TEXT REFERENCES users(user_id) ON DELETE CASCADE,
+                resource VARCHAR(50) NOT NULL,
+                row_id VARCHAR(50) NOT NULL,
+                change_version INTEGER NOT NULL,
+                deleted_at TIMESTAMP DEFAULT (transaction_timestamp()),
+                PRIMARY KEY (user_id, resource, row_id)
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user_change_version ON sync_tombstones (user_id, change_version);",
+            """
+            CREATE TABLE IF NOT EXISTS invoice_numbers (
+                invoice_number VARCHAR(50) PRIMARY KEY,
+                invoice_id TEXT NOT NULL,
+                invoice_date TIMESTAMP,
+                user_id TEXT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_invoice_numbers_invoice_id ON invoice_numbers (invoice_id);",
+        ]
+        try:
+            with self.primary_engine.begin() as conn:
+                for query in queries + SEARCH_INDEXES:
+                    conn.exec_driver_sql(query)
+            logging.info("Tables created successfully (if not exist).")
+        except Exception as e:
+            logging.error(str(e))
@@ -0,0 +1,28 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+def migrate_stock_snapshots(engine: Engine) -> None:
+    """
+    Drop stock snapshots taken before they recorded their movement-id high-water mark, then make
+    stock_snapshots.through_movement_id NOT NULL, in one transaction.
+
+    Such snapshots can't be matched to the journal; they are derived data, so compaction writes new
+    ones. A no-op once the column is NOT NULL (as it is in tables created with it).
+    """
+    pending_query = """
+    SELECT 1
+    FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = 'stock_snapshots'
+      AND column_name = 'through_movement_id' AND is_nullable = 'YES'
+    """
+    with engine.begin() as conn:
+        # Serialize workers starting together; the loser re-checks and finds nothing to do
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('stock_snapshot_migration'))"))
+        if conn.execute(text(pending_query)).first() is None:
+            return
+
+        deleted = conn.execute(text("DELETE FROM stock_snapshots WHERE through_movement_id IS NULL")).rowcount
+        conn.execute(text("ALTER TABLE stock_snapshots ALTER COLUMN through_movement_id SET NOT NULL"))
+    logging.info("Stock snapshots migrated: %d without a high-water mark dropped.", deleted)
@@ -0,0 +1,156 @@
+"""
+Move one tenant to another shard:
+
+    python -m app.databases.tenant_mover <user_id> <shard>
+
+The tenant's writes are refused (503, Retry-After) while its rows are copied; its reads and
+every other tenant are served throughout.
+"""
+import argparse
+import bisect
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import text
+from app.databases.postgres_database_manager import PostgreSQLManager
+from app.databases.shard_router import DEFAULT_SHARD
+from app.enums.change_resources import ChangeResource
+
+# Copy order (referenced tables first, and the journal before the rows that point into it); deleted in reverse
+TENANT_TABLES = [
+    "stock_movements",
+    "customers",
+    "products",
+    "invoices",
+    "orders",
+    "payments",
+    "invoice_numbers",
+    "stock_snapshots",
+    "daily_sales_rollup",
+    "customer_receivables_rollup",
+    "tenant_change_counters",
+    "sync_tombstones",
+]
+# Keys drawn from the shard's own sequence; rows are re-inserted in key order to keep their sequence
+SERIAL_COLUMNS = {"stock_movements": "movement_id"}
+# Columns holding a stock movement id as a high-water mark into the journal
+MOVEMENT_MARK_COLUMNS = {"products": "stock_through_movement_id", "stock_snapshots": "through_movement_id"}
+COPY_BATCH_SIZE = 1000
+
+
+def _copy_rows(source, target, table: str, user_id: str, transform: Optional[Callable[[Dict], Dict]] = None) -> int:
+    serial = SERIAL_COLUMNS.get(table)
+    order_by = f" ORDER BY {serial}" if serial else ""
+    result = source.execute(
+        text(f"SELECT * FROM {table} WHERE user_id = :user_id{order_by}"), {"user_id": user_id}
+    )
+    columns = [column for column in result.keys() if column != serial]
+    insert = text(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(f':{c}' for c in columns)})"
+    )
+    copied = 0
+    while True:
+        rows = result.fetchmany(COPY_BATCH_SIZE)
+        if not rows:
+            return copied
+        batch = [{column: row._mapping[column] for column in columns} for row in rows]
+        target.execute(insert, [transform(values) for values in batch] if transform else batch)
+        copied += len(rows)
+
+
+def _movement_ids(conn, user_id: str) -> List[int]:
+    return list(conn.execute(
+        text("SELECT movement_id FROM stock_movements WHERE user_id = :user_id ORDER BY movement_id"), {"user_id": user_id}
+    ).scalars())
+
+
+def _movement_mark_remapper(source, target, user_id: str) -> Callable[[Dict], Dict]:
+    """
+    Translates high-water marks into the tenant's journal from source to target movement ids. The
+    journal was copied in id order, so the tenant's n-th movement on the source is its n-th on the target.
+    """
+    source_ids, target_ids = _movement_ids(source, user_id), _movement_ids(target, user_id)
+
+    def remap(values: Dict) -> Dict:
+        for column in MOVEMENT_MARK_COLUMNS.values():
+            if values.get(column) is not None:
+                copied = bisect.bisect_right(source_ids, values[column])
+                values[column] = target_ids[copied - 1] if copied else 0
+        return values
+    return remap
+
+
+def _carry_sync_versions(source, target, user_id: str) -> None:
+    """
+    Sync versions are transaction ids plus the tenant's offset, and every shard counts its own
+    transactions: raise the offset on the target past the tenant's last version on the source,
+    so versions keep increasing for the tenant's clients after the move.
+    """
+    params = {"user_id": user_id, "resource": ChangeResource.SYNC.value}
+    params["source_version"] = source.execute(text(PostgreSQLManager.CHANGE_VERSION_QUERY), params).scalar_one()
+    target.execute(text("""
+    INSERT INTO tenant_change_counters (user_id, resource, version)
+    VALUES (:user_id, :resource, GREATEST(:source_version - txid_current(), 0))
+    ON CONFLICT (user_id, resource) DO UPDATE
+    SET version = GREATEST(EXCLUDED.version, tenant_change_counters.version)
+    """), params)
+
+
+def _delete_rows(conn, user_id: str, keep_user: bool) -> None:
+    for table in reversed(TENANT_TABLES):
+        conn.execute(text(f"DELETE FROM {table} WHERE user_id = :user_id"), {"user_id": user_id})
+    if not keep_user:
+        conn.execute(text("DELETE FROM users WHERE user_id = :user_id"), {"user_id": user_id})
+
+
+def move_tenant(user_id: str, target: str) -> None:
+    db = PostgreSQLManager()
+    shards = db.shards
+    if not shards:
+        raise ValueError("Sharding is not configured (POSTGRES_SHARD_URLS)")
+    if target not in shards.engines:
+        raise ValueError(f"Unknown shard '{target}'; configured: {', '.join(shards.names)}")
+    source = shards.entry(user_id).shard
+    if source == target:
+        logging.info("Tenant %s is already on shard %s.", user_id, target)
+        return
+
+    # Freeze, then wait out every worker's cached directory entry so no write is in flight
+    shards.assign(user_id, source, frozen=True)
+    time.sleep(shards.cache_seconds + 1)
+    try:
+        # One snapshot of the source for every table, so a row and the rows it points to are copied consistently
+        source_engine = shards.engines[source].execution_options(isolation_level=PostgreSQLManager.SNAPSHOT_ISOLATION_LEVEL)
+        with source_engine.begin() as source_conn, shards.engines[target].begin() as target_conn:
+            # Leftovers of an earlier, interrupted move
+            _delete_rows(target_conn, user_id, keep_user=target == DEFAULT_SHARD)
+            if target != DEFAULT_SHARD:
+                # Mirror of the users row of record, which the tenant's rows reference
+                with shards.engines[DEFAULT_SHARD].connect() as users_conn:
+                    _copy_rows(users_conn, target_conn, "users", user_id)
+            remap = None
+            for table in TENANT_TABLES:
+                if table in MOVEMENT_MARK_COLUMNS and remap is None:
+                    remap = _movement_mark_remapper(source_conn, target_conn, user_id)
+                copied = _copy_rows(source_conn, target_conn, table, user_id, remap if table in MOVEMENT_MARK_COLUMNS else None)
+                logging.info("Copied %d %s rows of tenant %s to %s.", copied, table, user_id, target)
+            _carry_sync_versions(source_conn, target_conn, user_id)
+    except Exception:
+        shards.assign(user_id, source, frozen=False)
+        raise
+
+    shards.assign(user_id, target, frozen=False)
+    # Reads still routed to the source by a cached entry finish before its copy goes away
+    time.sleep(shards.cache_seconds + 1)
+    with shards.engines[source].begin() as conn:
+        _delete_rows(conn, user_id, keep_user=source == DEFAULT_SHARD)
+    logging.info("Moved tenant %s from %s to %s.", user_id, source, target)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Move a tenant to another shard")
+    parser.add_argument("user_id")
+    parser.add_argument("shard")
+    arguments = parser.parse_args()
+    move_tenant(arguments.user_id, arguments.shard)
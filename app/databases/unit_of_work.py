@@ -0,0 +1,124 @@
+import contextvars
+import logging
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.engine import Connection, Engine, RootTransaction
+
+_unit_of_work_var: contextvars.ContextVar[Optional["UnitOfWork"]] = contextvars.ContextVar("unit_of_work", default=None)
+# Key in a connection's info of the callbacks waiting for its transaction to commit
+_AFTER_COMMIT = "after_commit"
+
+
+class UnitOfWork:
+    """
+    One connection and transaction per engine (shard) a request touches, checked out on first
+    use and committed once when the request ends, so its statements succeed or fail together.
+    """
+
+    def __init__(self):
+        self.connections: Dict[Engine, Tuple[Connection, RootTransaction]] = {}
+        self.lock = Lock()  # Controller calls run on the event loop and in worker threads
+        self.finished = False
+
+    def connection(self, engine: Engine) -> Connection:
+        with self.lock:
+            if engine not in self.connections:
+                conn = engine.connect()
+                self.connections[engine] = (conn, conn.begin())
+            return self.connections[engine][0]
+
+    def holds(self, engine: Engine) -> bool:
+        return engine in self.connections
+
+    def finish(self, commit: bool) -> None:
+        """Commit (or roll back) and return every connection to its pool."""
+        with self.lock:
+            self.finished = True
+            connections, self.connections = self.connections, {}
+        callbacks = [callback for conn, _ in connections.values() for callback in conn.info.pop(_AFTER_COMMIT, [])]
+        try:
+            for conn, transaction in connections.values():
+                if commit:
+                    transaction.commit()
+                else:
+                    transaction.rollback()
+        except Exception:
+            for _, transaction in connections.values():
+                if transaction.is_active:
+                    transaction.rollback()
+            raise
+        finally:
+            for conn, _ in connections.values():
+                conn.close()
+        if commit:
+            _run_after_commit(callbacks)
+
+
+@contextmanager
+def unit_of_work_scope(unit_of_work: UnitOfWork) -> Iterator[UnitOfWork]:
+    token = _unit_of_work_var.set(unit_of_work)
+    try:
+        yield unit_of_work
+    finally:
+        _unit_of_work_var.reset(token)
+
+
+@contextmanager
+def outside_unit_of_work() -> Iterator[None]:
+    """
+    Statements in the block run in transactions of their own, even inside a request: for a read
+    followed by slow work (bcrypt), which would otherwise keep the request's connection idle in
+    transaction throughout.
+    """
+    token = _unit_of_work_var.set(None)
+    try:
+        yield
+    finally:
+        _unit_of_work_var.reset(token)
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    """The request's unit of work, or None outside a request (or once it has finished)."""
+    unit_of_work = _unit_of_work_var.get()
+    return unit_of_work if unit_of_work is not None and not unit_of_work.finished else None
+
+
+@contextmanager
+def transaction(
+    engine: Engine, join_unit_of_work: bool = True, on_commit: Optional[Callable[[], None]] = None
+) -> Iterator[Connection]:
+    """
+    A connection in a transaction on `engine`: the request's unit of work when there is one
+    (committed when the request ends), else a transaction of its own, committed on leaving the block.
+    `on_commit` runs once that commit is made, before the after-commit callbacks.
+    """
+    unit_of_work = current_unit_of_work() if join_unit_of_work else None
+    if unit_of_work is None:
+        with engine.begin() as conn:
+            try:
+                yield conn
+            finally:
+                callbacks = conn.info.pop(_AFTER_COMMIT, [])
+        if on_commit is not None:
+            on_commit()
+        _run_after_commit(callbacks)  # Only reached once the block has committed
+        return
+    yield unit_of_work.connection(engine)
+
+
+def after_commit(conn: Connection, callback: Callable[[], None]) -> None:
+    """
+    Call `callback` once the transaction `conn` belongs to (from `transaction`) has committed and
+    its connection is back in the pool; it is dropped if the transaction rolls back.
+    """
+    conn.info.setdefault(_AFTER_COMMIT, []).append(callback)
+
+
+def _run_after_commit(callbacks: List[Callable[[], None]]) -> None:
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            # The transaction is committed either way; its follow-up work is best effort
+            logging.exception("After-commit callback failed")
@@ -0,0 +1,64 @@
+import logging
+from typing import Dict, List
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# Key columns stored as native uuid (16 bytes) instead of VARCHAR(50) text.
+# The analytics rollups keep VARCHAR keys: they use '' for "no customer" as part of their primary key.
+UUID_KEY_COLUMNS: Dict[str, List[str]] = {
+    "users": ["user_id"],
+    "customers": ["customer_id", "user_id"],
+    "products": ["product_id", "user_id"],
+    "invoices": ["invoice_id", "user_id", "customer_id"],
+    "orders": ["order_id", "product_id", "user_id", "customer_id", "invoice_id"],
+    "payments": ["payment_id", "invoice_id", "user_id"],
+    "stock_movements": ["product_id", "user_id"],
+    "stock_snapshots": ["product_id", "user_id"],
+    "tenant_change_counters": ["user_id"],
+    "sync_tombstones": ["user_id"],
+}
+
+
+def migrate_keys_to_uuid(engine: Engine) -> None:
+    """
+    Convert VARCHAR key columns of an existing database to uuid, in one transaction.
+
+    Foreign keys between the converted columns are dropped, the columns retyped (indexes are
+    rebuilt by Postgres) and the constraints re-created from their saved definitions. A no-op
+    once every column is uuid; a value that isn't a UUID aborts the whole migration unchanged.
+    """
+    tables = list(UUID_KEY_COLUMNS)
+    pending_query = """
+    SELECT table_name, column_name
+    FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = ANY(:tables) AND data_type <> 'uuid'
+    """
+    with engine.begin() as conn:
+        # Serialize workers starting together; the loser re-checks and finds nothing to do
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('uuid_key_migration'))"))
+        pending: Dict[str, List[str]] = {}
+        for row in conn.execute(text(pending_query), {"tables": tables}):
+            if row.column_name in UUID_KEY_COLUMNS[row.table_name]:
+                pending.setdefault(row.table_name, []).append(row.column_name)
+        if not pending:
+            return
+
+        logging.info("Migrating key columns to uuid: %s", pending)
+        foreign_keys = conn.execute(text("""
+        SELECT conrelid::regclass::text AS table_name, conname, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE contype = 'f'
+          AND connamespace = current_schema()::regnamespace
+          AND conrelid::regclass::text = ANY(:tables)
+        """), {"tables": tables}).fetchall()
+
+        for fk in foreign_keys:
+            conn.execute(text(f'ALTER TABLE {fk.table_name} DROP CONSTRAINT "{fk.conname}"'))
+        for table, columns in pending.items():
+            alterations = ", ".join(
+                f"ALTER COLUMN {column} TYPE UUID USING CAST(NULLIF({column}, '') AS UUID)" for column in columns
+            )
+            conn.execute(text(f"ALTER TABLE {table} {alterations}"))
+        for fk in foreign_keys:
+            conn.execute(text(f'ALTER TABLE {fk.table_name} ADD CONSTRAINT "{fk.conname}" {fk.definition}'))
+    logging.info("Key columns migrated to uuid.")
@@ -0,0 +1,8 @@
+from enum import Enum
+
+class ChangeResource(Enum):
+    PRODUCTS = "products"
+    CUSTOMERS = "customers"
+    ORDERS = "orders"
+    # Tenant-wide counter behind incremental sync (products and customers)
+    SYNC = "sync"
@@ -14,11 +14,16 @@ class EnvKeys(Enum):
     APP_LOGGING_DATEFORMAT='APP_LOGGING_DATEFORMAT'
     APP_LOGGING_MAXBYTES='APP_LOGGING_MAXBYTES'
     APP_LOGGING_BACKUPCOUNT='APP_LOGGING_BACKUPCOUNT'
+    APP_LOGGING_DEBUG_SAMPLE_RATE='APP_LOGGING_DEBUG_SAMPLE_RATE'
     APP_USER_AGENT='APP_USER_AGENT'
     # FOLDERS
     UPLOAD_DIR = 'UPLOAD_DIR'
     UPLOAD_ALLOWED_EXTENTIONS = 'UPLOAD_ALLOWED_EXTENTIONS'
+    DATABASE_BACKEND='DATABASE_BACKEND'
     SQLITE_DB_PATH='SQLITE_DB_PATH'
+    SQLITE_READ_POOL_SIZE='SQLITE_READ_POOL_SIZE'
+    SQLITE_BUSY_TIMEOUT_MS='SQLITE_BUSY_TIMEOUT_MS'
+    SQLITE_GROUP_COMMIT_MAX_UNITS='SQLITE_GROUP_COMMIT_MAX_UNITS'
     # LLM
     OPENAI_KEY = 'OPENAI_KEY'
     OPENAI_MODEL = 'OPENAI_MODEL'
@@ -32,8 +37,46 @@ class EnvKeys(Enum):
     POSTGRES_DB_PORT='POSTGRES_DB_PORT'
     POSTGRES_DB_SCHEMA='POSTGRES_DB_NAME'
     POSTGRES_SSLMODE="POSTGRES_SSLMODE"
+    POSTGRES_REPLICA_URLS='POSTGRES_REPLICA_URLS'
+    POSTGRES_REPLICA_MAX_LAG_SECONDS='POSTGRES_REPLICA_MAX_LAG_SECONDS'
+    POSTGRES_REPLICA_CHECK_SECONDS='POSTGRES_REPLICA_CHECK_SECONDS'
+    POSTGRES_SHARD_URLS='POSTGRES_SHARD_URLS'
+    SHARD_DIRECTORY_CACHE_SECONDS='SHARD_DIRECTORY_CACHE_SECONDS'
     # Authentication
     SECRET_KEY='SECRET_KEY'
     ALGORITHM='ALGORITHM'
     ACCESS_TOKEN_EXPIRE_MINUTES='ACCESS_TOKEN_EXPIRE_MINUTES'
+    AUTH_REQUIRED='AUTH_REQUIRED'
+    BCRYPT_ROUNDS='BCRYPT_ROUNDS'
+    LOGIN_MAX_FAILURES='LOGIN_MAX_FAILURES'
+    LOGIN_FAILURE_WINDOW_SECONDS='LOGIN_FAILURE_WINDOW_SECONDS'
+    # Admission control
+    ADMISSION_CONTROL_ENABLED='ADMISSION_CONTROL_ENABLED'
+    RATE_LIMIT_BACKEND='RATE_LIMIT_BACKEND'
+    RATE_LIMIT_DEFAULT_RATE='RATE_LIMIT_DEFAULT_RATE'
+    RATE_LIMIT_DEFAULT_BURST='RATE_LIMIT_DEFAULT_BURST'
+    ADMISSION_POOL_WAIT_THRESHOLD_MS='ADMISSION_POOL_WAIT_THRESHOLD_MS'
+    TRUSTED_PROXIES='TRUSTED_PROXIES'
+    AUTH_CLAIMS_CACHE_SIZE='AUTH_CLAIMS_CACHE_SIZE'
+    # Response compression
+    COMPRESSION_MINIMUM_SIZE='COMPRESSION_MINIMUM_SIZE'
+    REQUEST_UNIT_OF_WORK='REQUEST_UNIT_OF_WORK'
+    # Live events (SSE)
+    EVENT_STREAM_MAX_PENDING='EVENT_STREAM_MAX_PENDING'
+    EVENT_STREAM_HEARTBEAT_SECONDS='EVENT_STREAM_HEARTBEAT_SECONDS'
+    # Table partitioning
+    TABLE_PARTITIONING='TABLE_PARTITIONING'
+    PARTITION_MONTHS_AHEAD='PARTITION_MONTHS_AHEAD'
+    PARTITION_DETACH_AFTER_MONTHS='PARTITION_DETACH_AFTER_MONTHS'
+    # Invoice archive
+    INVOICE_ARCHIVE_DIR='INVOICE_ARCHIVE_DIR'
+    INVOICE_ARCHIVE_INTERVAL_SECONDS='INVOICE_ARCHIVE_INTERVAL_SECONDS'
+    INVOICE_ARCHIVE_AFTER_DAYS='INVOICE_ARCHIVE_AFTER_DAYS'
+    INVOICE_ARCHIVE_BATCH_SIZE='INVOICE_ARCHIVE_BATCH_SIZE'
+    # Stock journal
+    STOCK_SNAPSHOT_INTERVAL_SECONDS='STOCK_SNAPSHOT_INTERVAL_SECONDS'
+    STOCK_SNAPSHOT_FENCE_TIMEOUT_SECONDS='STOCK_SNAPSHOT_FENCE_TIMEOUT_SECONDS'
+    # Document loading
+    DOCUMENT_BATCH_ROWS='DOCUMENT_BATCH_ROWS'
+    DOCUMENT_MAX_BATCH_BYTES='DOCUMENT_MAX_BATCH_BYTES'
   
\ No newline at end of file
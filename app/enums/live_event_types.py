@@ -0,0 +1,5 @@
+from enum import Enum
+
+class LiveEventType(Enum):
+    STOCK = "stock"
+    INVOICE = "invoice"
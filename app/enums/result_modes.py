@@ -0,0 +1,13 @@
+from enum import Enum
+
+class ResultMode(Enum):
+    # Row objects, or one dict per row with return_json (the default)
+    ROWS = "rows"
+    # {"columns": [...], "rows": [tuple, ...]}: one header shared by every row
+    TUPLES = "tuples"
+    # {column: [values]}: one list per column
+    COLUMNS = "columns"
+    # {column: numpy array}: one array per column
+    ARRAYS = "arrays"
+    # Rows (dicts with return_json) fetched lazily from a server-side cursor
+    ITERATOR = "iterator"
@@ -0,0 +1,11 @@
+from enum import Enum
+
+class StockMovementReason(Enum):
+    OPENING_BALANCE = "opening_balance"
+    INITIAL_STOCK = "initial_stock"
+    STOCK_ENTRY = "stock_entry"
+    MANUAL_ADJUSTMENT = "manual_adjustment"
+    ORDER_CREATED = "order_created"
+    ORDER_UPDATED = "order_updated"
+    ORDER_DELETED = "order_deleted"
+    INVOICE_DELETED = "invoice_deleted"
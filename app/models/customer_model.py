@@ -2,7 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional
 
 class CustomerCreateModel(BaseModel):
-    user_id: str = Field(..., max_length=50, description="ID of the user creating the customer")
+    user_id: Optional[str] = Field(None, max_length=50, description="Deprecated: the tenant comes from the bearer token or the user_id query parameter; must match it if sent")
     customer_name: str = Field(..., min_length=1, max_length=100, description="Name of the customer")
     phone_number: Optional[str] = Field(None, max_length=20, description="Customer phone number")
     contact_info: Optional[str] = Field(None, max_length=100, description="Additional contact information")
@@ -3,7 +3,7 @@ from typing import Optional
 from datetime import date
 
 class ProductCreateModel(BaseModel):
-    user_id: str = Field(..., max_length=50, description="ID of the user creating the product")
+    user_id: Optional[str] = Field(None, max_length=50, description="Deprecated: the tenant comes from the bearer token or the user_id query parameter; must match it if sent")
     product: str = Field(..., min_length=1, max_length=100, description="Product name")
     selling_price: float = Field(..., gt=0, description="Selling price of the product")
     mrp: float = Field(..., gt=0, description="Maximum retail price")
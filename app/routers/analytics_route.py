@@ -0,0 +1,125 @@
+import logging
+from fastapi import APIRouter, Query
+from app.base.auth import AuthorizedUserId
+from app.constants.route_paths import RoutePaths
+from app.constants.route_tags import RouteTags
+from app.enums.result_modes import ResultMode
+from app.controllers.database_controller import DatabaseController
+from app.models.response_model import ResponseModel
+from threading import Lock
+from app.utils.utility_manager import UtilityManager
+from datetime import date
+from typing import Optional
+
+COLUMNAR_DESCRIPTION = "Return one list per column instead of one object per row"
+
+
+class AnalyticsRouter(UtilityManager):
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            logging.info("-----: Creating new instance of: AnalyticsRouter:-----")
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(AnalyticsRouter, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "router"):  # Prevent reinitialization
+            self.analytics_manager = DatabaseController()
+            self.router = APIRouter(prefix=RoutePaths.API_PREFIX)
+            self.setup_routes()
+
+    def setup_routes(self):
+        # All analytics routes read the rollup tables only, never orders/invoices
+        @self.router.get(RoutePaths.ANALYTICS_DAILY_SALES, tags=[RouteTags.ANALYTICS], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def get_daily_sales(
+            user_id: AuthorizedUserId,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            product_id: Optional[str] = None,
+            customer_id: Optional[str] = None,
+            columnar: bool = Query(False, description=COLUMNAR_DESCRIPTION)
+        ):
+            """Get sales totals per day"""
+            sales = self.analytics_manager.get_daily_sales(
+                user_id=user_id,
+                start_date=start_date,
+                end_date=end_date,
+                product_id=product_id,
+                customer_id=customer_id,
+                return_json=True,
+                result_mode=ResultMode.COLUMNS if columnar else ResultMode.ROWS
+            )
+            return ResponseModel(
+                message="Daily Sales Fetched Successfully",
+                data=sales
+            )
+
+        @self.router.get(RoutePaths.ANALYTICS_SALES_BY_PRODUCT, tags=[RouteTags.ANALYTICS], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def get_sales_by_product(
+            user_id: AuthorizedUserId,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            limit: int = 50,
+            columnar: bool = Query(False, description=COLUMNAR_DESCRIPTION)
+        ):
+            """Get the top selling products for a date range"""
+            sales = self.analytics_manager.get_sales_by_product(
+                user_id=user_id,
+                start_date=start_date,
+                end_date=end_date,
+                limit=limit,
+                return_json=True,
+                result_mode=ResultMode.COLUMNS if columnar else ResultMode.ROWS
+            )
+            return ResponseModel(
+                message="Product Sales Fetched Successfully",
+                data=sales
+            )
+
+        @self.router.get(RoutePaths.ANALYTICS_SALES_BY_CUSTOMER, tags=[RouteTags.ANALYTICS], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def get_sales_by_customer(
+            user_id: AuthorizedUserId,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            limit: int = 50,
+            columnar: bool = Query(False, description=COLUMNAR_DESCRIPTION)
+        ):
+            """Get the top customers by sales for a date range"""
+            sales = self.analytics_manager.get_sales_by_customer(
+                user_id=user_id,
+                start_date=start_date,
+                end_date=end_date,
+                limit=limit,
+                return_json=True,
+                result_mode=ResultMode.COLUMNS if columnar else ResultMode.ROWS
+            )
+            return ResponseModel(
+                message="Customer Sales Fetched Successfully",
+                data=sales
+            )
+
+        @self.router.get(RoutePaths.ANALYTICS_RECEIVABLES, tags=[RouteTags.ANALYTICS], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def get_receivables(
+            user_id: AuthorizedUserId,
+            outstanding_only: bool = True,
+            columnar: bool = Query(False, description=COLUMNAR_DESCRIPTION)
+        ):
+            """Get invoiced, paid and outstanding amounts per customer"""
+            receivables = self.analytics_manager.get_receivables(
+                user_id=user_id,
+                outstanding_only=outstanding_only,
+                return_json=True,
+                result_mode=ResultMode.COLUMNS if columnar else ResultMode.ROWS
+            )
+            return ResponseModel(
+                message="Receivables Fetched Successfully",
+                data=receivables
+            )
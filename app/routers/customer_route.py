@@ -1,12 +1,15 @@
 import logging
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from app.base.auth import AuthorizedUserId, check_body_user_id
 from app.constants.route_paths import RoutePaths
 from app.constants.route_tags import RouteTags
+from app.enums.change_resources import ChangeResource
 from app.controllers.database_controller import DatabaseController
 from app.models.response_model import ResponseModel
 from app.models.customer_model import CustomerCreateModel, CustomerUpdateModel 
 from threading import Lock
 from app.utils.utility_manager import UtilityManager
+from app.utils.http_cache import LIST_CACHE_CONTROL, if_none_match, list_etag
 
 class CustomerRouter(UtilityManager):
     _instance = None
@@ -29,10 +32,11 @@ class CustomerRouter(UtilityManager):
     def setup_routes(self):
         @self.router.post(RoutePaths.CUSTOMER, tags=[RouteTags.CUSTOMER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def create_customer(customer: CustomerCreateModel):
+        async def create_customer(user_id: AuthorizedUserId, customer: CustomerCreateModel):
             """Create a new customer"""
+            check_body_user_id(customer.user_id, user_id)
             customer_data = self.customer_manager.create_customer(
-                user_id=customer.user_id,
+                user_id=user_id,
                 customer_name=customer.customer_name,
                 phone_number=customer.phone_number,
                 contact_info=customer.contact_info,
@@ -46,9 +50,17 @@ class CustomerRouter(UtilityManager):
 
         @self.router.get(RoutePaths.CUSTOMER, tags=[RouteTags.CUSTOMER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_all_customers(user_id: str):
-            """Get all customers for a user"""
+        async def get_all_customers(request: Request, response: Response, user_id: AuthorizedUserId):
+            """Get all customers for a user (304 when If-None-Match still matches)"""
+            # Version first: a write landing before the SELECT only makes the next poll refetch
+            etag = list_etag(
+                ChangeResource.CUSTOMERS, user_id, self.customer_manager.get_change_version(user_id, ChangeResource.CUSTOMERS)
+            )
+            if if_none_match(request, etag):
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL})
             customers = self.customer_manager.get_all_customers(user_id=user_id, return_json=True)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = LIST_CACHE_CONTROL
             return ResponseModel(
                 message="Customers Fetched Successfully",
                 data=customers
@@ -56,9 +68,9 @@ class CustomerRouter(UtilityManager):
 
         @self.router.get(RoutePaths.CUSTOMER_WITH_ID, tags=[RouteTags.CUSTOMER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_customer(customer_id: str):
+        async def get_customer(customer_id: str, user_id: AuthorizedUserId):
             """Get a single customer by ID"""
-            customer = self.customer_manager.get_customer(customer_id=customer_id, return_json=True)
+            customer = self.customer_manager.get_customer(customer_id=customer_id, user_id=user_id, return_json=True)
             if not customer:
                 raise HTTPException(status_code=404, detail="Customer not found")
             return ResponseModel(
@@ -68,10 +80,11 @@ class CustomerRouter(UtilityManager):
 
         @self.router.put(RoutePaths.CUSTOMER_WITH_ID, tags=[RouteTags.CUSTOMER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def update_customer(customer_id: str, customer_update: CustomerUpdateModel):
+        async def update_customer(customer_id: str, user_id: AuthorizedUserId, customer_update: CustomerUpdateModel):
             """Update a customer"""
             updated_customer = self.customer_manager.update_customer(
                 customer_id=customer_id,
+                user_id=user_id,
                 customer_name=customer_update.customer_name,
                 phone_number=customer_update.phone_number,
                 contact_info=customer_update.contact_info,
@@ -88,9 +101,9 @@ class CustomerRouter(UtilityManager):
 
         @self.router.delete(RoutePaths.CUSTOMER_WITH_ID, tags=[RouteTags.CUSTOMER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def delete_customer(customer_id: str):
+        async def delete_customer(customer_id: str, user_id: AuthorizedUserId):
             """Delete a customer"""
-            self.customer_manager.delete_customer(customer_id=customer_id)
+            self.customer_manager.delete_customer(customer_id=customer_id, user_id=user_id)
             return ResponseModel(
                 message="Customer deleted successfully",
                 data={"customer_id": customer_id}
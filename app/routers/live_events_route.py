@@ -0,0 +1,46 @@
+import logging
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from app.base.auth import TokenUserId
+from app.base.live_events import LiveEventBroker
+from app.constants.route_paths import RoutePaths
+from app.constants.route_tags import RouteTags
+from threading import Lock
+from app.utils.utility_manager import UtilityManager
+
+
+class LiveEventsRouter(UtilityManager):
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            logging.info("-----: Creating new instance of: LiveEventsRouter:-----")
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(LiveEventsRouter, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "router"):  # Prevent reinitialization
+            self.event_broker = LiveEventBroker()
+            self.router = APIRouter(prefix=RoutePaths.API_PREFIX)
+            self.setup_routes()
+
+    def setup_routes(self):
+        @self.router.get(RoutePaths.LIVE_EVENTS, tags=[RouteTags.LIVE_EVENTS], response_class=StreamingResponse)
+        @self.catch_api_exceptions
+        async def stream_live_events(user_id: TokenUserId):
+            """
+            Stream stock level and invoice payment status changes as Server-Sent Events. Always
+            needs a bearer token: the legacy user_id parameter would let anyone watch any tenant.
+            """
+            subscriber = await self.event_broker.subscribe(user_id)
+            return StreamingResponse(
+                self.event_broker.stream(user_id, subscriber),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                # Also runs when the client disconnects before the stream starts
+                background=BackgroundTask(self.event_broker.unsubscribe, user_id, subscriber)
+            )
@@ -1,15 +1,22 @@
+import csv
+import io
 import logging
-from fastapi import APIRouter, HTTPException
+from itertools import islice
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from app.base.auth import AuthorizedUserId
 from app.constants.route_paths import RoutePaths
 from app.constants.route_tags import RouteTags
-from app.controllers.database_controller import DatabaseController
+from app.enums.change_resources import ChangeResource
+from app.controllers.database_controller import EXPORT_ORDER_COLUMNS, DatabaseController
 from app.models.response_model import ResponseModel
 from app.models.order_model import OrderCreateModel, OrderUpdateModel
 from app.models.invoice_model import InvoiceWithOrdersCreateModel
 from threading import Lock
 from app.utils.utility_manager import UtilityManager
+from app.utils.http_cache import LIST_CACHE_CONTROL, if_none_match, list_etag
 from datetime import date
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Tuple
 
 class OrderRouter(UtilityManager):
     _instance = None
@@ -29,6 +36,19 @@ class OrderRouter(UtilityManager):
             self.router = APIRouter(prefix=RoutePaths.API_PREFIX)
             self.setup_routes()
 
+    @staticmethod
+    def _csv_lines(columns: Tuple[str, ...], rows: Iterable[Tuple], batch_size: int = 1000) -> Iterator[str]:
+        """CSV text of a header and `rows`, one chunk per `batch_size` rows"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for batch in iter(lambda: list(islice(rows, batch_size)), []):
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
     def setup_routes(self):
     #     @self.router.post(RoutePaths.ORDER, tags=[RouteTags.ORDER], response_model=ResponseModel)
     #     @self.catch_api_exceptions
@@ -50,7 +70,7 @@ class OrderRouter(UtilityManager):
 
         @self.router.post(RoutePaths.ORDER, tags=[RouteTags.ORDER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def create_order(user_id: str, invoice: InvoiceWithOrdersCreateModel):
+        async def create_order(user_id: AuthorizedUserId, invoice: InvoiceWithOrdersCreateModel):
             """Create an invoice and associated orders in a single transaction"""
             orders_list = [order.dict() for order in invoice.orders]
             invoice_data = self.order_manager.create_order(
@@ -66,11 +86,161 @@ class OrderRouter(UtilityManager):
                 data=invoice_data
             )
 
+        # Registered before /order/{order_id} and /invoice/{invoice_number}, which would match "search"
+        @self.router.get(RoutePaths.ORDER_SEARCH, tags=[RouteTags.ORDER], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def search_orders(
+            user_id: AuthorizedUserId,
+            customer_id: Optional[str] = None,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            payment_status: Optional[str] = None,
+            min_amount: Optional[float] = Query(None, ge=0),
+            max_amount: Optional[float] = Query(None, ge=0),
+            cursor: Optional[str] = Query(None, description="next_cursor of the previous page; omit for the first page"),
+            limit: int = Query(50, ge=1, le=500)
+        ):
+            """Search orders by customer, date range, invoice payment status and amount, newest first, with totals"""
+            results = self.order_manager.search_orders(
+                user_id=user_id,
+                customer_id=customer_id,
+                start_date=start_date,
+                end_date=end_date,
+                payment_status=payment_status,
+                min_amount=min_amount,
+                max_amount=max_amount,
+                cursor=cursor,
+                limit=limit
+            )
+            return ResponseModel(
+                message="Orders Fetched Successfully",
+                data=results
+            )
+
+        @self.router.get(RoutePaths.ORDER_EXPORT, tags=[RouteTags.ORDER], response_class=StreamingResponse)
+        @self.catch_api_exceptions
+        async def export_orders(
+            user_id: AuthorizedUserId,
+            customer_id: Optional[str] = None,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None
+        ):
+            """Download order lines as CSV, oldest first; streamed, so any date range fits in memory"""
+            rows = self.order_manager.export_orders(
+                user_id=user_id,
+                customer_id=customer_id,
+                start_date=start_date,
+                end_date=end_date
+            )
+            return StreamingResponse(
+                self._csv_lines(EXPORT_ORDER_COLUMNS, rows),
+                media_type="text/csv",
+                headers={"Content-Disposition": 'attachment; filename="orders.csv"'}
+            )
+
+        @self.router.get(RoutePaths.ORDER_BY_CUSTOMER, tags=[RouteTags.ORDER], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def get_orders_by_customer(
+            customer_id: str,
+            user_id: AuthorizedUserId,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            payment_status: Optional[str] = None,
+            min_amount: Optional[float] = Query(None, ge=0),
+            max_amount: Optional[float] = Query(None, ge=0),
+            cursor: Optional[str] = Query(None, description="next_cursor of the previous page; omit for the first page"),
+            limit: int = Query(50, ge=1, le=500)
+        ):
+            """Get a customer's orders, newest first, with totals"""
+            results = self.order_manager.search_orders(
+                user_id=user_id,
+                customer_id=customer_id,
+                start_date=start_date,
+                end_date=end_date,
+                payment_status=payment_status,
+                min_amount=min_amount,
+                max_amount=max_amount,
+                cursor=cursor,
+                limit=limit
+            )
+            return ResponseModel(
+                message="Customer Orders Fetched Successfully",
+                data=results
+            )
+
+        @self.router.get(RoutePaths.INVOICE_SEARCH, tags=[RouteTags.INVOICE], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def search_invoices(
+            user_id: AuthorizedUserId,
+            customer_id: Optional[str] = None,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            payment_status: Optional[str] = None,
+            min_amount: Optional[float] = Query(None, ge=0),
+            max_amount: Optional[float] = Query(None, ge=0),
+            cursor: Optional[str] = Query(None, description="next_cursor of the previous page; omit for the first page"),
+            limit: int = Query(50, ge=1, le=500)
+        ):
+            """Search invoices by customer, date range, payment status and amount, newest first, with totals"""
+            results = self.order_manager.search_invoices(
+                user_id=user_id,
+                customer_id=customer_id,
+                start_date=start_date,
+                end_date=end_date,
+                payment_status=payment_status,
+                min_amount=min_amount,
+                max_amount=max_amount,
+                cursor=cursor,
+                limit=limit
+            )
+            return ResponseModel(
+                message="Invoices Fetched Successfully",
+                data=results
+            )
+
+        @self.router.get(RoutePaths.INVOICE_BY_CUSTOMER, tags=[RouteTags.INVOICE], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def get_invoices_by_customer(
+            customer_id: str,
+            user_id: AuthorizedUserId,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None,
+            payment_status: Optional[str] = None,
+            min_amount: Optional[float] = Query(None, ge=0),
+            max_amount: Optional[float] = Query(None, ge=0),
+            cursor: Optional[str] = Query(None, description="next_cursor of the previous page; omit for the first page"),
+            limit: int = Query(50, ge=1, le=500)
+        ):
+            """Get a customer's invoices, newest first, with totals"""
+            results = self.order_manager.search_invoices(
+                user_id=user_id,
+                customer_id=customer_id,
+                start_date=start_date,
+                end_date=end_date,
+                payment_status=payment_status,
+                min_amount=min_amount,
+                max_amount=max_amount,
+                cursor=cursor,
+                limit=limit
+            )
+            return ResponseModel(
+                message="Customer Invoices Fetched Successfully",
+                data=results
+            )
+
         @self.router.get(RoutePaths.ORDER, tags=[RouteTags.ORDER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_all_orders(user_id: str):
-            """Get all orders for a user"""
+        async def get_all_orders(request: Request, response: Response, user_id: AuthorizedUserId):
+            """Get all orders for a user (304 when If-None-Match still matches)"""
+            # Version first: a write landing before the SELECT only makes the next poll refetch
+            etag = list_etag(
+                ChangeResource.ORDERS, user_id, self.order_manager.get_change_version(user_id, ChangeResource.ORDERS)
+            )
+            if if_none_match(request, etag):
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL})
             orders = self.order_manager.get_all_orders(user_id=user_id, return_json=True)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = LIST_CACHE_CONTROL
             return ResponseModel(
                 message="Orders Fetched Successfully",
                 data=orders
@@ -78,7 +248,7 @@ class OrderRouter(UtilityManager):
 
         @self.router.get(RoutePaths.ORDER_WITH_ID, tags=[RouteTags.ORDER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_order(order_id: str, user_id: str):
+        async def get_order(order_id: str, user_id: AuthorizedUserId):
             """Get a single order by ID and user_id"""
             order = self.order_manager.get_order(order_id=order_id, user_id=user_id, return_json=True)
             if not order:
@@ -90,7 +260,7 @@ class OrderRouter(UtilityManager):
 
         @self.router.put(RoutePaths.ORDER_WITH_ID, tags=[RouteTags.ORDER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def update_order(order_id: str, user_id: str, order: OrderUpdateModel):
+        async def update_order(order_id: str, user_id: AuthorizedUserId, order: OrderUpdateModel):
             """Update an order and adjust associated invoice if applicable"""
             updated_order = self.order_manager.update_order(
                 order_id=order_id,
@@ -107,7 +277,7 @@ class OrderRouter(UtilityManager):
 
         @self.router.delete(RoutePaths.ORDER_WITH_ID, tags=[RouteTags.ORDER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def delete_order(order_id: str, user_id: str):
+        async def delete_order(order_id: str, user_id: AuthorizedUserId):
             """Delete an order"""
             self.order_manager.delete_order(order_id=order_id, user_id=user_id)
             return ResponseModel(
@@ -115,23 +285,11 @@ class OrderRouter(UtilityManager):
                 data={"order_id": order_id, "user_id": user_id}
             )
 
-        # @self.router.get(RoutePaths.ORDER_BY_CUSTOMER, tags=[RouteTags.ORDER], response_model=ResponseModel)
-        # @self.catch_api_exceptions
-        # async def get_orders_by_customer(customer_id: str):
-        #     """Get all orders for a customer"""
-        #     orders = self.order_manager.get_orders_by_customer(customer_id=customer_id, return_json=True)
-        #     return ResponseModel(
-        #         message="Customer Orders Fetched Successfully",
-        #         data=orders
-        #     )
-        
-       
-
         @self.router.get(RoutePaths.INVOICE_BY_NUMBER, tags=[RouteTags.INVOICE], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_invoice(invoice_number: str):
+        async def get_invoice(invoice_number: str, user_id: AuthorizedUserId):
             """Get an invoice by invoice_number with its orders"""
-            invoice = self.order_manager.get_invoice(invoice_number=invoice_number, return_json=True)
+            invoice = self.order_manager.get_invoice(invoice_number=invoice_number, user_id=user_id, return_json=True)
             if not invoice:
                 raise HTTPException(status_code=404, detail="Invoice not found")
             invoice_id = invoice["invoice_id"]
@@ -142,20 +300,20 @@ class OrderRouter(UtilityManager):
 
         @self.router.get(RoutePaths.INVOICE_ORDERS, tags=[RouteTags.INVOICE], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_invoice_orders(invoice_number: str):
+        async def get_invoice_orders(invoice_number: str, user_id: AuthorizedUserId):
             """Get all orders for an invoice by invoice_number"""
-            invoice = self.order_manager.get_invoice(invoice_number=invoice_number, return_json=True)
+            invoice = self.order_manager.get_invoice(invoice_number=invoice_number, user_id=user_id, return_json=True)
             if not invoice:
                 raise HTTPException(status_code=404, detail="Invoice not found")
             invoice_id = invoice["invoice_id"]
-            orders = self.order_manager.get_invoice_orders(invoice_id=invoice_id, return_json=True)
+            orders = self.order_manager.get_invoice_orders(invoice_id=invoice_id, user_id=user_id, return_json=True)
             return ResponseModel(
                 message="Invoice Orders Retrieved Successfully",
                 data=orders
             )
         @self.router.delete(RoutePaths.INVOICE_WITH_ID, tags=[RouteTags.INVOICE], response_model=ResponseModel)
         @self.catch_api_exceptions 
-        async def delete_invoice(invoice_id: str, user_id: str):
+        async def delete_invoice(invoice_id: str, user_id: AuthorizedUserId):
             """Delete an invoice by invoice_number"""
             self.order_manager.delete_invoice(invoice_id=invoice_id, user_id=user_id, return_json=True)
             return ResponseModel(
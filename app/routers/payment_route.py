@@ -1,5 +1,6 @@
 import logging
 from fastapi import APIRouter, HTTPException
+from app.base.auth import AuthorizedUserId
 from app.constants.route_paths import RoutePaths
 from app.constants.route_tags import RouteTags
 from app.controllers.database_controller import DatabaseController
@@ -34,7 +35,7 @@ class PaymentRouter(UtilityManager):
         # GET /payments/{payment_id} - Retrieve a specific payment
         @self.router.get(RoutePaths.PAYMENT_WITH_ID, tags=[RouteTags.PAYMENT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_payment(payment_id: str, user_id: str):
+        async def get_payment(payment_id: str, user_id: AuthorizedUserId):
             """Retrieve a payment by ID"""
             payment = self.payment_manager.get_payment(
                 payment_id=payment_id,
@@ -49,7 +50,7 @@ class PaymentRouter(UtilityManager):
     # GET /invoices/{invoice_id}/payments - Retrieve all payments for an invoice
         @self.router.get(RoutePaths.PAYMENT_BY_INVOICE, tags=[RouteTags.PAYMENT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_payments_by_invoice(invoice_id: str, user_id: str):
+        async def get_payments_by_invoice(invoice_id: str, user_id: AuthorizedUserId):
             """Retrieve all payments for an invoice"""
             payments = self.payment_manager.get_payments_by_invoice(
                 invoice_id=invoice_id,
@@ -65,7 +66,7 @@ class PaymentRouter(UtilityManager):
         # POST /invoices/{invoice_id}/payments - Create a new payment
         @self.router.post(RoutePaths.PAYMENT_BY_INVOICE, tags=[RouteTags.PAYMENT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def create_payment(invoice_id: str, user_id: str, payment: PaymentCreateModel):
+        async def create_payment(invoice_id: str, user_id: AuthorizedUserId, payment: PaymentCreateModel):
             """Add a payment to an invoice"""
             payment_data = self.payment_manager.create_payment(
                 user_id=user_id,
@@ -83,7 +84,7 @@ class PaymentRouter(UtilityManager):
         # PUT /payments/{payment_id} - Update an existing payment
         @self.router.put(RoutePaths.PAYMENT_WITH_ID, tags=[RouteTags.PAYMENT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def update_payment(payment_id: str, user_id: str, payment: PaymentUpdateModel):
+        async def update_payment(payment_id: str, user_id: AuthorizedUserId, payment: PaymentUpdateModel):
             """Update a payment"""
             updated_payment = self.payment_manager.update_payment(
                 payment_id=payment_id,
@@ -101,7 +102,7 @@ class PaymentRouter(UtilityManager):
         # DELETE /payments/{payment_id} - Delete a payment
         @self.router.delete(RoutePaths.PAYMENT_WITH_ID, tags=[RouteTags.PAYMENT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def delete_payment(payment_id: str, user_id: str):
+        async def delete_payment(payment_id: str, user_id: AuthorizedUserId):
             """Delete a payment"""
             self.payment_manager.delete_payment(
                 payment_id=payment_id,
@@ -1,12 +1,17 @@
 import logging
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from app.base.auth import AuthorizedUserId, check_body_user_id
 from app.constants.route_paths import RoutePaths
 from app.constants.route_tags import RouteTags
+from app.enums.change_resources import ChangeResource
 from app.controllers.database_controller import DatabaseController
 from app.models.response_model import ResponseModel
 from app.models.product_model import ProductCreateModel, ProductUpdateModel, StockEntryModel  # Assuming these are in product_model.py
 from threading import Lock
 from app.utils.utility_manager import UtilityManager
+from app.utils.http_cache import LIST_CACHE_CONTROL, if_none_match, list_etag
+from datetime import datetime
+from typing import Optional
 
 class ProductRouter(UtilityManager):
     _instance = None
@@ -29,10 +34,11 @@ class ProductRouter(UtilityManager):
     def setup_routes(self):
         @self.router.post(RoutePaths.PRODUCT, tags=[RouteTags.PRODUCT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def create_product(product: ProductCreateModel):
+        async def create_product(user_id: AuthorizedUserId, product: ProductCreateModel):
             """Create a new product"""
+            check_body_user_id(product.user_id, user_id)
             product_data = self.product_manager.create_product(
-                user_id=product.user_id,
+                user_id=user_id,
                 product=product.product,
                 selling_price=product.selling_price,
                 mrp=product.mrp,
@@ -50,7 +56,7 @@ class ProductRouter(UtilityManager):
 
         @self.router.post(RoutePaths.PRODUCT_STOCK, tags=[RouteTags.PRODUCT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def add_stock_entry(product_id: str, user_id: str, stock: StockEntryModel):
+        async def add_stock_entry(product_id: str, user_id: AuthorizedUserId, stock: StockEntryModel):
             """Add stock to an existing product"""
             updated_product = self.product_manager.add_stock_entry(
                 product_id=product_id,
@@ -63,11 +69,57 @@ class ProductRouter(UtilityManager):
                 data=updated_product
             )
 
+        @self.router.get(RoutePaths.PRODUCT_STOCK_LEVEL, tags=[RouteTags.PRODUCT], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def get_stock_level(product_id: str, user_id: AuthorizedUserId, as_of: Optional[datetime] = None):
+            """Get the on-hand quantity of a product, optionally at a past point in time"""
+            stock = self.product_manager.get_stock_at(
+                product_id=product_id,
+                user_id=user_id,
+                as_of=as_of,
+                return_json=True
+            )
+            return ResponseModel(
+                message="Stock Level Fetched Successfully",
+                data=stock
+            )
+
+        @self.router.get(RoutePaths.PRODUCT_STOCK_MOVEMENTS, tags=[RouteTags.PRODUCT], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def get_stock_movements(
+            product_id: str,
+            user_id: AuthorizedUserId,
+            since: Optional[datetime] = None,
+            until: Optional[datetime] = None,
+            limit: int = 100
+        ):
+            """Get the stock movement journal of a product"""
+            movements = self.product_manager.get_stock_movements(
+                product_id=product_id,
+                user_id=user_id,
+                since=since,
+                until=until,
+                limit=limit,
+                return_json=True
+            )
+            return ResponseModel(
+                message="Stock Movements Fetched Successfully",
+                data=movements
+            )
+
         @self.router.get(RoutePaths.PRODUCT, tags=[RouteTags.PRODUCT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_all_products(user_id: str):
-            """Get all products for a user"""
+        async def get_all_products(request: Request, response: Response, user_id: AuthorizedUserId):
+            """Get all products for a user (304 when If-None-Match still matches)"""
+            # Version first: a write landing before the SELECT only makes the next poll refetch
+            etag = list_etag(
+                ChangeResource.PRODUCTS, user_id, self.product_manager.get_change_version(user_id, ChangeResource.PRODUCTS)
+            )
+            if if_none_match(request, etag):
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL})
             products = self.product_manager.get_all_products(user_id=user_id, return_json=True)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = LIST_CACHE_CONTROL
             return ResponseModel(
                 message="Products Fetched Successfully",
                 data=products
@@ -75,7 +127,7 @@ class ProductRouter(UtilityManager):
 
         @self.router.get(RoutePaths.PRODUCT_WITH_ID, tags=[RouteTags.PRODUCT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_product(product_id: str, user_id: str):
+        async def get_product(product_id: str, user_id: AuthorizedUserId):
             """Get a single product by ID and user_id"""
             product = self.product_manager.get_product(product_id=product_id, user_id=user_id, return_json=True)
             if not product:
@@ -87,7 +139,7 @@ class ProductRouter(UtilityManager):
 
         @self.router.put(RoutePaths.PRODUCT_WITH_ID, tags=[RouteTags.PRODUCT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def update_product(product_id: str, user_id: str, product_update: ProductUpdateModel):
+        async def update_product(product_id: str, user_id: AuthorizedUserId, product_update: ProductUpdateModel):
             """Update a product"""
             updated_product = self.product_manager.update_product(
                 product_id=product_id,
@@ -113,7 +165,7 @@ class ProductRouter(UtilityManager):
 
         @self.router.delete(RoutePaths.PRODUCT_WITH_ID, tags=[RouteTags.PRODUCT], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def delete_product(product_id: str, user_id: str):
+        async def delete_product(product_id: str, user_id: AuthorizedUserId):
             """Delete a product"""
             self.product_manager.delete_product(product_id=product_id, user_id=user_id)
             return ResponseModel(
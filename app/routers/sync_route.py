@@ -0,0 +1,44 @@
+import logging
+from fastapi import APIRouter, Query
+from app.base.auth import AuthorizedUserId
+from app.constants.route_paths import RoutePaths
+from app.constants.route_tags import RouteTags
+from app.controllers.database_controller import DatabaseController
+from app.models.response_model import ResponseModel
+from threading import Lock
+from app.utils.utility_manager import UtilityManager
+from typing import Optional
+
+
+class SyncRouter(UtilityManager):
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            logging.info("-----: Creating new instance of: SyncRouter:-----")
+            with cls._lock:
+                if not cls._instance:  # Double-checked locking
+                    cls._instance = super(SyncRouter, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, "router"):  # Prevent reinitialization
+            self.sync_manager = DatabaseController()
+            self.router = APIRouter(prefix=RoutePaths.API_PREFIX)
+            self.setup_routes()
+
+    def setup_routes(self):
+        @self.router.get(RoutePaths.SYNC, tags=[RouteTags.SYNC], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def get_changes(
+            user_id: AuthorizedUserId,
+            since: Optional[int] = Query(None, ge=0, description="next_since of the previous page; omit for a full sync"),
+            limit: int = Query(500, ge=1, le=5000)
+        ):
+            """Get products and customers changed (or deleted) since a sync version"""
+            changes = self.sync_manager.get_sync_changes(user_id=user_id, since=since, limit=limit)
+            return ResponseModel(
+                message="Changes Fetched Successfully",
+                data=changes
+            )
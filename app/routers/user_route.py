@@ -1,5 +1,8 @@
 import logging
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials
+from app.base.auth import AuthorizedPathUserId, FailedLoginLimiter, TokenVerifier, bearer_scheme
 from app.constants.route_paths import RoutePaths
 from app.constants.route_tags import RouteTags
 from app.controllers.database_controller import DatabaseController
@@ -28,6 +31,7 @@ class UserRouter(UtilityManager):
     def __init__(self):
         if not hasattr(self, "router"):  # prevent reinitialization
             self.survey_manager = DatabaseController()
+            self.login_limiter = FailedLoginLimiter()
             self.router = APIRouter(prefix=RoutePaths.API_PREFIX)
             self.setup_routes()
             self.SECRET_KEY = self.get_env_variable(EnvKeys.SECRET_KEY.value)
@@ -36,8 +40,10 @@ class UserRouter(UtilityManager):
 
     def create_access_token(self, data: dict):
         to_encode = data.copy()
-        expire = dt.now(datetime.timezone.utc) + timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({"exp": expire})
+        issued_at = dt.now(datetime.timezone.utc)
+        expire = issued_at + timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES)
+        # iat lets TokenVerifier revoke all of a user's tokens; jti keeps every token distinct
+        to_encode.update({"exp": expire, "iat": issued_at, "jti": self.generate_uuid()})
         encoded_jwt = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_jwt
 
@@ -61,7 +67,6 @@ class UserRouter(UtilityManager):
                 landmark=user.landmark,
                 return_json=True
             )
-            print(user_data)
             return ResponseModel(
                 message="User Created Successfully",
                 data=user_data
@@ -79,7 +84,7 @@ class UserRouter(UtilityManager):
 
         @self.router.get(RoutePaths.USER_WITH_ID, tags=[RouteTags.USER], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def get_user(user_id: str):
+        async def get_user(user_id: AuthorizedPathUserId):
             """Get a single user by ID"""
             user = self.survey_manager.get_user(user_id=user_id, return_json=True)
             if not user:
@@ -91,7 +96,7 @@ class UserRouter(UtilityManager):
 
         @self.router.put(RoutePaths.USER_WITH_ID, tags=[RouteTags.USER], response_model=ResponseModel)
         @self.catch_api_exceptions        
-        async def update_user(user_id: str, user_update: UserUpdateModel):
+        async def update_user(user_id: AuthorizedPathUserId, user_update: UserUpdateModel):
             """Update a user"""
             updated_user = self.survey_manager.update_user(
                 user_id=user_id,
@@ -118,7 +123,7 @@ class UserRouter(UtilityManager):
 
         @self.router.delete(RoutePaths.USER_WITH_ID, tags=[RouteTags.USER], response_model=ResponseModel)
         @self.catch_api_exceptions        
-        async def delete_user(user_id: str):
+        async def delete_user(user_id: AuthorizedPathUserId):
             """Delete a user"""
             self.survey_manager.delete_user(user_id=user_id)
             return ResponseModel(
@@ -128,20 +133,27 @@ class UserRouter(UtilityManager):
 
         @self.router.post(RoutePaths.LOGIN, tags=[RouteTags.AUTH], response_model=ResponseModel)
         @self.catch_api_exceptions
-        async def login(login_data: UserLoginRequestModel):
+        async def login(login_data: UserLoginRequestModel, request: Request):
             """Authenticate user and return token"""
-            # Note: Your DatabaseController doesn't have a verify_user method,
-            # so we'll use get_user_by_username and manual password verification
-            query = "SELECT * FROM users WHERE email = :email"
-            user = self.survey_manager.db.execute_query(
-                query,
-                params={"email": login_data.email},
-                fetch_one=True,
-                return_json=True
-            )
-            
-            if not user or not self.survey_manager.verify_password(login_data.password, user["password"]):
-                raise HTTPException(status_code=401, detail="Invalid credentials")
+            client_ip = request.client.host if request.client else "unknown"
+            # Locked-out attempts stop here, before the database or bcrypt; others hold a
+            # reservation that stays as the failure if the credentials are wrong
+            reserved_at = self.login_limiter.check(login_data.email, client_ip)
+            rejected = False
+            try:
+                # Lookup + bcrypt (+ rehash) run in a worker thread, off the event loop
+                user = await asyncio.to_thread(
+                    self.survey_manager.verify_user,
+                    email=login_data.email,
+                    password=login_data.password
+                )
+            except HTTPException as e:
+                rejected = e.status_code == 401
+                raise
+            finally:
+                if not rejected:
+                    self.login_limiter.release(login_data.email, client_ip, reserved_at)
+            self.login_limiter.reset(login_data.email)
 
             # Create access token
             access_token = self.create_access_token(
@@ -156,4 +168,16 @@ class UserRouter(UtilityManager):
             return ResponseModel(
                 message="Login successful",
                 data=result
-            )
\ No newline at end of file
+            )
+
+        @self.router.post(RoutePaths.LOGOUT, tags=[RouteTags.AUTH], response_model=ResponseModel)
+        @self.catch_api_exceptions
+        async def logout(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+            """Revoke the bearer token used for this request"""
+            if credentials is None:
+                raise HTTPException(status_code=401, detail="Not authenticated")
+            TokenVerifier().revoke(credentials.credentials)
+            return ResponseModel(
+                message="Logout successful",
+                data={}
+            )
@@ -0,0 +1,88 @@
+import hashlib
+import hmac
+import secrets
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+# Cell types treated as numeric (bool is an int subclass, as in the original anonymizer)
+NUMERIC_TYPES = (int, float, Decimal)
+
+
+class AnonymizationStrategy(ABC):
+    """Base class: rewrites one row at a time so results can be anonymized while streaming."""
+
+    name = 'base'
+
+    @abstractmethod
+    def anonymize_row(self, row: Dict[str, Any], idx: int) -> Dict[str, Any]:
+        """
+        Anonymize a single row.
+
+        Args:
+            row (dict): Original row
+            idx (int): 1-based position of the row in the result
+
+        Returns:
+            dict: Anonymized row
+        """
+
+
+class PlaceholderStrategy(AnonymizationStrategy):
+    """Replaces numbers with `idx.idx` and strings with `item_idx` (the original anonymization)."""
+
+    name = 'placeholder'
+
+    def anonymize_row(self, row: Dict[str, Any], idx: int) -> Dict[str, Any]:
+        # Placeholders only depend on the row position, so build them once per row, not per cell
+        number = float(f"{idx}.{idx}")
+        label = f"item_{idx}"
+        anonymized_row = {}
+        for key, value in row.items():
+            if isinstance(value, NUMERIC_TYPES):
+                anonymized_row[key] = number
+            elif isinstance(value, str):
+                anonymized_row[key] = label
+            else:
+                anonymized_row[key] = value
+        return anonymized_row
+
+
+class HashedPseudonymStrategy(AnonymizationStrategy):
+    """
+    Replaces every value with a keyed hash of itself.
+
+    The same value always maps to the same pseudonym within one salt, so ids still
+    join across rows and result sets of a request, but cannot be reversed or
+    correlated across requests that use different salts.
+    """
+
+    name = 'pseudonymize'
+
+    def __init__(self, salt: Optional[bytes] = None, digest_size: int = 16, cache_size: int = 65536):
+        """
+        Args:
+            salt (bytes): HMAC key; a random one is generated when omitted (one per request)
+            digest_size (int): Number of hex characters kept from the digest
+            cache_size (int): Bounded cache for repeated values (categories, foreign keys)
+        """
+        self.salt = salt if salt is not None else secrets.token_bytes(16)
+        self.digest_size = digest_size
+        self._pseudonym = lru_cache(maxsize=cache_size)(self._compute_pseudonym)
+
+    def _compute_pseudonym(self, prefix: str, canonical: str) -> str:
+        digest = hmac.new(self.salt, canonical.encode('utf-8'), hashlib.sha256).hexdigest()
+        return f"{prefix}_{digest[:self.digest_size]}"
+
+    def pseudonym(self, value: Any) -> Any:
+        """Pseudonym for a single value; non-string, non-numeric values are returned unchanged."""
+        if isinstance(value, str):
+            return self._pseudonym('anon', value)
+        if isinstance(value, NUMERIC_TYPES):
+            # Canonicalize so 1, 1.0 and Decimal('1.00') share a pseudonym
+            return self._pseudonym('num', repr(float(value)))
+        return value
+
+    def anonymize_row(self, row: Dict[str, Any], idx: int) -> Dict[str, Any]:
+        return {key: self.pseudonym(value) for key, value in row.items()}
@@ -1,23 +1,41 @@
 import json
 import logging
 from functools import wraps
+from typing import Optional
 from fastapi import HTTPException
+from sqlalchemy.exc import StatementError
+from app.databases.column_types import is_invalid_parameter, is_malformed_key
 from fastapi.responses import JSONResponse
 from app.models.response_model import ResponseModel
 
 class CatchAPIException:
     def __init__(self) -> None:
-        logging.basicConfig(filename='logs/api-logs.log', level=logging.ERROR)    
+        # Logging is configured once by Settings; reconfiguring here would bypass the queue pipeline
+        pass
+
+    @staticmethod
+    def _as_http_exception(error: StatementError) -> Optional[HTTPException]:
+        """A rejected parameter as the client error it is: no row has a malformed key, a bad number is a bad request."""
+        if is_malformed_key(error):
+            return HTTPException(status_code=404, detail="Not found")
+        if is_invalid_parameter(error):
+            return HTTPException(status_code=400, detail=f"Invalid value: {error.orig}")
+        return None
 
     def catch_api_exceptions(self, func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
             try:
-                return await func(*args, **kwargs)
+                try:
+                    return await func(*args, **kwargs)
+                except StatementError as e:
+                    http_exception = self._as_http_exception(e)
+                    if http_exception is None:
+                        raise
+                    raise http_exception from e
             except HTTPException as e:
                 # Log the error with stack trace
-                #logging.error(f"HTTPException: {str(e)}\n{traceback.format_exc()}")
-                logging.error("Error in catch_api_exceptions wrapper class.")
+                logging.error("HTTPException %s in %s: %s", e.status_code, func.__name__, e.detail)
 
                 # Check if e.detail is already a dictionary
                 if isinstance(e.detail, dict):
@@ -36,12 +54,11 @@ class CatchAPIException:
                     status_code=e.status_code,
                     data=[error_data]
                 )
-                return JSONResponse(content=response_model.model_dump(), status_code=e.status_code)
+                return JSONResponse(content=response_model.model_dump(), status_code=e.status_code, headers=e.headers)
 
             except Exception as e:
                 # Log the error with stack trace
-                #logging.error(f"Exception: {str(e)}\n{traceback.format_exc()}")
-                logging.error("Error in catch_api_exceptions wrapper class.")
+                logging.exception("Unhandled exception in %s", func.__name__)
                 # For all other exceptions, return a 500 Internal Server Error
                 error_message = str(e)
                 response_model = ResponseModel(
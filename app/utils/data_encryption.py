@@ -1,15 +1,29 @@
+import os
 import bcrypt
+from app.enums.env_keys import EnvKeys
 
 class DataEncryption:
     def __init__(self):
         pass
 
+    @staticmethod
+    def bcrypt_rounds() -> int:
+        """Configured bcrypt cost factor (BCRYPT_ROUNDS, bcrypt's default of 12 when unset)."""
+        return int(os.getenv(EnvKeys.BCRYPT_ROUNDS.value, '12'))
+
     def hash_password(self, password: str) -> str:
         """Hashes a password using bcrypt."""
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=self.bcrypt_rounds())
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
 
     def verify_password(self, password: str, hashed_password: str) -> bool:
         """Verifies a password against its hashed value."""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
\ No newline at end of file
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def password_needs_rehash(self, hashed_password: str) -> bool:
+        """True when the hash was made with a different cost than the configured one ($2b$<cost>$...)."""
+        try:
+            return int(hashed_password.split('$')[2]) != self.bcrypt_rounds()
+        except (IndexError, ValueError):
+            return True
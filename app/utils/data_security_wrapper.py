@@ -1,14 +1,67 @@
-from decimal import Decimal
-from typing import Dict, Any, List
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from app.utils.anonymization_strategies import AnonymizationStrategy, HashedPseudonymStrategy, PlaceholderStrategy
+from app.utils.columnar_statistics import ColumnarStatistics
 
 class DataSecurityWrapper:
     @staticmethod
-    def anonymize_query_result(query_result: Dict[str, Any]) -> Dict[str, Any]:
+    def stream_anonymized_rows(
+        rows: Iterable[Dict[str, Any]],
+        strategy: Optional[AnonymizationStrategy] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily anonymize rows one at a time.
+
+        Args:
+            rows (iterable): Rows from a list, generator or server-side cursor
+            strategy (AnonymizationStrategy): Strategy to apply (placeholder by default)
+
+        Yields:
+            dict: Anonymized row; only the current row is held in memory
+        """
+        strategy = strategy or PlaceholderStrategy()
+        for idx, row in enumerate(rows, 1):
+            yield strategy.anonymize_row(row, idx)
+
+    @staticmethod
+    def stream_anonymized_chunks(
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: int = 1000,
+        strategy: Optional[AnonymizationStrategy] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily anonymize rows in fixed-size chunks.
+
+        Args:
+            rows (iterable): Rows from a list, generator or server-side cursor
+            chunk_size (int): Maximum rows per chunk
+            strategy (AnonymizationStrategy): Strategy to apply (placeholder by default)
+
+        Yields:
+            list: Up to `chunk_size` anonymized rows
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        anonymized = DataSecurityWrapper.stream_anonymized_rows(rows, strategy)
+        while True:
+            chunk = list(islice(anonymized, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def anonymize_query_result(
+        query_result: Dict[str, Any],
+        strategy: Optional[AnonymizationStrategy] = None,
+        stream: bool = False
+    ) -> Dict[str, Any]:
         """
         Anonymize the query result before passing to LLM.
         
         Args:
             query_result (dict): Original query result with headers and data
+            strategy (AnonymizationStrategy): Strategy to apply (placeholder by default)
+            stream (bool): Return 'data' as a lazy iterator instead of a list
         
         Returns:
             dict: Anonymized query result
@@ -16,37 +69,24 @@ class DataSecurityWrapper:
         if not query_result or 'data' not in query_result:
             return query_result
 
-        # Create a copy to avoid modifying the original
+        # Shallow copy: only 'data' is replaced, the original rows are never duplicated
         anonymized_result = query_result.copy()
-        
-        # Anonymize data
-        anonymized_data = []
-        for idx, row in enumerate(query_result['data'], 1):
-            anonymized_row = {}
-            for key, value in row.items():
-                # Anonymize numeric values
-                if isinstance(value, (int, float, Decimal)):
-                    # Replace with a generic value pattern
-                    anonymized_row[key] = float(f"{idx}.{idx}")
-                # Anonymize string values
-                elif isinstance(value, str):
-                    # Replace with a generic identifier
-                    anonymized_row[key] = f"item_{idx}"
-                else:
-                    anonymized_row[key] = value
-            anonymized_data.append(anonymized_row)
-        
-        anonymized_result['data'] = anonymized_data
-        
+        anonymized_rows = DataSecurityWrapper.stream_anonymized_rows(query_result['data'], strategy)
+        anonymized_result['data'] = anonymized_rows if stream else list(anonymized_rows)
+
         return anonymized_result
 
     @staticmethod
-    def generate_safe_statistics(query_result: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_safe_statistics(
+        query_result: Dict[str, Any],
+        approximate_distinct: bool = False
+    ) -> Dict[str, Any]:
         """
         Generate safe, aggregated statistics from query result.
         
         Args:
             query_result (dict): Original query result
+            approximate_distinct (bool): Estimate distinct counts (HyperLogLog) for high-cardinality columns
         
         Returns:
             dict: Safe statistics for LLM consumption
@@ -54,49 +94,41 @@ class DataSecurityWrapper:
         if not query_result or 'data' not in query_result:
             return {}
 
-        # Compute safe statistics
+        # Convert the rows to typed columns once; every statistic below reuses them
+        stats = ColumnarStatistics(query_result['data'], query_result['headers'])
+
         safe_stats = {
-            'total_records': len(query_result['data']),
+            'total_records': stats.total_records,
             'column_names': query_result['headers'],
-            'numeric_columns': [
-                col for col in query_result['headers'] 
-                if any(isinstance(row.get(col), (int, float, Decimal)) for row in query_result['data'])
-            ],
+            'numeric_columns': [col for col, profile in stats.columns.items() if profile.has_numeric],
             'unique_value_counts': {},
-            'numeric_column_stats': {}
+            'numeric_column_stats': {},
+            'null_counts': {}
         }
 
-        # Detailed analysis of numeric columns
-        for col in safe_stats['numeric_columns']:
-            numeric_values = [
-                row.get(col) for row in query_result['data'] 
-                if isinstance(row.get(col), (int, float, Decimal))
-            ]
-            
-            safe_stats['numeric_column_stats'][col] = {
-                'min': float(min(numeric_values)) if numeric_values else None,
-                'max': float(max(numeric_values)) if numeric_values else None,
-                'average': float(sum(numeric_values) / len(numeric_values)) if numeric_values else None
-            }
-
-        # Count unique values for non-numeric columns
-        for col in query_result['headers']:
-            if col not in safe_stats['numeric_columns']:
-                unique_values = set(
-                    row.get(col) for row in query_result['data'] 
-                    if not isinstance(row.get(col), (int, float, Decimal))
+        for col, profile in stats.columns.items():
+            safe_stats['null_counts'][col] = profile.null_count()
+            if profile.has_numeric:
+                safe_stats['numeric_column_stats'][col] = profile.numeric_stats()
+            else:
+                # Count unique non-numeric values
+                safe_stats['unique_value_counts'][col] = profile.distinct_count(
+                    mask=~profile.numeric_mask, approximate=approximate_distinct
                 )
-                safe_stats['unique_value_counts'][col] = len(unique_values)
 
         return safe_stats
 
     @staticmethod
-    def create_generalized_description(query_result: Dict[str, Any]) -> Dict[str, Any]:
+    def create_generalized_description(
+        query_result: Dict[str, Any],
+        approximate_distinct: bool = False
+    ) -> Dict[str, Any]:
         """
         Create a generalized, non-identifying description of the data.
         
         Args:
             query_result (dict): Original query result
+            approximate_distinct (bool): Estimate distinct counts (HyperLogLog) for high-cardinality columns
         
         Returns:
             dict: Generalized data description
@@ -104,32 +136,33 @@ class DataSecurityWrapper:
         if not query_result or 'data' not in query_result:
             return {}
 
+        stats = ColumnarStatistics(query_result['data'], query_result['headers'])
+
         # Analyze data types and ranges
         column_analyses = {}
-        for col in query_result['headers']:
-            values = [row.get(col) for row in query_result['data']]
-            
+        for col, profile in stats.columns.items():
             # Numeric column analysis
-            if all(isinstance(v, (int, float, Decimal)) for v in values if v is not None):
-                numeric_values = [v for v in values if v is not None]
+            if profile.is_numeric():
+                numeric_stats = profile.numeric_stats()
+                raw_min, raw_max = profile.raw_extremes()
                 column_analyses[col] = {
                     'type': 'numeric',
-                    'min': float(min(numeric_values)),
-                    'max': float(max(numeric_values)),
-                    'approximate_range_description': f"Values range from {min(numeric_values)} to {max(numeric_values)}"
+                    'min': numeric_stats['min'],
+                    'max': numeric_stats['max'],
+                    'approximate_range_description': f"Values range from {raw_min} to {raw_max}"
                 }
-            
+
             # Categorical column analysis
-            elif all(isinstance(v, str) for v in values if v is not None):
+            elif profile.is_categorical():
                 column_analyses[col] = {
                     'type': 'categorical',
-                    'unique_count': len(set(values)),
+                    'unique_count': profile.distinct_count(approximate=approximate_distinct),
                     'sample_categories_count': 'Multiple distinct categories present'
                 }
 
         return {
             'data_overview': {
-                'total_records': len(query_result['data']),
+                'total_records': stats.total_records,
                 'columns': column_analyses
             }
         }
@@ -137,7 +170,10 @@ class DataSecurityWrapper:
     @staticmethod
     def prepare_llm_input(
         query_result: Dict[str, Any], 
-        strategy: str = 'anonymize'
+        strategy: str = 'anonymize',
+        approximate_distinct: bool = False,
+        salt: Optional[bytes] = None,
+        stream: bool = False
     ) -> Dict[str, Any]:
         """
         Prepare LLM input with chosen security strategy
@@ -145,16 +181,25 @@ class DataSecurityWrapper:
         Args:
             query_result (dict): Original query result
             strategy (str): Security strategy to apply
+            approximate_distinct (bool): Estimate distinct counts for the statistics/description strategies
+            salt (bytes): Per-request salt for the 'pseudonymize' strategy (random when omitted)
+            stream (bool): For 'anonymize'/'pseudonymize', return 'data' as a lazy iterator so
+                rows from a server-side cursor are never materialized
         
         Returns:
             dict: Secured data representation
         """
         strategies = {
-            'anonymize': DataSecurityWrapper.anonymize_query_result,
-            'statistics': DataSecurityWrapper.generate_safe_statistics,
-            'description': DataSecurityWrapper.create_generalized_description
+            'anonymize': lambda result: DataSecurityWrapper.anonymize_query_result(
+                result, stream=stream),
+            'pseudonymize': lambda result: DataSecurityWrapper.anonymize_query_result(
+                result, strategy=HashedPseudonymStrategy(salt=salt), stream=stream),
+            'statistics': lambda result: DataSecurityWrapper.generate_safe_statistics(
+                result, approximate_distinct=approximate_distinct),
+            'description': lambda result: DataSecurityWrapper.create_generalized_description(
+                result, approximate_distinct=approximate_distinct)
         }
         
         # Default to anonymization if strategy not found
-        secure_data = strategies.get(strategy, DataSecurityWrapper.anonymize_query_result)(query_result)
-        return secure_data
\ No newline at end of file
+        secure_data = strategies.get(strategy, strategies['anonymize'])(query_result)
+        return secure_data
@@ -1,6 +1,12 @@
 import glob
+import json
+import logging
 import os
-from typing import List, Optional, Union
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 from langchain_community.document_loaders import TextLoader
 # from langchain_community.document_loaders.pdf import PyPDFLoader
 from langchain_community.document_loaders.csv_loader import CSVLoader
@@ -10,35 +16,290 @@ from langchain_community.document_loaders.web_base import WebBaseLoader
 from langchain_community.document_loaders.excel import UnstructuredExcelLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from app.enums.env_keys import EnvKeys
 from app.enums.file_extensions import FileExtensions
 from app.utils.file_system import FileSystem
+from app.utils.file_checksum import file_checksum
+from app.utils.excel_row_loader import ExcelRowLoader
+
+# Extensions get_loader() maps to a loader (kept in sync with it)
+SUPPORTED_EXTENSIONS = (FileExtensions.CSV.value, FileExtensions.XLSX.value, FileExtensions.XLS.value)
+# Streaming defaults, overridable through DOCUMENT_BATCH_ROWS / DOCUMENT_MAX_BATCH_BYTES
+DEFAULT_BATCH_ROWS = 1000
+DEFAULT_MAX_BATCH_BYTES = 8 * 1024 * 1024
+# Formats slow enough to parse that shipping their chunks back from a worker process pays off
+PARALLEL_EXTENSIONS = (FileExtensions.XLSX.value, FileExtensions.XLS.value)
+
+
+@lru_cache(maxsize=8)
+def get_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """One splitter per (chunk_size, chunk_overlap), reused across files (and per worker process)."""
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def parse_file(file_path: str, chunk_size: int, chunk_overlap: int) -> Tuple[str, List[Document], float]:
+    """Load and split one file. Module-level so it can run in a process pool."""
+    started = time.perf_counter()
+    texts = DocumentLoader.load_file(file_path, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return file_path, texts, time.perf_counter() - started
+
+
+class IngestionManifest:
+    """Persisted checksum manifest used to skip files that have not changed since the last ingest."""
+
+    def __init__(self, manifest_path: Optional[str] = None):
+        self.manifest_path = manifest_path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if manifest_path and os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable ingestion manifest {manifest_path}: {e}")
+
+    def is_unchanged(self, file_path: str, stat: os.stat_result, checksum: Optional[str], settings: Dict[str, int]) -> bool:
+        """Unchanged if size and mtime match, or (when given) the checksum matches."""
+        entry = self.entries.get(file_path)
+        if not entry or entry.get("settings") != settings:
+            return False
+        if checksum is None:
+            return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+        return entry.get("checksum") == checksum
+
+    def record(self, file_path: str, stat: os.stat_result, checksum: str, settings: Dict[str, int]) -> None:
+        self.entries[file_path] = {
+            "checksum": checksum,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "settings": settings
+        }
+
+    def retain(self, file_paths: List[str]) -> None:
+        """Forget files that no longer exist in the directory."""
+        keep = set(file_paths)
+        self.entries = {path: entry for path, entry in self.entries.items() if path in keep}
+
+    def save(self) -> None:
+        if not self.manifest_path:
+            return
+        # Write-then-rename so an interrupted ingest never leaves a truncated manifest
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.manifest_path)
+
 
 class DocumentLoader:
     @staticmethod
-    def load_directory(directory: str, chunk_size: int = 2000, chunk_overlap: int = 150) -> List[Document]:
-        all_documents = []
-        for file_path in glob.glob(os.path.join(directory, "*")):
-            loader = DocumentLoader.get_loader(file_path)
-            if loader:
-                documents = loader.load()
-                text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-                texts = text_splitter.split_documents(documents)
-                all_documents.extend(texts)
-        return all_documents
+    def load_directory(
+        directory: str,
+        chunk_size: int = 2000,
+        chunk_overlap: int = 150,
+        manifest_path: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> List[Document]:
+        return list(DocumentLoader.ingest_directory(
+            directory,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            manifest_path=manifest_path,
+            max_workers=max_workers
+        ))
+
+    @staticmethod
+    def ingest_directory(
+        directory: str,
+        chunk_size: int = 2000,
+        chunk_overlap: int = 150,
+        manifest_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        timings: Optional[List[Dict[str, Any]]] = None
+    ) -> Iterator[Document]:
+        """
+        Load and split every supported file in a directory, yielding chunks as files finish.
+
+        Args:
+            directory: Directory to ingest (not recursive)
+            chunk_size: Splitter chunk size
+            chunk_overlap: Splitter chunk overlap
+            manifest_path: JSON checksum manifest; files unchanged since the last run are skipped
+            max_workers: Parser processes (None = CPU count, 1 = parse in this process)
+            timings: Optional list that receives one timing/status dict per file
+
+        Yields:
+            Document chunks of the new or changed files
+        """
+        manifest = IngestionManifest(manifest_path)
+        settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+        file_paths = [
+            os.path.abspath(path) for path in sorted(glob.glob(os.path.join(directory, "*")))
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS
+        ]
+
+        # Decide what to parse: size/mtime first, the checksum only when those moved
+        changed: Dict[str, Tuple[os.stat_result, str, float]] = {}
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            if manifest.is_unchanged(file_path, stat, None, settings):
+                DocumentLoader._report_file(timings, file_path, "unchanged")
+                continue
+            started = time.perf_counter()
+            checksum = file_checksum(file_path)
+            hash_seconds = time.perf_counter() - started
+            if manifest.is_unchanged(file_path, stat, checksum, settings):
+                # Touched but identical: refresh the stat fields so the next run skips hashing
+                manifest.record(file_path, stat, checksum, settings)
+                DocumentLoader._report_file(timings, file_path, "unchanged", hash_seconds=hash_seconds)
+                continue
+            changed[file_path] = (stat, checksum, hash_seconds)
+
+        # Spreadsheet parsing dominates; CSV chunks cost more to pickle back than to parse here
+        workers = max_workers or os.cpu_count() or 1
+        pooled = [path for path in changed if os.path.splitext(path)[1].lower() in PARALLEL_EXTENSIONS]
+        if workers <= 1 or len(pooled) <= 1:
+            pooled = []
+        inline = [path for path in changed if path not in pooled]
+
+        executor = None
+        try:
+            results = (DocumentLoader._safe_parse(path, chunk_size, chunk_overlap) for path in inline)
+            if pooled:
+                executor = ProcessPoolExecutor(max_workers=min(workers, len(pooled)))
+                futures = {
+                    executor.submit(parse_file, path, chunk_size, chunk_overlap): path for path in pooled
+                }
+                # Inline files are parsed while the pool works through the spreadsheets
+                results = chain(
+                    results,
+                    (DocumentLoader._collect(future, futures[future]) for future in as_completed(futures))
+                )
+
+            for file_path, texts, parse_seconds, error in results:
+                stat, checksum, hash_seconds = changed[file_path]
+                if error:
+                    logging.error(f"Failed to ingest {file_path}: {error}")
+                    DocumentLoader._report_file(timings, file_path, "failed", hash_seconds, parse_seconds)
+                    continue
+                yield from texts
+                # Only recorded once its chunks were handed to the caller
+                manifest.record(file_path, stat, checksum, settings)
+                DocumentLoader._report_file(timings, file_path, "parsed", hash_seconds, parse_seconds, len(texts))
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            manifest.retain(file_paths)
+            manifest.save()
+
+    @staticmethod
+    def _safe_parse(file_path: str, chunk_size: int, chunk_overlap: int) -> Tuple[str, List[Document], float, Optional[Exception]]:
+        started = time.perf_counter()
+        try:
+            return (*parse_file(file_path, chunk_size, chunk_overlap), None)
+        except Exception as e:
+            return file_path, [], time.perf_counter() - started, e
+
+    @staticmethod
+    def _collect(future, file_path: str) -> Tuple[str, List[Document], float, Optional[Exception]]:
+        try:
+            return (*future.result(), None)
+        except Exception as e:
+            return file_path, [], 0.0, e
+
+    @staticmethod
+    def _report_file(
+        timings: Optional[List[Dict[str, Any]]],
+        file_path: str,
+        status: str,
+        hash_seconds: float = 0.0,
+        parse_seconds: float = 0.0,
+        chunks: int = 0
+    ) -> None:
+        logging.info(
+            f"Ingest {status}: {file_path} (hash {hash_seconds:.3f}s, parse {parse_seconds:.3f}s, {chunks} chunks)"
+        )
+        if timings is not None:
+            timings.append({
+                "file_path": file_path,
+                "status": status,
+                "hash_seconds": hash_seconds,
+                "parse_seconds": parse_seconds,
+                "chunks": chunks
+            })
 
     @staticmethod
     def load_file(file_path: str, chunk_size: int = 2000, chunk_overlap: int = 150) -> List[Document]:
+        return [
+            text
+            for batch in DocumentLoader.iter_file(file_path, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            for text in batch
+        ]
+
+    @staticmethod
+    def iter_file(
+        file_path: str,
+        chunk_size: int = 2000,
+        chunk_overlap: int = 150,
+        batch_rows: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None
+    ) -> Iterator[List[Document]]:
+        """
+        Lazily load and split a file in bounded batches.
+
+        Rows are read through the loader's lazy_load (CSV in row order, XLSX in openpyxl
+        read-only mode) and split one batch at a time, so memory is bounded by the batch
+        rather than the file.
+
+        Args:
+            file_path: File to load
+            chunk_size: Splitter chunk size
+            chunk_overlap: Splitter chunk overlap
+            batch_rows: Maximum source rows per batch (DOCUMENT_BATCH_ROWS)
+            max_batch_bytes: Maximum source text per batch (DOCUMENT_MAX_BATCH_BYTES)
+
+        Yields:
+            Lists of split Document chunks, one list per batch
+        """
         loader = DocumentLoader.get_loader(file_path)
-        if loader:
-            documents = loader.load()
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-            texts = text_splitter.split_documents(documents)
-            return texts
-        else:
-            return []
+        if not loader:
+            return
+        batch_rows = batch_rows or int(os.getenv(EnvKeys.DOCUMENT_BATCH_ROWS.value, DEFAULT_BATCH_ROWS))
+        max_batch_bytes = max_batch_bytes or int(
+            os.getenv(EnvKeys.DOCUMENT_MAX_BATCH_BYTES.value, DEFAULT_MAX_BATCH_BYTES)
+        )
+        text_splitter = get_text_splitter(chunk_size, chunk_overlap)
+
+        batch: List[Document] = []
+        batch_bytes = 0
+        for document in loader.lazy_load():
+            batch.append(document)
+            batch_bytes += len(document.page_content)
+            if len(batch) >= batch_rows or batch_bytes >= max_batch_bytes:
+                yield text_splitter.split_documents(batch)
+                batch, batch_bytes = [], 0
+        if batch:
+            yield text_splitter.split_documents(batch)
+
+    @staticmethod
+    def iter_directory(
+        directory: str,
+        chunk_size: int = 2000,
+        chunk_overlap: int = 150,
+        batch_rows: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None
+    ) -> Iterator[List[Document]]:
+        """Lazily load and split every supported file in a directory, one bounded batch at a time."""
+        for file_path in sorted(glob.glob(os.path.join(directory, "*"))):
+            if os.path.isfile(file_path) and os.path.splitext(file_path)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield from DocumentLoader.iter_file(
+                    file_path,
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                    batch_rows=batch_rows,
+                    max_batch_bytes=max_batch_bytes
+                )
 
     @staticmethod
-    def get_loader(file_path: str) -> Optional[Union[TextLoader, WebBaseLoader]]:
+    def get_loader(file_path: str) -> Optional[Union[TextLoader, WebBaseLoader, ExcelRowLoader]]:
         cleaned_path = FileSystem().clean_path(path=file_path)
         if str(cleaned_path).startswith("http"):
             return WebBaseLoader(cleaned_path)
@@ -54,7 +315,11 @@ class DocumentLoader:
             #     return UnstructuredHTMLLoader(cleaned_path)
             if file_extension == FileExtensions.CSV.value:
                 return CSVLoader(cleaned_path, encoding="utf-8")
-            elif file_extension in [FileExtensions.XLSX.value, FileExtensions.XLS.value]:
+            elif file_extension == FileExtensions.XLSX.value:
+                # Row-streaming reader; the whole-sheet loader below needs the file in memory
+                return ExcelRowLoader(cleaned_path)
+            elif file_extension == FileExtensions.XLS.value:
+                # openpyxl cannot read legacy .xls files
                 return UnstructuredExcelLoader(cleaned_path)
             else:
                 return None
\ No newline at end of file
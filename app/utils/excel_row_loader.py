@@ -0,0 +1,52 @@
+from typing import Any, Iterator, List, Optional
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+
+class ExcelRowLoader(BaseLoader):
+    """
+    Streams an .xlsx workbook one row at a time using openpyxl read-only mode.
+
+    Each row becomes a Document formatted like CSVLoader ("header: value" lines), so
+    only the current row is held in memory instead of the whole sheet.
+    """
+
+    def __init__(self, file_path: str, sheet_names: Optional[List[str]] = None):
+        self.file_path = file_path
+        self.sheet_names = sheet_names
+
+    @staticmethod
+    def _headers(first_row: tuple) -> List[str]:
+        return [
+            str(value).strip() if value is not None else f"column_{idx}"
+            for idx, value in enumerate(first_row, 1)
+        ]
+
+    @staticmethod
+    def _format(value: Any) -> str:
+        return value.strip() if isinstance(value, str) else ("" if value is None else str(value))
+
+    def lazy_load(self) -> Iterator[Document]:
+        # Imported lazily so the rest of the loaders work without openpyxl installed
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            for sheet_name in self.sheet_names or workbook.sheetnames:
+                rows = workbook[sheet_name].iter_rows(values_only=True)
+                first_row = next(rows, None)
+                if first_row is None:
+                    continue
+                headers = self._headers(first_row)
+                for idx, row in enumerate(rows):
+                    if all(value is None for value in row):
+                        continue
+                    content = "\n".join(
+                        f"{header}: {self._format(value)}" for header, value in zip(headers, row)
+                    )
+                    yield Document(
+                        page_content=content,
+                        metadata={"source": str(self.file_path), "sheet": sheet_name, "row": idx}
+                    )
+        finally:
+            workbook.close()
@@ -0,0 +1,11 @@
+import hashlib
+
+# 1 MiB reads keep hashing I/O-bound on large spreadsheets instead of call-overhead-bound
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+def file_checksum(file_path: str) -> str:
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for byte_block in iter(lambda: f.read(CHECKSUM_BLOCK_SIZE), b""):
+            sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
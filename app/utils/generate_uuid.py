@@ -1,4 +1,49 @@
+import os
+import threading
+import time
 import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+
+def generate_uuid7() -> uuid.UUID:
+    """
+    RFC 9562 UUIDv7: a 48-bit Unix millisecond timestamp, a 12-bit per-millisecond counter and
+    62 random bits. Keys from one process are strictly increasing, so B-tree inserts append at
+    the right edge of the index instead of landing on random pages.
+    """
+    global _last_ms, _sequence
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            # Random start (top bit clear) leaves room to count within the millisecond
+            _sequence = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            _sequence += 1
+            if _sequence > 0xFFF:
+                # Counter exhausted, or the clock stepped back: borrow the next millisecond
+                _last_ms += 1
+                _sequence = 0
+        timestamp_ms, sequence = _last_ms, _sequence
+    random_bits = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    return uuid.UUID(int=(timestamp_ms << 80) | (0x7 << 76) | (sequence << 64) | (0b10 << 62) | random_bits)
+
 
 def generate_uuid():
-    return str(uuid.uuid4())
\ No newline at end of file
+    return str(generate_uuid7())
+
+
+def uuid7_datetime(value) -> Optional[datetime]:
+    """Creation time (naive UTC) embedded in a UUIDv7, or None for other versions and non-UUIDs."""
+    try:
+        parsed = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+    except ValueError:
+        return None
+    if parsed.version != 7:
+        return None
+    return datetime.fromtimestamp((parsed.int >> 80) / 1000, tz=timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,28 @@
+import hashlib
+from fastapi import Request
+from app.constants.fast_api_constants import FastAPIConstants
+from app.enums.change_resources import ChangeResource
+
+# Clients may keep the list but must revalidate it (a cheap 304) before reuse
+LIST_CACHE_CONTROL = "private, no-cache"
+
+
+def list_etag(resource: ChangeResource, user_id: str, version: int) -> str:
+    """
+    Strong ETag for a tenant's list: it changes whenever a write bumps the resource's
+    change counter (or a release changes the response shape).
+    """
+    digest = hashlib.sha256(
+        f"{FastAPIConstants.VERSION}:{resource.value}:{user_id}".encode("utf-8")
+    ).hexdigest()[:16]
+    return f'"{resource.value}-{digest}-{version}"'
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names `etag` (or `*`)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
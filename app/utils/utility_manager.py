@@ -1,4 +1,3 @@
-import hashlib
 import logging
 from typing import Dict, List
 from app.enums.env_keys import EnvKeys
@@ -10,6 +9,7 @@ from app.utils.data_mapper import data_mapper
 from app.utils.get_current_timestamp import get_current_timestamp_str
 from app.utils.env_manager import EnvManager
 from app.utils.document_loader import DocumentLoader
+from app.utils.file_checksum import file_checksum
 from app.utils.api_error_handler import CatchAPIException
 
 class UtilityManager(FileSystem, EnvManager, DocumentLoader,CatchAPIException,DataEncryption):
@@ -46,12 +46,7 @@ class UtilityManager(FileSystem, EnvManager, DocumentLoader,CatchAPIException,Da
     def create_new_checksum(self, file_path: str) -> str:
         try:
             # Calculate SHA-256 checksum of the file
-            sha256_hash = hashlib.sha256()
-            with open(file_path, "rb") as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            checksum = sha256_hash.hexdigest()
-            return checksum
+            return file_checksum(file_path)
         except Exception as e:
             logging.error("Error creating checksum")
             raise e
@@ -0,0 +1,241 @@
+"""
+Offline load test for the API and controller layer.
+
+Seeds benchmark tenants in the configured Postgres database (point POSTGRES_DB_NAME at a
+disposable database), then drives the login, create_order, payment and listing endpoints at
+a fixed concurrency and writes throughput, latency percentiles and queries per request as JSON.
+The in-process app runs without admission control, whose per-tenant rate limits and caps would
+answer most of the load with 429s; start a server given with --base-url with
+ADMISSION_CONTROL_ENABLED=False for the same reason.
+
+    python -m benchmarks.run_benchmarks --concurrency 16 --requests 500
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+import httpx
+from dotenv import load_dotenv
+from benchmarks.seed import BENCHMARK_PASSWORD, SeededTenant, random_order_lines, seed_tenants
+from app.constants.route_paths import RoutePaths
+from app.enums.env_keys import EnvKeys
+from app.base.query_profiler import QUERY_COUNT_HEADER
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+# A run regresses when throughput drops, or p95 latency grows, by more than this fraction
+REGRESSION_TOLERANCE = 0.10
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], queries: List[int], errors: int, elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0
+        },
+        "queries_per_request": {
+            "mean": round(sum(queries) / len(queries), 2) if queries else None,
+            "max": max(queries) if queries else None
+        }
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    make_request: Callable[[], Dict[str, Any]],
+    total_requests: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Issue `total_requests` requests from `concurrency` workers, each keeping one request in flight."""
+    latencies: List[float] = []
+    queries: List[int] = []
+    errors = 0
+    remaining = iter(range(total_requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            request = make_request()
+            started = time.perf_counter()
+            response = await client.request(**request)
+            duration = time.perf_counter() - started
+            if response.status_code >= 400:
+                errors += 1
+                logging.debug(f"{request['method']} {request['url']} -> {response.status_code}: {response.text[:200]}")
+                continue
+            latencies.append(duration)
+            # Set by the app's query profiler outside APP_ENVIRONMENT=PROD
+            if QUERY_COUNT_HEADER in response.headers:
+                queries.append(int(response.headers[QUERY_COUNT_HEADER]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, queries, errors, time.perf_counter() - started)
+
+
+def build_scenarios(tenants: List[SeededTenant], lines_per_order: int) -> Dict[str, Callable[[], Dict[str, Any]]]:
+    prefix = RoutePaths.API_PREFIX
+
+    def login():
+        tenant = random.choice(tenants)
+        return {"method": "POST", "url": f"{prefix}{RoutePaths.LOGIN}",
+                "json": {"email": tenant.email, "password": BENCHMARK_PASSWORD}}
+
+    def create_order():
+        tenant = random.choice(tenants)
+        return {"method": "POST", "url": f"{prefix}{RoutePaths.ORDER}", "params": {"user_id": tenant.user_id},
+                "json": {"customer_id": random.choice(tenant.customer_ids),
+                         "invoice_number": f"BL{os.urandom(5).hex().upper()}",
+                         "orders": random_order_lines(tenant, lines_per_order),
+                         "created_by_name": "benchmark"}}
+
+    def create_payment():
+        tenant = random.choice(tenants)
+        invoice_id = random.choice(tenant.invoice_ids)
+        return {"method": "POST", "url": f"{prefix}{RoutePaths.PAYMENT_BY_INVOICE.format(invoice_id=invoice_id)}",
+                "params": {"user_id": tenant.user_id}, "json": {"amount": 1.0, "payment_method": "cash"}}
+
+    def list_orders():
+        return {"method": "GET", "url": f"{prefix}{RoutePaths.ORDER}",
+                "params": {"user_id": random.choice(tenants).user_id}}
+
+    def list_products():
+        return {"method": "GET", "url": f"{prefix}{RoutePaths.PRODUCT}",
+                "params": {"user_id": random.choice(tenants).user_id}}
+
+    def list_customers():
+        return {"method": "GET", "url": f"{prefix}{RoutePaths.CUSTOMER}",
+                "params": {"user_id": random.choice(tenants).user_id}}
+
+    return {
+        "login": login,
+        "create_order": create_order,
+        "create_payment": create_payment,
+        "list_orders": list_orders,
+        "list_products": list_products,
+        "list_customers": list_customers
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Return human-readable regressions of `current` against `baseline`."""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if result["throughput_rps"] < previous["throughput_rps"] * (1 - REGRESSION_TOLERANCE):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {result['throughput_rps']} rps")
+        if result["latency_ms"]["p95"] > previous["latency_ms"]["p95"] * (1 + REGRESSION_TOLERANCE):
+            regressions.append(f"{name}: p95 {previous['latency_ms']['p95']} -> {result['latency_ms']['p95']} ms")
+        previous_queries = previous["queries_per_request"]["mean"]
+        current_queries = result["queries_per_request"]["mean"]
+        if previous_queries is not None and current_queries is not None and current_queries > previous_queries:
+            regressions.append(f"{name}: queries/request {previous_queries} -> {current_queries}")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.base_url:
+        # Query counts are only reported when the server runs outside APP_ENVIRONMENT=PROD
+        load_dotenv(".env")
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        # Measure the endpoints, not the rate limiter (set before .env is loaded, which won't override it)
+        os.environ[EnvKeys.ADMISSION_CONTROL_ENABLED.value] = "False"
+        # Booting App loads .env and configures logging before the database is touched
+        from main import App
+        transport = httpx.ASGITransport(app=App().app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60)
+
+    tenants = seed_tenants(
+        tenants=args.tenants,
+        products=args.products,
+        customers=args.customers,
+        invoices=args.invoices,
+        lines_per_invoice=args.lines
+    )
+
+    scenarios = build_scenarios(tenants, args.lines)
+    selected = args.scenarios or list(scenarios)
+    results = {}
+    async with client:
+        for name in selected:
+            logging.info(f"Running scenario {name}")
+            results[name] = await run_scenario(client, scenarios[name], args.requests, args.concurrency)
+            print(f"{name:16} {json.dumps(results[name])}")
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "tenants": args.tenants,
+            "products": args.products,
+            "customers": args.customers,
+            "invoices": args.invoices,
+            "lines": args.lines,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "target": args.base_url or "in-process"
+        },
+        "scenarios": results
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the billing API against a seeded database.")
+    parser.add_argument("--tenants", type=int, default=3)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--invoices", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=20, help="Order lines per invoice")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--scenarios", nargs="*", help="Subset of scenarios to run (default: all)")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous result file to check for regressions")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    report = asyncio.run(run(args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare_results(report, json.load(f))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,112 @@
+import logging
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List
+from app.controllers.database_controller import DatabaseController
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+
+@dataclass
+class SeededTenant:
+    user_id: str
+    email: str
+    product_ids: List[str] = field(default_factory=list)
+    customer_ids: List[str] = field(default_factory=list)
+    invoice_ids: List[str] = field(default_factory=list)
+
+
+def _unique_suffix() -> str:
+    return uuid.uuid4().hex[:10]
+
+
+def seed_tenant(
+    database_controller: DatabaseController,
+    products: int,
+    customers: int,
+    invoices: int,
+    lines_per_invoice: int,
+    workers: int = 8
+) -> SeededTenant:
+    """Create one tenant with products, customers and historical invoices through the controller."""
+    suffix = _unique_suffix()
+    user = database_controller.create_user(
+        username=f"bench_{suffix}",
+        password=BENCHMARK_PASSWORD,
+        email=f"bench_{suffix}@example.com",
+        phone_number="000-000-0000",
+        company_name=f"Benchmark {suffix}",
+        addressline1="1 Benchmark Way",
+        city="Mumbai",
+        state="Maharashtra",
+        pincode="400001",
+        country="India",
+        return_json=True
+    )
+    tenant = SeededTenant(user_id=user["user_id"], email=user["email"])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Large stock so the load phase never trips the insufficient-stock check
+        tenant.product_ids = list(pool.map(
+            lambda idx: database_controller.create_product(
+                user_id=tenant.user_id,
+                product=f"Product {idx}",
+                selling_price=round(random.uniform(5, 500), 2),
+                mrp=600.0,
+                quantity=1_000_000,
+                return_json=True
+            )["product_id"],
+            range(products)
+        ))
+        tenant.customer_ids = list(pool.map(
+            lambda idx: database_controller.create_customer(
+                user_id=tenant.user_id,
+                customer_name=f"Customer {idx}",
+                phone_number="111-111-1111",
+                address=f"{idx} Customer Street",
+                return_json=True
+            )["customer_id"],
+            range(customers)
+        ))
+        tenant.invoice_ids = list(pool.map(
+            lambda _: create_invoice(database_controller, tenant, lines_per_invoice)["invoice_id"],
+            range(invoices)
+        ))
+    logging.info(
+        f"Seeded tenant {tenant.user_id}: {products} products, {customers} customers, {invoices} invoices"
+    )
+    return tenant
+
+
+def random_order_lines(tenant: SeededTenant, lines: int) -> List[Dict]:
+    return [
+        {"product_id": product_id, "quantity": random.randint(1, 3), "rate": round(random.uniform(5, 500), 2)}
+        for product_id in random.sample(tenant.product_ids, min(lines, len(tenant.product_ids)))
+    ]
+
+
+def create_invoice(database_controller: DatabaseController, tenant: SeededTenant, lines: int) -> Dict:
+    return database_controller.create_order(
+        user_id=tenant.user_id,
+        customer_id=random.choice(tenant.customer_ids),
+        orders=random_order_lines(tenant, lines),
+        invoice_number=f"BM{_unique_suffix().upper()}",
+        created_by_name="benchmark",
+        return_json=True
+    )
+
+
+def seed_tenants(
+    tenants: int,
+    products: int,
+    customers: int,
+    invoices: int,
+    lines_per_invoice: int
+) -> List[SeededTenant]:
+    database_controller = DatabaseController()
+    return [
+        seed_tenant(database_controller, products, customers, invoices, lines_per_invoice)
+        for _ in range(tenants)
+    ]
@@ -6,8 +6,16 @@ from app.constants.route_paths import RoutePaths
 from app.constants.app_constants import AppConstants
 from app.base.router_registration import RouterRegistration
 from app.base.cors_config import InitCORS
+from app.base.compression import InitCompression
+from app.base.unit_of_work_middleware import InitUnitOfWork
+from app.base.query_profiler import InitQueryProfiler
+from app.base.log_pipeline import RequestIdMiddleware
+from app.base.admission_control import InitAdmissionControl
 from app.constants.fast_api_constants import FastAPIConstants
 from app.constants.directory_names import DirectoryNames
+from app.base.background_jobs import BackgroundJobs
+from app.base.live_events import LiveEventBroker
+from app.controllers.database_controller import DatabaseController
 
 class App(RoutePaths):
     def __init__(self):
@@ -25,7 +33,22 @@ class App(RoutePaths):
         self.base_router = APIRouter(prefix=self.API_PREFIX)
         self.setup_routes()
         self.setup_static_files()
+        self.setup_background_jobs()
+        # Closest to the routes, so the transaction is settled before any middleware sends the response
+        InitUnitOfWork(app=self.app)
+        # Innermost of the rest, so the other middlewares see the final (compressed) headers
+        InitCompression(app=self.app)
+        InitQueryProfiler(
+            app=self.app,
+            engines=DatabaseController().db.query_engines(),
+            environment=self.settings.APP_ENVIRONMENT
+        )
+        InitAdmissionControl(app=self.app, engine=DatabaseController().db.engine)
+        # Outside admission control: its 429/503 carry CORS headers (browsers see them, not a network
+        # error), and preflights are never throttled
         InitCORS(app=self.app)
+        # Outermost, so every log line of the request (including the profiler's) carries its ID
+        self.app.add_middleware(RequestIdMiddleware)
 
     def setup_static_files(self):
         self.app.mount(RoutePaths.STATIC, StaticFiles(
@@ -33,6 +56,35 @@ class App(RoutePaths):
 
     def setup_routes(self):
         RouterRegistration(app=self.app)
+
+    def setup_background_jobs(self):
+        background_jobs = BackgroundJobs()
+        database_controller = DatabaseController()
+        db = database_controller.db
+        # Each job runs once per tenant shard (just once without sharding)
+        background_jobs.register(
+            name="stock-snapshot-compaction",
+            func=lambda: db.for_each_shard(lambda: database_controller.compact_stock_snapshots(
+                fence_timeout_seconds=self.settings.STOCK_SNAPSHOT_FENCE_TIMEOUT_SECONDS)),
+            interval_seconds=self.settings.STOCK_SNAPSHOT_INTERVAL_SECONDS
+        )
+        background_jobs.register(
+            name="invoice-archival",
+            func=lambda: db.for_each_shard(lambda: database_controller.archive_closed_invoices(
+                older_than_days=self.settings.INVOICE_ARCHIVE_AFTER_DAYS,
+                batch_size=self.settings.INVOICE_ARCHIVE_BATCH_SIZE)),
+            interval_seconds=self.settings.INVOICE_ARCHIVE_INTERVAL_SECONDS
+        )
+        if self.settings.TABLE_PARTITIONING and self.settings.DATABASE_BACKEND == "postgres":
+            # Upcoming monthly partitions exist before rows for them arrive; expired ones get detached
+            background_jobs.register(
+                name="partition-maintenance",
+                func=lambda: db.for_each_shard(lambda: db.partition_manager().maintain()),
+                interval_seconds=24 * 60 * 60
+            )
+        self.app.add_event_handler("startup", background_jobs.start)
+        self.app.add_event_handler("shutdown", background_jobs.stop)
+        self.app.add_event_handler("shutdown", LiveEventBroker().stop)
         
     def run(self):
         uvicorn.run(self.app, host=self.settings.APP_HOST,
@@ -1,5 +1,5 @@
 CREATE TABLE users (
-    user_id VARCHAR(50) PRIMARY KEY,
+    user_id UUID PRIMARY KEY,
     username VARCHAR(50) NOT NULL,
     password VARCHAR(255) NOT NULL,
     email VARCHAR(100),
@@ -15,20 +15,25 @@ CREATE TABLE users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX idx_users_email ON users (email);
+
 CREATE TABLE customers (
-    customer_id VARCHAR(50) PRIMARY KEY,
-    user_id VARCHAR(50) NOT NULL,
+    customer_id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
     customer_name VARCHAR(100) NOT NULL,
     phone_number VARCHAR(20),
     contact_info VARCHAR(100),
     address TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    change_version BIGINT NOT NULL DEFAULT 0,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
+CREATE INDEX idx_customers_user_change_version ON customers (user_id, change_version);
+
 CREATE TABLE products (
-    product_id VARCHAR(50),
-    user_id VARCHAR(50),
+    product_id UUID,
+    user_id UUID,
     product VARCHAR(100) NOT NULL,
     weight VARCHAR(50),
     batch_number VARCHAR(50),
@@ -37,17 +42,20 @@ CREATE TABLE products (
     mrp DECIMAL(10, 2) NOT NULL,
     distributer_landing DECIMAL(10, 2),
     selling_price DECIMAL(10, 2) NOT NULL,
+    change_version BIGINT NOT NULL DEFAULT 0,
     PRIMARY KEY (product_id, user_id),
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
+CREATE INDEX idx_products_user_change_version ON products (user_id, change_version);
+
 CREATE TABLE orders (
-    order_id VARCHAR(50),
-    product_id VARCHAR(50),
-    user_id VARCHAR(50),
-    customer_id VARCHAR(50),
+    order_id UUID,
+    product_id UUID,
+    user_id UUID,
+    customer_id UUID,
     created_by_name VARCHAR(50),
-    invoice_id VARCHAR(50),
+    invoice_id UUID,
     quantity INTEGER NOT NULL CHECK (quantity > 0),
     rate DECIMAL(10, 2) NOT NULL,
     amount DECIMAL(10, 2) NOT NULL,
@@ -60,9 +68,9 @@ CREATE TABLE orders (
 );
 
 CREATE TABLE invoices (
-    invoice_id VARCHAR(50) PRIMARY KEY,
-    user_id VARCHAR(50) NOT NULL,
-    customer_id VARCHAR(50),
+    invoice_id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
+    customer_id UUID,
     invoice_number VARCHAR(50) NOT NULL UNIQUE,
     invoice_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     total_amount DECIMAL(10, 2) NOT NULL,
@@ -74,7 +82,7 @@ CREATE TABLE invoices (
 );
 
 CREATE TABLE payments(
-    payment_id VARCHAR(50) PRIMARY KEY,
+    payment_id UUID PRIMARY KEY,
     invoice_id UUID NOT NULL,
     user_id UUID NOT NULL,
     amount DECIMAL(10, 2) NOT NULL,
@@ -83,5 +91,91 @@ CREATE TABLE payments(
     note TEXT,
     FOREIGN KEY (invoice_id) REFERENCES invoices(invoice_id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-)
+);
+
+CREATE TABLE stock_movements (
+    movement_id BIGSERIAL PRIMARY KEY,
+    product_id UUID NOT NULL,
+    user_id UUID NOT NULL,
+    quantity_delta INTEGER NOT NULL,
+    reason VARCHAR(30) NOT NULL,  -- see app/enums/stock_movement_reasons.py
+    reference_id VARCHAR(50),     -- order_id that caused the movement, if any
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_stock_movements_product_time ON stock_movements (user_id, product_id, created_at);
+
+CREATE TABLE stock_snapshots (
+    product_id UUID NOT NULL,
+    user_id UUID NOT NULL,
+    snapshot_at TIMESTAMP NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (user_id, product_id, snapshot_at)
+);
+
+CREATE TABLE daily_sales_rollup (
+    user_id VARCHAR(50) NOT NULL,
+    sales_date DATE NOT NULL,
+    product_id VARCHAR(50) NOT NULL,
+    customer_id VARCHAR(50) NOT NULL DEFAULT '',  -- '' when the order has no customer
+    order_count INTEGER NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, sales_date, product_id, customer_id)
+);
+
+CREATE TABLE customer_receivables_rollup (
+    user_id VARCHAR(50) NOT NULL,
+    customer_id VARCHAR(50) NOT NULL DEFAULT '',
+    total_invoiced DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    total_paid DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, customer_id)
+);
+
+CREATE UNLOGGED TABLE rate_limit_buckets (
+    bucket_key VARCHAR(255) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    allowed BOOLEAN NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE TABLE tenant_change_counters (
+    user_id UUID REFERENCES users(user_id) ON DELETE CASCADE,
+    resource VARCHAR(50) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, resource)
+);
 
+CREATE TABLE sync_tombstones (
+    user_id UUID REFERENCES users(user_id) ON DELETE CASCADE,
+    resource VARCHAR(50) NOT NULL,
+    row_id VARCHAR(50) NOT NULL,
+    change_version BIGINT NOT NULL,
+    deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, resource, row_id)
+);
+
+CREATE INDEX idx_sync_tombstones_user_change_version ON sync_tombstones (user_id, change_version);
+
+-- Keeps invoice numbers unique when invoices are partitioned (TABLE_PARTITIONING=True), where
+-- orders, invoices and payments are range-partitioned by month on their *_date column: their
+-- primary keys then include the date and orders/payments carry no foreign key to invoices.
+CREATE TABLE invoice_numbers (
+    invoice_number VARCHAR(50) PRIMARY KEY,
+    invoice_id UUID NOT NULL,
+    invoice_date TIMESTAMP,
+    user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_invoice_numbers_invoice_id ON invoice_numbers (invoice_id);
+
+-- Tenant directory (default shard only, with POSTGRES_SHARD_URLS set). Every shard holds the
+-- tables above for its tenants, plus a mirror of their users rows; tenants absent from the
+-- directory live on the default shard. `frozen` refuses the tenant's writes during a move.
+CREATE TABLE tenant_shards (
+    user_id UUID PRIMARY KEY,
+    shard VARCHAR(50) NOT NULL,
+    frozen BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# The suite runs on the SQLite backend, in a database of its own; set before the app is imported
+_DATA_DIR = tempfile.mkdtemp(prefix="billing-tests-")
+os.environ.setdefault("DATABASE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_DB_PATH", os.path.join(_DATA_DIR, "billing.sqlite"))
+os.environ.setdefault("INVOICE_ARCHIVE_DIR", os.path.join(_DATA_DIR, "invoice_archive"))
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+
+@pytest.fixture(scope="session")
+def controller():
+    from app.controllers.database_controller import DatabaseController
+    from app.databases.database_backend import get_database_manager
+    get_database_manager().create_tables()
+    return DatabaseController()
+
+
+@pytest.fixture
+def make_tenant(controller):
+    """Factory for fresh users (tenants), each with one customer."""
+    def make(company_name="Test Co"):
+        user = controller.create_user(
+            f"user-{os.urandom(4).hex()}", "secret-password", f"{os.urandom(4).hex()}@example.com", "9999999999",
+            company_name, "1 Main Road", "Pune", "MH", "411001", "IN"
+        )
+        user_id = str(user["user_id"] if isinstance(user, dict) else user[0])
+        customer = controller.create_customer(user_id, "Walk-in", return_json=True)
+        return {"user_id": user_id, "customer_id": customer["customer_id"]}
+    return make
+
+
+@pytest.fixture
+def tenant(make_tenant):
+    """A fresh user (tenant) with one customer."""
+    return make_tenant()
+
+
+@pytest.fixture
+def make_client():
+    """Factory for a test client of an app serving the given routers."""
+    def make(*routers):
+        app = FastAPI()
+        for router in routers:
+            app.include_router(router.router)
+        return TestClient(app)
+    return make
@@ -0,0 +1,63 @@
+from ipaddress import ip_network
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.base.admission_control import AdmissionControlMiddleware, InitAdmissionControl
+from app.constants.route_paths import RoutePaths
+from app.enums.env_keys import EnvKeys
+
+
+def _middleware(trusted_proxies=()):
+    return AdmissionControlMiddleware(
+        app=None, routes=[], backend=None, default_rule=None, pool_wait_threshold_seconds=1,
+        trusted_proxies=[ip_network(proxy) for proxy in trusted_proxies]
+    )
+
+
+def _scope(peer, forwarded_for=None):
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return {"type": "http", "client": (peer, 50000), "headers": headers}
+
+
+def test_forwarded_for_is_honoured_only_from_trusted_proxies():
+    behind_proxy = _middleware(trusted_proxies=["10.0.0.0/8"])
+
+    assert behind_proxy._tenant(_scope("10.0.0.5", "203.0.113.7")) == "ip:203.0.113.7"
+    # Entries left of the one the proxy appended are the client's own claim
+    assert behind_proxy._tenant(_scope("10.0.0.5", "198.51.100.1, 203.0.113.7, 10.0.0.9")) == "ip:203.0.113.7"
+    assert behind_proxy._tenant(_scope("192.0.2.1", "203.0.113.7")) == "ip:192.0.2.1"
+    assert _middleware()._tenant(_scope("10.0.0.5", "203.0.113.7")) == "ip:10.0.0.5"
+
+
+@pytest.mark.parametrize("auth_required, enabled, installed", [
+    ("False", None, False),
+    ("True", None, True),
+    ("False", "True", True),
+    ("True", "False", False),
+])
+def test_admission_control_follows_auth_required_by_default(monkeypatch, auth_required, enabled, installed):
+    monkeypatch.setenv(EnvKeys.AUTH_REQUIRED.value, auth_required)
+    if enabled is None:
+        monkeypatch.delenv(EnvKeys.ADMISSION_CONTROL_ENABLED.value, raising=False)
+    else:
+        monkeypatch.setenv(EnvKeys.ADMISSION_CONTROL_ENABLED.value, enabled)
+    app = FastAPI()
+
+    InitAdmissionControl(app, engine=None)
+
+    assert any(m.cls is AdmissionControlMiddleware for m in app.user_middleware) == installed
+
+
+def test_rejections_carry_cors_headers(controller, monkeypatch):
+    pytest.importorskip("uvicorn")  # main's import
+    monkeypatch.setenv(EnvKeys.ADMISSION_CONTROL_ENABLED.value, "True")
+    from main import App
+    client = TestClient(App().app)
+    path = f"{RoutePaths.API_PREFIX}{RoutePaths.ORDER}"
+    origin = {"Origin": "https://shop.example.com"}
+
+    statuses = [client.get(path, params={"user_id": "x"}, headers=origin) for _ in range(8)]
+
+    rejected = [response for response in statuses if response.status_code == 429]
+    assert rejected
+    assert rejected[0].headers["access-control-allow-origin"] in ("*", "https://shop.example.com")
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import create_engine, text
+from app.databases.unit_of_work import UnitOfWork, after_commit, outside_unit_of_work, transaction, unit_of_work_scope
+from app.enums.change_resources import ChangeResource
+
+
+def test_writes_bump_the_list_version(controller, tenant):
+    user_id = tenant["user_id"]
+    before = controller.get_change_version(user_id, ChangeResource.PRODUCTS)
+
+    controller.create_product(user_id, "Gadget", 10, 12, 4)
+
+    assert controller.get_change_version(user_id, ChangeResource.PRODUCTS) == before + 1
+
+
+@pytest.mark.parametrize("commit", [True, False])
+def test_after_commit_callbacks_run_only_on_commit(commit):
+    engine = create_engine("sqlite://")
+    calls = []
+    unit_of_work = UnitOfWork()
+    with unit_of_work_scope(unit_of_work):
+        with transaction(engine) as conn:
+            conn.execute(text("SELECT 1"))
+            after_commit(conn, lambda: calls.append("bumped"))
+        assert calls == []
+        unit_of_work.finish(commit)
+    assert calls == (["bumped"] if commit else [])
+
+
+def test_after_commit_callbacks_are_dropped_on_rollback():
+    engine = create_engine("sqlite://")
+    calls = []
+    with pytest.raises(RuntimeError):
+        with transaction(engine) as conn:
+            after_commit(conn, lambda: calls.append("bumped"))
+            raise RuntimeError("write failed")
+    with transaction(engine) as conn:
+        pass
+    assert calls == []
+
+
+def test_outside_unit_of_work_uses_a_transaction_of_its_own():
+    engine = create_engine("sqlite://")
+    unit_of_work = UnitOfWork()
+    with unit_of_work_scope(unit_of_work):
+        with outside_unit_of_work(), transaction(engine) as conn:
+            conn.execute(text("SELECT 1"))
+        assert not unit_of_work.holds(engine)
+        with transaction(engine) as conn:
+            conn.execute(text("SELECT 1"))
+        assert unit_of_work.holds(engine)
+        unit_of_work.finish(True)
@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.databases import sqlite_database_manager
+from app.databases.sqlite_database_manager import _Connection
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Units in each batch that committed."""
+    committed = []
+    commit_batch = _Connection.commit_batch
+
+    def recording_commit_batch(self):
+        units = self.batch.units
+        error = commit_batch(self)
+        if error is None:
+            committed.append(units)
+        return error
+
+    monkeypatch.setattr(_Connection, "commit_batch", recording_commit_batch)
+    return committed
+
+
+def _queue_behind_writer(controller, writes):
+    """Run `writes` on threads while the writer is held, so they queue for it and share commits."""
+    db = controller.db
+    with ThreadPoolExecutor(max_workers=len(writes)) as pool:
+        with db.transaction():
+            futures = [pool.submit(write) for write in writes]
+            deadline = time.monotonic() + 5
+            while db.engine.pool.waiting < len(writes) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        return [future.result() for future in futures]
+
+
+def test_queued_writes_share_one_commit(controller, tenant, batches):
+    user_id = tenant["user_id"]
+
+    def create_and_read(index):
+        product = controller.create_product(user_id, f"Item {index}", 10, 12, 5, return_json=True)
+        # Acknowledged only once committed: a reader sees it straight away
+        return controller.db.execute_query(
+            "SELECT product FROM products WHERE product_id = :product_id", {"product_id": product["product_id"]},
+            fetch_one=True, return_json=True, read_only=True
+        )
+
+    rows = _queue_behind_writer(controller, [lambda index=index: create_and_read(index) for index in range(8)])
+
+    assert sorted(row["product"] for row in rows) == sorted(f"Item {index}" for index in range(8))
+    assert len(batches) < 8 and sum(batches) >= 8
+
+
+def test_failed_write_leaves_its_batch_committed(controller, tenant, batches):
+    user_id = tenant["user_id"]
+    db = controller.db
+
+    def fail():
+        return db.execute_query("INSERT INTO users (user_id) VALUES (:user_id)", {"user_id": user_id})
+
+    results = _queue_behind_writer(controller, [
+        lambda: controller.create_product(user_id, "Before", 10, 12, 5, return_json=True),
+        fail,
+        lambda: controller.create_product(user_id, "After", 10, 12, 5, return_json=True),
+    ])
+
+    assert "error" in results[1]
+    products = db.execute_query(
+        "SELECT product FROM products WHERE user_id = :user_id AND product IN ('Before', 'After')",
+        {"user_id": user_id}, return_json=True, read_only=True
+    )
+    assert sorted(row["product"] for row in products) == ["After", "Before"]
+
+
+def test_unbatched_commit_commits_the_open_batch(controller):
+    db = controller.db
+    with db.engine.connect() as conn:
+        dbapi_connection = conn.connection.dbapi_connection
+        sqlite_database_manager._group_commit.waits = True
+        try:
+            with conn.begin():
+                conn.exec_driver_sql("SELECT 1")
+        finally:
+            sqlite_database_manager._group_commit.waits = False
+        batch = sqlite_database_manager._group_commit.batch
+        assert batch is not None and not batch.done.is_set()
+        # A caller that doesn't wait (startup, maintenance) commits what it joined
+        with conn.begin():
+            conn.exec_driver_sql("SELECT 1")
+        assert batch.done.is_set() and batch.error is None and dbapi_connection.batch is None
+    sqlite_database_manager._group_commit.batch = None
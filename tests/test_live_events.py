@@ -0,0 +1,44 @@
+import json
+import pytest
+from fastapi import HTTPException
+from app.constants.app_constants import AppConstants
+from app.constants.route_paths import RoutePaths
+
+
+@pytest.fixture
+def notifications(controller):
+    received = []
+    handlers = controller.db.notify_handlers.setdefault(AppConstants.LIVE_EVENTS_CHANNEL, [])
+    handlers.append(received.append)
+    yield received
+    handlers.remove(received.append)
+
+
+def test_stock_event_is_sent_after_commit_with_the_committed_quantity(controller, tenant, notifications):
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Widget", 5, 6, 10, return_json=True)["product_id"]
+    notifications.clear()
+
+    controller.add_stock_entry(product_id, user_id, 4)
+
+    assert [json.loads(payload)["quantity"] for payload in notifications] == [14]
+
+
+def test_no_stock_event_for_a_rolled_back_write(controller, tenant, notifications):
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Bolt", 1, 2, 1, return_json=True)["product_id"]
+    notifications.clear()
+
+    with pytest.raises(HTTPException) as error:
+        controller.create_order(
+            user_id, tenant["customer_id"], [{"product_id": product_id, "quantity": 5, "rate": 1}], f"INV-{product_id[:8]}"
+        )
+
+    assert error.value.status_code == 400
+    assert notifications == []
+
+
+def test_live_events_need_a_bearer_token(tenant, make_client):
+    from app.routers.live_events_route import LiveEventsRouter
+    response = make_client(LiveEventsRouter()).get(f"{RoutePaths.API_PREFIX}{RoutePaths.LIVE_EVENTS}", params={"user_id": tenant["user_id"]})
+    assert response.status_code == 401
@@ -0,0 +1,33 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from app.base.auth import FailedLoginLimiter
+
+
+@pytest.fixture
+def limiter():
+    limiter = FailedLoginLimiter()
+    limiter.failures.clear()
+    yield limiter
+    limiter.failures.clear()
+
+
+def _attempt(limiter, email):
+    try:
+        limiter.check(email, "10.0.0.1")
+        return True
+    except HTTPException:
+        return False
+
+
+def test_concurrent_burst_gets_at_most_the_limit_through(limiter):
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        admitted = list(pool.map(lambda _: _attempt(limiter, "burst@example.com"), range(50)))
+    assert sum(admitted) == limiter.max_failures
+
+
+def test_released_attempts_do_not_count(limiter):
+    for _ in range(limiter.max_failures * 2):
+        reserved_at = limiter.check("ok@example.com", "10.0.0.2")
+        limiter.release("ok@example.com", "10.0.0.2", reserved_at)
+    assert limiter.failures == {}
@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+from app.constants.route_paths import RoutePaths
+from app.utils.api_error_handler import CatchAPIException
+
+
+@pytest.fixture
+def client(make_client):
+    from app.routers.customer_route import CustomerRouter
+    from app.routers.order_route import OrderRouter
+    from app.routers.product_route import ProductRouter
+    return make_client(CustomerRouter(), OrderRouter(), ProductRouter())
+
+
+@pytest.mark.parametrize("method, path, params, body", [
+    ("DELETE", RoutePaths.CUSTOMER_WITH_ID.format(customer_id="not-a-uuid"), {}, None),
+    ("DELETE", RoutePaths.ORDER_WITH_ID.format(order_id="not-a-uuid"), {}, None),
+    ("POST", RoutePaths.PRODUCT_STOCK, {"product_id": "not-a-uuid"}, {"quantity": 5}),
+])
+def test_malformed_key_on_a_write_route_is_not_found(client, tenant, method, path, params, body):
+    response = client.request(
+        method, f"{RoutePaths.API_PREFIX}{path}", params={"user_id": tenant["user_id"], **params}, json=body
+    )
+    assert response.status_code == 404
+
+
+def test_fractional_quantity_is_a_bad_request(controller, tenant):
+    product_id = controller.create_product(tenant["user_id"], "Tape", 1, 2, 5, return_json=True)["product_id"]
+
+    @CatchAPIException().catch_api_exceptions
+    async def add_stock():
+        return controller.add_stock_entry(product_id, tenant["user_id"], 2.5)
+
+    assert asyncio.run(add_stock()).status_code == 400
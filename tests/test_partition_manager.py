@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+from datetime import date
+import pytest
+from app.databases import partition_manager as module
+from app.databases.partition_manager import PARTITIONED_TABLES, PartitionManager, month_start, partition_name
+
+
+class RecordingEngine:
+    """Stands in for a Postgres engine: records each statement, answers catalog lookups from `partitions`."""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+
+@pytest.fixture
+def partitioned(monkeypatch):
+    this_month = month_start(date.today())
+    partitions = {
+        table: [partition_name(table, month_start(this_month, offset)) for offset in range(-14, 4)] + [f"{table}_default"]
+        for table in PARTITIONED_TABLES
+    }
+    engine = RecordingEngine(partitions)
+    monkeypatch.setattr(PartitionManager, "_is_partitioned", staticmethod(lambda conn, table: True))
+    monkeypatch.setattr(PartitionManager, "_partitions", staticmethod(lambda conn, table: list(conn.partitions[table])))
+    monkeypatch.setattr(module, "text", lambda query: query)
+    return engine
+
+
+def _detached(engine):
+    return [statement.split()[-1] for statement in engine.statements if "DETACH PARTITION" in statement]
+
+
+def test_detach_takes_partitions_ending_by_the_date(partitioned):
+    before = month_start(date.today(), -12)
+
+    detached = PartitionManager(partitioned).detach_partitions_before("orders", before)
+
+    assert detached == [partition_name("orders", month_start(before, -2)), partition_name("orders", month_start(before, -1))]
+    assert _detached(partitioned) == detached
+
+
+def test_maintenance_detaches_partitions_past_retention(partitioned):
+    result = PartitionManager(partitioned, months_ahead=3, detach_after_months=12).maintain()
+
+    cutoff = month_start(date.today(), -12)
+    expected = [
+        partition_name(table, month_start(cutoff, offset))
+        for table in PARTITIONED_TABLES for offset in (-2, -1)
+    ]
+    assert result["created"] == []
+    assert result["detached"] == expected
+    assert _detached(partitioned) == expected
+
+
+def test_maintenance_keeps_partitions_without_retention(partitioned):
+    result = PartitionManager(partitioned, months_ahead=3).maintain()
+
+    assert result["detached"] == [] and _detached(partitioned) == []
+
+
+def test_detach_refuses_unpartitioned_table(partitioned):
+    with pytest.raises(ValueError):
+        PartitionManager(partitioned).detach_partitions_before("customers", date.today())
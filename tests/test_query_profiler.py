@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app.base.query_profiler import (
+    InitQueryProfiler, QueryBudgetExceeded, QueryProfiler, QueryProfilerMiddleware, assert_query_budget, query_budget
+)
+from app.databases.postgres_database_manager import PostgreSQLManager
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    QueryProfiler.install(engine)
+    return engine
+
+
+@pytest.fixture
+def client(engine):
+    app = FastAPI()
+    app.add_middleware(QueryProfilerMiddleware)
+
+    @app.get("/items")
+    def items():
+        with engine.connect() as conn:
+            return [conn.execute(text("SELECT :n"), {"n": n}).scalar() for n in range(3)]
+
+    return TestClient(app)
+
+
+def test_endpoint_within_budget_passes(client):
+    assert_query_budget(client.get("/items"), max_queries=3, max_repeat=3)
+
+
+def test_endpoint_over_budget_fails(client):
+    response = client.get("/items")
+    with pytest.raises(QueryBudgetExceeded):
+        assert_query_budget(response, max_queries=2)
+    with pytest.raises(QueryBudgetExceeded):
+        assert_query_budget(response, max_queries=10, max_repeat=2)
+
+
+def test_failed_statement_is_counted_and_leaves_no_start_time(engine):
+    with query_budget(max_queries=2) as stats, engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info["query_start_time"] == []
+    assert stats.count == 2
+
+
+def test_reads_off_the_primary_are_counted(controller, tenant):
+    # SQLite reads run on the reader engine, as Postgres reads run on a replica
+    InitQueryProfiler(FastAPI(), controller.db.query_engines(), environment="DEV")
+
+    with query_budget(max_queries=10) as stats:
+        controller.get_all_products(tenant["user_id"])
+
+    assert controller.db.read_engine() is not controller.db.engine
+    assert any("FROM products p" in shape for shape in stats.shapes)
+
+
+def test_replica_and_shard_engines_are_instrumented():
+    primaries, replica = [create_engine("sqlite://"), create_engine("sqlite://")], create_engine("sqlite://")
+    manager = SimpleNamespace(all_engines=lambda: primaries, replicas=SimpleNamespace(replicas=[SimpleNamespace(engine=replica)]))
+
+    assert PostgreSQLManager.query_engines(manager) == primaries + [replica]
@@ -0,0 +1,75 @@
+import csv
+import io
+import uuid
+import numpy as np
+from app.constants.route_paths import RoutePaths
+from app.controllers.database_controller import EXPORT_ORDER_COLUMNS
+from app.enums.result_modes import ResultMode
+
+
+def _order(controller, tenant, product_id, quantity):
+    return controller.create_order(
+        tenant["user_id"], tenant["customer_id"], [{"product_id": product_id, "quantity": quantity, "rate": 10}],
+        f"INV-{uuid.uuid4().hex[:8]}", return_json=True
+    )
+
+
+def _sold_quantities(controller, tenant, result_mode):
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Widget", 10, 12, 100, return_json=True)["product_id"]
+    for quantity in (2, 3):
+        _order(controller, tenant, product_id, quantity)
+    return controller.db.execute_query(
+        "SELECT quantity, rate FROM orders WHERE user_id = :user_id ORDER BY quantity", {"user_id": user_id},
+        result_mode=result_mode
+    )
+
+
+def test_tuples_mode_shares_one_header(controller, tenant):
+    result = _sold_quantities(controller, tenant, ResultMode.TUPLES)
+
+    assert result["columns"] == ["quantity", "rate"]
+    assert [row[0] for row in result["rows"]] == [2, 3]
+
+
+def test_columns_mode_returns_a_list_per_column(controller, tenant):
+    columns = _sold_quantities(controller, tenant, ResultMode.COLUMNS)
+
+    assert columns["quantity"] == [2, 3] and columns["rate"] == [10, 10]
+
+
+def test_arrays_mode_returns_numpy_arrays(controller, tenant):
+    arrays = _sold_quantities(controller, tenant, ResultMode.ARRAYS)
+
+    assert isinstance(arrays["quantity"], np.ndarray) and arrays["quantity"].sum() == 5
+
+
+def test_iterator_mode_reads_lazily(controller, tenant):
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Bolt", 1, 2, 100, return_json=True)["product_id"]
+    for quantity in (1, 2, 3):
+        _order(controller, tenant, product_id, quantity)
+
+    rows = controller.db.execute_query(
+        "SELECT quantity FROM orders WHERE user_id = :user_id ORDER BY quantity", {"user_id": user_id},
+        return_json=True, result_mode=ResultMode.ITERATOR
+    )
+
+    assert not isinstance(rows, list)
+    assert [row["quantity"] for row in rows] == [1, 2, 3]
+
+
+def test_order_export_streams_csv(controller, tenant, make_client):
+    from app.routers.order_route import OrderRouter
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Nut", 1, 2, 100, return_json=True)["product_id"]
+    _order(controller, tenant, product_id, 4)
+    _order(controller, tenant, product_id, 5)
+
+    response = make_client(OrderRouter()).get(f"{RoutePaths.API_PREFIX}{RoutePaths.ORDER_EXPORT}", params={"user_id": user_id})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    [header, *lines] = list(csv.reader(io.StringIO(response.text)))
+    assert tuple(header) == EXPORT_ORDER_COLUMNS
+    assert [line[header.index("quantity")] for line in lines] == ["4", "5"]
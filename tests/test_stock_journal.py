@@ -0,0 +1,113 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import HTTPException
+from app.enums.stock_movement_reasons import StockMovementReason
+
+
+def test_stock_writes_are_journaled(controller, tenant):
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Gear", 4.5, 5, 100, return_json=True)["product_id"]
+    controller.add_stock_entry(product_id, user_id, 5)
+    controller.create_order(
+        user_id, tenant["customer_id"], [{"product_id": product_id, "quantity": 3, "rate": 5}],
+        f"INV-{uuid.uuid4().hex[:8]}", return_json=True
+    )
+
+    movements = controller.get_stock_movements(product_id, user_id, return_json=True)
+
+    assert [(row["reason"], row["quantity_delta"]) for row in movements] == [
+        (StockMovementReason.ORDER_CREATED.value, -3),
+        (StockMovementReason.STOCK_ENTRY.value, 5),
+        (StockMovementReason.INITIAL_STOCK.value, 100),
+    ]
+    assert controller.get_product(product_id, user_id, return_json=True)["quantity"] == 102
+
+
+def test_stock_level_is_snapshot_plus_journal(controller, tenant):
+    user_id = tenant["user_id"]
+    product = controller.create_product(user_id, "Widget", 25.99, 29.99, 100, return_json=True)
+    product_id = product["product_id"]
+    controller.add_stock_entry(product_id, user_id, 5)
+    controller.create_order(
+        user_id, tenant["customer_id"], [{"product_id": product_id, "quantity": 3, "rate": 25.99}],
+        f"INV-{uuid.uuid4().hex[:8]}", return_json=True
+    )
+
+    stock = controller.get_stock_at(product_id, user_id, return_json=True)
+
+    assert stock["product_id"] == product_id
+    assert stock["quantity"] == 102
+
+
+def test_stock_level_of_unknown_product_is_not_found(controller, tenant):
+    with pytest.raises(HTTPException) as error:
+        controller.get_stock_at(str(uuid.uuid4()), tenant["user_id"], return_json=True)
+    assert error.value.status_code == 404
+
+
+def test_compaction_folds_the_journal_without_changing_stock(controller, tenant):
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Bolt", 1, 2, 50, return_json=True)["product_id"]
+    controller.add_stock_entry(product_id, user_id, 7)
+    controller.update_product(product_id, user_id, quantity=40)
+
+    assert controller.compact_stock_snapshots() >= 1
+    controller.add_stock_entry(product_id, user_id, 2)
+
+    assert controller.get_product(product_id, user_id, return_json=True)["quantity"] == 42
+    assert controller.get_stock_at(product_id, user_id, return_json=True)["quantity"] == 42
+    assert controller.compact_stock_snapshots() >= 1
+    assert controller.get_stock_at(product_id, user_id, return_json=True)["snapshot_at"] is not None
+    assert [row["quantity"] for row in controller.get_all_products(user_id, return_json=True)] == [42]
+
+
+def test_compaction_skips_tenants_being_moved(controller, tenant, monkeypatch):
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Washer", 1, 2, 5, return_json=True)["product_id"]
+    controller.add_stock_entry(product_id, user_id, 3)
+    monkeypatch.setattr(controller, "_frozen_tenants", lambda: [user_id])
+
+    controller.compact_stock_snapshots()
+
+    assert controller.get_stock_at(product_id, user_id, return_json=True)["snapshot_at"] is None
+    monkeypatch.undo()
+    controller.compact_stock_snapshots()
+    assert controller.get_stock_at(product_id, user_id, return_json=True)["snapshot_at"] is not None
+
+
+def test_concurrent_orders_never_take_stock_below_zero(controller, tenant):
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Last Units", 1, 2, 5, return_json=True)["product_id"]
+
+    def sell_one(_):
+        try:
+            controller.create_order(
+                user_id, tenant["customer_id"], [{"product_id": product_id, "quantity": 1, "rate": 2}],
+                f"INV-{uuid.uuid4().hex[:8]}", return_json=True
+            )
+            return True
+        except HTTPException as error:
+            assert error.status_code == 400
+            return False
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        sold = sum(pool.map(sell_one, range(12)))
+
+    assert sold == 5
+    assert controller.get_stock_at(product_id, user_id, return_json=True)["quantity"] == 0
+
+
+def test_order_update_cannot_oversell(controller, tenant):
+    user_id = tenant["user_id"]
+    product_id = controller.create_product(user_id, "Spare", 1, 2, 3, return_json=True)["product_id"]
+    invoice = controller.create_order(
+        user_id, tenant["customer_id"], [{"product_id": product_id, "quantity": 2, "rate": 2}],
+        f"INV-{uuid.uuid4().hex[:8]}", return_json=True
+    )
+
+    with pytest.raises(HTTPException) as error:
+        controller.update_order(invoice["orders"][0]["order_id"], user_id, quantity=4)
+
+    assert error.value.status_code == 400
+    assert controller.get_stock_at(product_id, user_id, return_json=True)["quantity"] == 1
@@ -0,0 +1,34 @@
+import pytest
+from fastapi import HTTPException
+
+
+@pytest.fixture
+def other_tenant(make_tenant):
+    return make_tenant("Other Co")["user_id"]
+
+
+def test_customer_of_another_tenant_is_not_found(controller, tenant, other_tenant):
+    for call in (
+        lambda: controller.get_customer(tenant["customer_id"], other_tenant),
+        lambda: controller.update_customer(tenant["customer_id"], other_tenant, customer_name="Taken"),
+        lambda: controller.delete_customer(tenant["customer_id"], other_tenant),
+    ):
+        with pytest.raises(HTTPException) as error:
+            call()
+        assert error.value.status_code == 404
+
+    assert controller.get_customer(tenant["customer_id"], tenant["user_id"], return_json=True)["customer_name"] == "Walk-in"
+
+
+def test_user_routes_require_the_users_own_token(controller, tenant, other_tenant, make_client, monkeypatch):
+    from app.base.auth import TokenVerifier
+    from app.constants.route_paths import RoutePaths
+    from app.routers.user_route import UserRouter
+    monkeypatch.setattr(TokenVerifier(), "auth_required", True)
+    client = make_client(UserRouter())
+    path = f"{RoutePaths.API_PREFIX}/user/{tenant['user_id']}"
+
+    other_token = UserRouter().create_access_token({"sub": other_tenant})
+    assert client.delete(path).status_code == 401
+    assert client.delete(path, headers={"Authorization": f"Bearer {other_token}"}).status_code == 403
+    assert controller.get_user(tenant["user_id"], return_json=True)["user_id"] is not None